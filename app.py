@@ -1,6 +1,5 @@
 from flask import Flask, render_template, request, jsonify, session, has_request_context
 from flask import Response
-from flask_bootstrap import Bootstrap
 import serial
 import requests
 import time
@@ -8,13 +7,31 @@ from datetime import datetime
 import logging
 from functools import wraps
 import os
-import subprocess
-import re
-import ipaddress
+import base64
+import json
+import zlib
+from contextlib import ExitStack, contextmanager
+
+from device_manager import (read_response, rpc_session, SnapshotCache, ListingCache, parse_storage_list, sort_entries,
+                            probe_capabilities, COMMAND_DIALECTS, run_batch)
+from flipper_rpc import RPCError
+from flipper_backup import BackupJob
+from flipper_fleet import FlipperFleet
+from device_manager import FlipperDevice
+from flipper_probe import find_flipper, classify
+from flipper_parsers import monitor_fields, parse_storage_info
+from hotplug import HotplugWatcher, enumerate_ports
+from supervisor import Supervisor
+import local_state
+from telemetry import TelemetryHub
+from serial_scheduler import SerialScheduler, SchedulerTimeout, INTERACTIVE, TRANSMIT, FILE_OPS, TELEMETRY
+from pineapple_client import get_client as get_pineapple_client, TokenManager, parse_login_response, CircuitOpenError
+from pineapple_discovery import PineappleLocator
+from pineapple_fleet import PineappleFleet
+from device_broker import BrokerClient, BrokerUnavailable
 
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'change_this_secret_key_in_production')
-Bootstrap(app)
 
 # Logging
 logging.basicConfig(level=logging.INFO)
@@ -24,87 +41,64 @@ logger = logging.getLogger(__name__)
 FLIPPER_PORT = os.getenv('FLIPPER_PORT', 'COM3' if os.name == 'nt' else '/dev/ttyACM0')  # default per OS; override via env
 FLIPPER_BAUD = 230400
 FLIPPER_TIMEOUT = 2
+# Response framing: stop reading at the CLI prompt, after this idle gap, or at the hard deadline
+FLIPPER_IDLE_TIMEOUT = float(os.getenv('FLIPPER_IDLE_TIMEOUT', '0.6'))
+FLIPPER_COMMAND_DEADLINE = float(os.getenv('FLIPPER_COMMAND_DEADLINE', '10'))
+# Seconds a /flipper_monitor snapshot is shared between callers
+FLIPPER_MONITOR_TTL = float(os.getenv('FLIPPER_MONITOR_TTL', '2'))
+# Transfer files over the binary-safe protobuf RPC session (falls back to the text CLI)
+FLIPPER_USE_RPC = os.getenv('FLIPPER_USE_RPC', 'true').lower() in ('1','true','yes')
+# How long each candidate port gets to answer the CLI handshake during connect (probed in parallel)
+FLIPPER_HANDSHAKE_TIMEOUT = float(os.getenv('FLIPPER_HANDSHAKE_TIMEOUT', '0.5'))
+# Seconds a cached directory listing is served before it is refreshed in the background
+FLIPPER_LISTING_TTL = float(os.getenv('FLIPPER_LISTING_TTL', '30'))
+# Local mirror directory for /flipper_backup
+FLIPPER_BACKUP_DIR = os.getenv('FLIPPER_BACKUP_DIR', local_state.state_path('flipper_backup'))
 
 # Auto-connect controls
 AUTO_CONNECT_FLIPPER = os.getenv('AUTO_CONNECT_FLIPPER', 'true').lower() in ('1','true','yes')
 AUTO_CONNECT_PINEAPPLE = os.getenv('AUTO_CONNECT_PINEAPPLE', 'true').lower() in ('1','true','yes')
 AUTO_CONNECT_INTERVAL = int(os.getenv('AUTO_CONNECT_INTERVAL', '10'))  # seconds between checks
+PINEAPPLE_CHECK_INTERVAL = float(os.getenv('PINEAPPLE_CHECK_INTERVAL', str(AUTO_CONNECT_INTERVAL)))
+# Cap on the exponential backoff between checks of a failing device
+SUPERVISOR_MAX_BACKOFF = float(os.getenv('SUPERVISOR_MAX_BACKOFF', '300'))
+# React to serial ports appearing/disappearing (inotify on /dev, enumeration diff elsewhere)
+HOTPLUG_WATCH = os.getenv('HOTPLUG_WATCH', 'true').lower() in ('1','true','yes')
+
+# Address of a device broker (device_broker.py) owning the devices, e.g. unix:/run/badantics.sock or
+# tcp:127.0.0.1:7811; set it when running several web workers. Unset: this process opens the devices itself
+DEVICE_BROKER = os.getenv('DEVICE_BROKER', '')
+
+# Upper bound on commands accepted by one /flipper_batch request
+FLIPPER_BATCH_MAX = int(os.getenv('FLIPPER_BATCH_MAX', '256'))
+
+# Server-side telemetry sampling interval for the /telemetry/stream SSE endpoint
+TELEMETRY_INTERVAL = float(os.getenv('TELEMETRY_INTERVAL', '5'))
 
 PINEAPPLE_URL = os.getenv('PINEAPPLE_URL', 'http://172.16.42.1:1471')
 PINEAPPLE_USERNAME = os.getenv('PINEAPPLE_USER', 'root')
 PINEAPPLE_PASSWORD = os.getenv('PINEAPPLE_PASS', 'your_password_here')
 
-# Internal cache for Pineapple URL probing
-_pineapple_url_last_probe = 0.0
+# Additional Pineapples as a JSON list: [{"name": "lab1", "url": "http://10.0.0.5:1471", "username": "root", "password": "..."}]
+PINEAPPLE_FLEET = os.getenv('PINEAPPLE_FLEET', '')
+# Upper bound on one fan-out call across the Pineapple fleet
+PINEAPPLE_FLEET_TIMEOUT = float(os.getenv('PINEAPPLE_FLEET_TIMEOUT', '30'))
+
+# Pooled keep-alive session shared with device_manager.PineappleDevice
+pineapple_http = get_pineapple_client()
 
 def _probe_pineapple(base_url: str, timeout: float = 3.0) -> bool:
     """Return True if Pineapple API appears reachable at base_url."""
-    try:
-        # status endpoint is lightweight; fallback to root if needed
-        u = f"{base_url}/api/status" if not base_url.endswith('/api/status') else base_url
-        r = requests.get(u, timeout=timeout)
-        return r.status_code == 200 or r.status_code in (401, 403)
-    except Exception:
-        return False
+    return pineapple_http.probe(base_url, timeout=timeout)
 
-def _discover_windows_pineapple_candidates() -> list:
-    """On Windows, parse ipconfig to detect 172.16.X.0/24 USB/RNDIS networks and return likely base URLs.
-    Prefers the classic 172.16.42.1 but also considers any 172.16.<octet>.1 observed.
-    """
-    cands = []
-    try:
-        out = subprocess.check_output(['ipconfig'], text=True, timeout=5, errors='ignore')
-        # Find IPv4 addresses; if any are in 172.16.X.0/24, assume device is 172.16.X.1
-        for m in re.finditer(r'IPv4 Address[^:]*:\s*([0-9]{1,3}(?:\.[0-9]{1,3}){3})', out):
-            ip = m.group(1)
-            try:
-                addr = ipaddress.ip_address(ip)
-                if addr in ipaddress.ip_network('172.16.0.0/16'):
-                    octets = ip.split('.')
-                    base = f"http://{octets[0]}.{octets[1]}.{octets[2]}.1"
-                    if f"{base}:1471" not in cands:
-                        cands.append(f"{base}:1471")
-                    if base not in cands:
-                        cands.append(base)
-            except Exception:
-                continue
-    except Exception:
-        pass
-    # Always include common defaults to try
-    if 'http://172.16.42.1:1471' not in cands:
-        cands.append('http://172.16.42.1:1471')
-    if 'http://172.16.42.1' not in cands:
-        cands.append('http://172.16.42.1')
-    return cands
+# Tracks the live Pineapple base URL; starts from the last-known-good URL persisted on disk
+pineapple_locator = PineappleLocator(PINEAPPLE_URL, _probe_pineapple)
 
 def ensure_pineapple_url(force: bool = False) -> str:
-    """Ensure `PINEAPPLE_URL` points to a reachable Pineapple API. Attempts quick discovery on Windows.
-    Returns the selected base URL (may be unchanged).
+    """Return the current Pineapple base URL without blocking.
+    Schedules a parallel background rediscovery when the last check is stale (or `force`).
     """
-    global PINEAPPLE_URL, _pineapple_url_last_probe
-    now = time.time()
-    if not force and (now - _pineapple_url_last_probe) < 30:
-        return PINEAPPLE_URL
-    # Try the current value first
-    if _probe_pineapple(PINEAPPLE_URL):
-        _pineapple_url_last_probe = now
-        return PINEAPPLE_URL
-    # Build candidate list
-    candidates = []
-    if os.name == 'nt':
-        candidates.extend(_discover_windows_pineapple_candidates())
-    else:
-        candidates.extend(['http://172.16.42.1:1471', 'http://172.16.42.1'])
-    # Probe candidates
-    for base in candidates:
-        if _probe_pineapple(base):
-            with _state_lock:
-                PINEAPPLE_URL = base
-            _pineapple_url_last_probe = now
-            logger.info('Detected Pineapple base URL: %s', base)
-            return base
-    _pineapple_url_last_probe = now
-    return PINEAPPLE_URL
+    return pineapple_locator.refresh_async(force=force)
 
 # Optional: load local config if exists
 if os.path.exists('config.py'):
@@ -113,59 +107,109 @@ if os.path.exists('config.py'):
 # Flipper connection state
 flipper_connected = False
 flipper_ser = None
+# True when the open port answered the CLI handshake (False: best-effort unverified port)
+flipper_verified = False
+# Incremented on every successful connect; caches keyed by it are dropped on reconnect
+_flipper_epoch = 0
+_flipper_static_info = {}
 
-# Pineapple token (global fallback for background worker) and locks
-pineapple_token = None
+# Lock guarding connection state
 _state_lock = __import__('threading').Lock()
+# Serializes I/O on flipper_ser so CLI commands and RPC sessions never interleave
+_serial_lock = __import__('threading').RLock()
+# Serializes connect attempts; port probing happens here rather than under _state_lock
+_connect_lock = __import__('threading').Lock()
+# Single serial-owner thread: interactive > transmit > file ops > telemetry
+flipper_scheduler = SerialScheduler(name='flipper-serial')
+# Thin-client mode: device I/O goes through the broker process instead of local ports/sessions
+device_broker = BrokerClient(DEVICE_BROKER) if DEVICE_BROKER else None
+# Last Flipper status reported by the broker
+_broker_flipper = {}
+
+def _sync_broker_flipper(status):
+    """Mirror the broker's Flipper state; a new broker-side connection drops per-connection caches."""
+    global flipper_connected, flipper_verified, _flipper_epoch, _broker_flipper
+    with _state_lock:
+        if status.get('epoch') != _broker_flipper.get('epoch'):
+            _flipper_epoch += 1
+            _flipper_monitor_cache.invalidate()
+            _flipper_listings.invalidate()
+            _flipper_capabilities.invalidate()
+        _broker_flipper = status
+        flipper_connected = status['connected']
+        flipper_verified = status['verified']
+        return flipper_connected
+
+def flipper_port():
+    """Port of the primary Flipper connection, or None."""
+    if device_broker is not None:
+        return _broker_flipper.get('port') if flipper_connected else None
+    return getattr(flipper_ser, 'port', None) if flipper_ser else None
 
 def connect_flipper():
     """Attempt to open configured FLIPPER_PORT, and if that fails, try to auto-detect serial ports.
-    Returns True on successful open and False otherwise.
+    Probes the firmware's capabilities once connected. Returns True on success and False otherwise.
     """
-    global flipper_ser, flipper_connected
-    import threading
-    with _state_lock:
+    if not _open_flipper():
+        return False
+    flipper_capabilities()
+    return True
+
+def _open_flipper():
+    """Probe candidate ports in parallel (VID/PID filter + CLI handshake) and install the winner.
+    The probe runs under _connect_lock only, so other routes are not blocked on _state_lock meanwhile.
+    """
+    global flipper_ser, flipper_connected, flipper_verified, _flipper_epoch
+    if device_broker is not None:
         try:
-            # If a specific port is configured, try it first
-            try_ports = [FLIPPER_PORT] if FLIPPER_PORT else []
-            # Append all available ports to try auto-detect
-            try:
-                from serial.tools import list_ports
-                for p in list_ports.comports():
-                    # log detailed device metadata when available
-                    try:
-                        logger.debug('Found serial port: %s (vid=%s pid=%s desc=%s)', p.device, getattr(p, 'vid', None), getattr(p, 'pid', None), getattr(p, 'description', None))
-                    except Exception:
-                        logger.debug('Found serial port: %s', getattr(p, 'device', None))
-                    if p.device not in try_ports:
-                        try_ports.append(p.device)
-            except Exception:
-                logger.debug('Could not enumerate serial ports for auto-detect')
-
-            for port in try_ports:
-                if not port:
-                    continue
-                try:
-                    if flipper_ser and flipper_ser.is_open:
-                        flipper_ser.close()
-                    logger.info(f'Trying Flipper on port {port}')
-                    candidate = serial.Serial(port, FLIPPER_BAUD, timeout=FLIPPER_TIMEOUT)
-                    # Optionally perform a quick handshake (non-blocking)
-                    time.sleep(0.1)
-                    if candidate.is_open:
-                        flipper_ser = candidate
-                        flipper_connected = True
-                        logger.info(f"Flipper Zero connected on {port}")
-                        return True
-                except Exception as e:
-                    logger.debug(f"Failed to open {port}: {e}")
-            # If none succeeded
+            return _sync_broker_flipper(device_broker.call('flipper.connect'))
+        except BrokerUnavailable as e:
+            logger.error(f"Flipper connection failed: {e}")
             flipper_connected = False
             return False
+    epoch = _flipper_epoch
+    with _connect_lock:
+        if flipper_connected and _flipper_epoch != epoch:
+            # Another caller connected while we waited
+            return True
+        try:
+            with _serial_lock:
+                if flipper_ser and flipper_ser.is_open:
+                    flipper_ser.close()
+            found = find_flipper(lambda port: serial.Serial(port, FLIPPER_BAUD, timeout=FLIPPER_TIMEOUT),
+                                 preferred=FLIPPER_PORT, exclude=flipper_fleet.ports(),
+                                 handshake_timeout=FLIPPER_HANDSHAKE_TIMEOUT)
         except Exception as e:
             logger.error(f"Flipper connection failed: {e}")
-            flipper_connected = False
-            return False
+            found = None
+        with _state_lock:
+            if found is None:
+                flipper_connected = False
+                return False
+            port, flipper_ser, flipper_verified = found
+            flipper_connected = True
+            _flipper_epoch += 1
+            _flipper_monitor_cache.invalidate()
+            _flipper_listings.invalidate()
+            _flipper_capabilities.invalidate()
+            logger.info(f"Flipper Zero connected on {port}")
+            return True
+
+def disconnect_flipper():
+    """Close the port and drop cached device state (e.g. after the Flipper was unplugged)."""
+    global flipper_connected, flipper_verified
+    with _serial_lock:
+        try:
+            if flipper_ser and flipper_ser.is_open:
+                flipper_ser.close()
+        except Exception:
+            pass
+    with _state_lock:
+        flipper_connected = False
+        flipper_verified = False
+        _flipper_monitor_cache.invalidate()
+        _flipper_listings.invalidate()
+        _flipper_capabilities.invalidate()
 
 # Do not auto-connect on import; connect on-demand when a route needs the device
 
@@ -180,6 +224,12 @@ def with_flipper(func):
                 raise RuntimeError('Flipper Zero not connected')
         try:
             return func(*args, **kwargs)
+        except SchedulerTimeout as e:
+            # The link is busy, not broken: no reconnect
+            logger.warning(f"Flipper request dropped: {e}")
+            if has_request_context():
+                return jsonify({'error': f'Flipper busy: {e}'}), 503
+            raise
         except Exception as e:
             logger.exception("Flipper error during command")
             # Try to reconnect asynchronously to avoid blocking the request
@@ -194,21 +244,52 @@ def with_flipper(func):
     return wrapper
 
 @with_flipper
-def send_flipper_command(command):
-    try:
+def send_flipper_command(command, priority=INTERACTIVE):
+    """Run a CLI command on the serial owner thread, ahead of lower-priority traffic.
+    Identical queued telemetry commands are coalesced into one.
+    """
+    if device_broker is not None:
+        return device_broker.call('flipper.command', command, priority)
+    key = command if priority == TELEMETRY else None
+    return flipper_scheduler.run(lambda: _exec_flipper_command(command), priority, key=key)
+
+def _exec_flipper_command(command):
+    with _serial_lock:
         flipper_ser.reset_input_buffer()
         flipper_ser.write((command + '\r\n').encode())
-        time.sleep(0.6)
-        response = flipper_ser.read(flipper_ser.in_waiting).decode(errors='ignore').strip()
-        return response or 'Command sent.'
-    except Exception:
-        raise
+        raw = read_response(flipper_ser, idle_timeout=FLIPPER_IDLE_TIMEOUT, deadline=FLIPPER_COMMAND_DEADLINE)
+    response = raw.decode(errors='ignore').strip()
+    return response or 'Command sent.'
+
+def _run_flipper_rpc(fn, priority=FILE_OPS):
+    """Run fn(rpc) inside an RPC session on the serial owner thread (in the broker, per operation)."""
+    if device_broker is not None:
+        return fn(device_broker.rpc(priority))
+    def job():
+        with _serial_lock:
+            with rpc_session(flipper_ser, timeout=FLIPPER_COMMAND_DEADLINE) as rpc:
+                return fn(rpc)
+    return flipper_scheduler.run(job, priority)
+
+def _pineapple_login():
+    """POST /api/login against the current base URL; returns (token, expires_in)."""
+    base_url = ensure_pineapple_url()
+    creds = {'username': PINEAPPLE_USERNAME, 'password': PINEAPPLE_PASSWORD}
+    try:
+        return parse_login_response(pineapple_http.post(base_url, '/api/login', json=creds))
+    except Exception as e:
+        logger.error(f"Pineapple login failed: {e}")
+        # Rediscover off the request thread; the next login attempt picks up the new URL
+        ensure_pineapple_url(force=True)
+    return None, None
+
+# Global token shared by request threads and the background worker; one login per expiry/401
+pineapple_tokens = TokenManager(_pineapple_login)
 
 def get_pineapple_token():
     """Return a valid pineapple token.
-    Prefer session token (per-user), otherwise fall back to global token retrieved by the background worker.
+    Prefer session token (per-user), otherwise fall back to the shared global token.
     """
-    global pineapple_token
     # Try session token when a request context exists
     try:
         if 'pineapple_token' in session:
@@ -216,145 +297,222 @@ def get_pineapple_token():
     except RuntimeError:
         # No request context, ignore
         pass
+    return pineapple_tokens.get()
 
-    # Fallback to global token
-    with _state_lock:
-        if pineapple_token:
-            return pineapple_token
-
-    # If nothing yet, try to fetch a token (non-session) and store globally
-    # Ensure base URL is sane before attempting login
-    ensure_pineapple_url()
+def _invalidate_pineapple_token(token):
+    """Forget a token the Pineapple rejected so the next call re-authenticates."""
     try:
-        resp = requests.post(f'{PINEAPPLE_URL}/api/login',
-                             json={'username': PINEAPPLE_USERNAME, 'password': PINEAPPLE_PASSWORD},
-                             timeout=8)
-        if resp.status_code == 200:
-            try:
-                data = resp.json()
-                token = data.get('token')
-                if token:
-                    with _state_lock:
-                        pineapple_token = token
-                    return token
-            except ValueError:
-                logger.error('Pineapple login returned non-JSON response')
-    except Exception as e:
-        logger.error(f"Pineapple login failed: {e}")
-        # Retry once after forced discovery
+        if session.get('pineapple_token') == token:
+            session.pop('pineapple_token', None)
+            return
+    except RuntimeError:
+        pass
+    pineapple_tokens.invalidate(token)
+
+def pineapple_authenticated():
+    """Whether a usable token is already cached; never logs in, so status routes cannot block."""
+    if device_broker is not None:
         try:
-            ensure_pineapple_url(force=True)
-            resp = requests.post(f'{PINEAPPLE_URL}/api/login',
-                                 json={'username': PINEAPPLE_USERNAME, 'password': PINEAPPLE_PASSWORD},
-                                 timeout=8)
-            if resp.status_code == 200:
-                try:
-                    data = resp.json()
-                    token = data.get('token')
-                    if token:
-                        with _state_lock:
-                            pineapple_token = token
-                        return token
-                except ValueError:
-                    logger.error('Pineapple login returned non-JSON response (retry)')
-        except Exception as e2:
-            logger.error('Pineapple forced discovery/login retry failed: %s', e2)
-    return None
-
-def pineapple_api_call(endpoint, method='GET', data=None, timeout=10):
-    token = get_pineapple_token()
-    if not token:
-        return {'error': 'Pineapple authentication failed'}
-    headers = {'Authorization': f'Bearer {token}'}
-    url = f'{PINEAPPLE_URL}{endpoint}'
+            return device_broker.call('pineapple.authenticated')
+        except BrokerUnavailable:
+            return False
     try:
-        resp = requests.request(method, url, headers=headers, json=data, timeout=timeout)
-        try:
-            return resp.json() if resp.status_code == 200 else {'error': f'{resp.status_code}: {resp.text}'}
-        except ValueError:
-            # Return text if not JSON
-            return {'result': resp.text}
-    except requests.Timeout:
-        return {'error': 'Pineapple request timed out'}
-    except requests.ConnectionError:
-        return {'error': 'Cannot reach WiFi Pineapple'}
-    except Exception as e:
-        return {'error': str(e)}
+        if 'pineapple_token' in session:
+            return True
+    except RuntimeError:
+        pass
+    return bool(pineapple_tokens.token)
+
+# Last successful GET payload per endpoint, served while the circuit to the Pineapple is open
+_pineapple_last_good = {}
 
-# Background auto-connect worker
+def _pineapple_unavailable(endpoint, method, retry_in):
+    cached = _pineapple_last_good.get(endpoint) if method == 'GET' else None
+    if cached is None:
+        return {'error': 'WiFi Pineapple unavailable', 'retry_in': round(retry_in, 1)}
+    fetched_at, payload = cached
+    if isinstance(payload, dict):
+        payload = dict(payload, stale=True, stale_age=round(time.monotonic() - fetched_at, 1))
+    return payload
 
-def _auto_connect_worker():
-    """Background loop that periodically attempts to connect to the Flipper and Pineapple when disabled.
-    Runs as a daemon thread and respects the AUTO_CONNECT_* flags.
+def pineapple_api_call(endpoint, method='GET', data=None, timeout=None):
+    """Call the Pineapple API. While its circuit breaker is open the call fails fast,
+    returning the last good response for GETs (marked stale) or an error.
     """
-    logger.info('Auto-connect worker started (interval=%s)', AUTO_CONNECT_INTERVAL)
-    while True:
+    if device_broker is not None:
+        try:
+            return device_broker.call('pineapple.api_call', endpoint, method, data)
+        except BrokerUnavailable as e:
+            return {'error': str(e)}
+    breaker = pineapple_http.breaker(pineapple_locator.url)
+    if breaker.rejecting():
+        return _pineapple_unavailable(endpoint, method, breaker.retry_in())
+    for attempt in range(2):
+        token = get_pineapple_token()
+        if not token:
+            return {'error': 'Pineapple authentication failed'}
+        headers = {'Authorization': f'Bearer {token}'}
         try:
-            if AUTO_CONNECT_FLIPPER and not flipper_connected:
-                logger.debug('Auto-connect: attempting flipper connection')
-                connect_flipper()
-            if AUTO_CONNECT_PINEAPPLE:
-                # Refresh URL and try to get a token and store globally
-                try:
-                    ensure_pineapple_url()
-                except Exception:
-                    pass
-                t = None
-                try:
-                    t = get_pineapple_token()
-                except Exception:
-                    t = None
-                if t:
-                    logger.debug('Auto-connect: pineapple auth succeeded')
-            time.sleep(AUTO_CONNECT_INTERVAL)
+            resp = pineapple_http.request(method, pineapple_locator.url, endpoint, headers=headers, json=data, timeout=timeout)
+        except CircuitOpenError as e:
+            return _pineapple_unavailable(endpoint, method, e.retry_in)
+        except requests.Timeout:
+            return {'error': 'Pineapple request timed out'}
+        except requests.ConnectionError:
+            return {'error': 'Cannot reach WiFi Pineapple'}
         except Exception as e:
-            logger.error('Auto-connect worker error: %s', e)
-            time.sleep(max(1, AUTO_CONNECT_INTERVAL))
+            return {'error': str(e)}
+        if resp.status_code in (401, 403) and attempt == 0:
+            # Token expired or revoked: refresh once and replay
+            _invalidate_pineapple_token(token)
+            continue
+        if resp.status_code != 200:
+            return {'error': f'{resp.status_code}: {resp.text}'}
+        try:
+            result = resp.json()
+        except ValueError:
+            # Return text if not JSON
+            result = {'result': resp.text}
+        if method == 'GET':
+            _pineapple_last_good[endpoint] = (time.monotonic(), result)
+        return result
 
+# Background supervisor: one task per device with its own cadence, backoff and health state
 
-# Ensure background worker is started once (use before_request guard for compatibility)
-_auto_worker_started = False
-@app.before_request
-def _start_auto_connect():
-    global _auto_worker_started
-    if _auto_worker_started:
-        return None
-    # Start the worker only if either auto-connect flag is enabled
-    if not (AUTO_CONNECT_FLIPPER or AUTO_CONNECT_PINEAPPLE):
+def _supervise_flipper():
+    """Healthy while the port is open; otherwise reconnect. Hotplug events wake this check,
+    failed attempts are retried under the task's backoff."""
+    if flipper_connected and flipper_ser is not None and flipper_ser.is_open:
+        return True
+    return connect_flipper()
+
+def _supervise_pineapple():
+    """Refresh the URL (parallel probe) and make sure a token is available."""
+    pineapple_locator.discover()
+    return bool(get_pineapple_token())
+
+supervisor = Supervisor(name='device-supervisor')
+supervisor.add('flipper', _supervise_flipper, interval=AUTO_CONNECT_INTERVAL, max_backoff=SUPERVISOR_MAX_BACKOFF,
+               enabled=AUTO_CONNECT_FLIPPER)
+supervisor.add('pineapple', _supervise_pineapple, interval=PINEAPPLE_CHECK_INTERVAL,
+               max_backoff=SUPERVISOR_MAX_BACKOFF, enabled=AUTO_CONNECT_PINEAPPLE)
+
+_background_started = False
+
+def start_background_services():
+    """Start the hotplug watcher and device supervisor (idempotent). Called at startup;
+    WSGI servers get it through create_app()."""
+    global _background_started
+    if _background_started:
+        return
+    _background_started = True
+    if device_broker is not None:
+        # The broker owns the ports and sessions and runs its own hotplug handling
+        logger.info(f"Using device broker at {DEVICE_BROKER}")
+        return
+    if HOTPLUG_WATCH:
+        serial_watcher.start()
+        logger.info('Serial hotplug watcher started')
+    if AUTO_CONNECT_FLIPPER or AUTO_CONNECT_PINEAPPLE:
+        supervisor.start()
+        logger.info('Device supervisor started')
+    else:
         logger.info('Auto-connect disabled by configuration')
-        _auto_worker_started = True
-        return None
-    import threading
-    worker = threading.Thread(target=_auto_connect_worker, daemon=True, name='auto-connect')
-    worker.start()
-    _auto_worker_started = True
-    return None
+
+def create_app():
+    """WSGI entry point that also starts the background services, e.g. `gunicorn 'app:create_app()'`."""
+    start_background_services()
+    return app
+
+@app.route('/status/supervisor')
+def status_supervisor():
+    return jsonify(supervisor.status())
+
+# Serial hotplug: connect/disconnect as soon as ports come and go
+
+def _on_serial_hotplug(added, removed):
+    gone = {p['device'] for p in removed}
+    current = flipper_port()
+    if current in gone:
+        logger.info(f"Flipper on {current} unplugged")
+        disconnect_flipper()
+        supervisor.wake('flipper')
+    flipper_fleet.disconnect_ports(gone)
+    candidates = [p for p in added if classify(p) != 'other']
+    if not candidates:
+        return
+    if not flipper_connected:
+        # Reconnect now; if the CDC interface is not ready yet the supervisor's backoff retries
+        supervisor.wake('flipper')
+    if len(flipper_fleet):
+        flipper_fleet.scan(exclude=[flipper_port() if flipper_connected else None])
+
+serial_watcher = HotplugWatcher(_on_serial_hotplug)
 
 # Utility: list serial devices with metadata
 def list_serial_devices():
-    out = []
-    try:
-        from serial.tools import list_ports
-        for p in list_ports.comports():
-            out.append({
-                'device': getattr(p, 'device', None),
-                'vid': getattr(p, 'vid', None),
-                'pid': getattr(p, 'pid', None),
-                'description': getattr(p, 'description', None),
-                'manufacturer': getattr(p, 'manufacturer', None)
-            })
-    except Exception:
-        logger.debug('Could not enumerate serial ports')
-    return out
+    """Serial ports with USB metadata; served from the hotplug cache while the watcher runs."""
+    ports = serial_watcher.ports() if serial_watcher.running else enumerate_ports()
+    return [{key: p.get(key) for key in ('device', 'vid', 'pid', 'description', 'manufacturer')} for p in ports]
+
 
+# Additional Flippers (e.g. on a USB hub), each on its own port and serial-owner thread
+flipper_fleet = FlipperFleet(lambda port: FlipperDevice(
+    port=port, baud=FLIPPER_BAUD, timeout=FLIPPER_TIMEOUT, idle_timeout=FLIPPER_IDLE_TIMEOUT,
+    command_deadline=FLIPPER_COMMAND_DEADLINE, monitor_ttl=FLIPPER_MONITOR_TTL,
+    use_rpc=FLIPPER_USE_RPC, listing_ttl=FLIPPER_LISTING_TTL, auto_detect=False))
 
 # Status/devices endpoint
 @app.route('/status/devices')
 def status_devices():
     devices = list_serial_devices()
-    connected_port = getattr(flipper_ser, 'port', None) if flipper_ser else None
-    pineapple_ok = bool(get_pineapple_token())
-    return jsonify({'devices': devices, 'flipper_connected_port': connected_port, 'pineapple_authenticated': pineapple_ok})
+    connected_port = flipper_port()
+    pineapple_ok = pineapple_authenticated()
+    return jsonify({'devices': devices, 'flipper_connected_port': connected_port, 'flipper_verified': flipper_verified,
+                    'pineapple_authenticated': pineapple_ok, 'flippers': flipper_fleet.status()})
+
+def _fleet_targets():
+    """Device ids selected by ?devices=a,b (or JSON "devices"); None means the whole fleet."""
+    data = request.get_json(silent=True) if request.is_json else None
+    ids = (data or {}).get('devices') if isinstance(data, dict) else None
+    if ids is None and request.args.get('devices'):
+        ids = [i for i in request.args['devices'].split(',') if i]
+    return list(ids) if ids is not None else None
+
+@app.route('/fleet/scan', methods=['POST'])
+def fleet_scan():
+    """Attach every Flipper port not already in use by the primary connection or the fleet."""
+    primary = flipper_port() if flipper_connected else None
+    added = flipper_fleet.scan(exclude=[primary])
+    return jsonify({'added': added, 'devices': flipper_fleet.status()})
+
+@app.route('/fleet/batch', methods=['POST'])
+def fleet_batch():
+    data = request.get_json(silent=True)
+    commands, error = _parse_batch_commands(data)
+    if error:
+        return jsonify({'error': error}), 400
+    results = flipper_fleet.send_batch(commands, device_ids=_fleet_targets(),
+                                       stop_on_error=bool(data.get('stop_on_error')))
+    return jsonify({'ok': all(r['ok'] and r['result']['ok'] for r in results.values()), 'results': results})
+
+@app.route('/fleet/fs/list')
+def fleet_fs_list():
+    path = request.args.get('path', '/ext').strip() or '/ext'
+    results = flipper_fleet.list_entries(path, device_ids=_fleet_targets())
+    return jsonify({'path': path, 'ok': all(r['ok'] for r in results.values()), 'results': results})
+
+@app.route('/fleet/fs/read')
+def fleet_fs_read():
+    path = request.args.get('path', '').strip()
+    if not path:
+        return jsonify({'error': 'Path required'}), 400
+    results = flipper_fleet.read_file_bytes(path, device_ids=_fleet_targets())
+    for outcome in results.values():
+        if outcome.get('ok'):
+            data = outcome.pop('result')
+            outcome.update(size=len(data), content_base64=base64.b64encode(data).decode('ascii'))
+    return jsonify({'path': path, 'ok': all(r['ok'] for r in results.values()), 'results': results})
 
 
 # Routes
@@ -364,31 +522,42 @@ def home():
 
 @app.route('/flipper')
 def flipper():
+    if not flipper_connected:
+        connect_flipper()
     return render_template('flipper.html', connected=flipper_connected)
 
 @app.route('/pineapple')
 def pineapple():
-    return render_template('pineapple.html', connected=bool(get_pineapple_token()))
+    return render_template('pineapple.html', connected=pineapple_authenticated())
 
-@app.route('/flipper_monitor')
-def flipper_monitor():
-    if not flipper_connected:
-        return jsonify({'error': 'Not connected', 'connected': False})
+def _monitor_command(command: str, priority: int = TELEMETRY) -> str:
+    """Run a monitor command; raise instead of returning an HTTP error tuple from with_flipper"""
+    out = send_flipper_command(command, priority=priority)
+    if not isinstance(out, str):
+        raise RuntimeError(f'{command} failed')
+    return out
 
+def _collect_flipper_monitor() -> dict:
+    """Run the monitor commands once; `info device` is reused until the next (re)connect."""
+    global _flipper_static_info
     error_msg = None
     # Gather raw responses
+    epoch = _flipper_epoch
+    info_raw = _flipper_static_info.get(epoch)
+    if info_raw is None:
+        try:
+            info_raw = _monitor_command('info device')
+            _flipper_static_info = {epoch: info_raw}
+        except Exception as e:
+            info_raw = ''
+            error_msg = str(e)
     try:
-        info_raw = send_flipper_command('info device') or ''
-    except Exception as e:
-        info_raw = ''
-        error_msg = str(e)
-    try:
-        uptime_raw = send_flipper_command('uptime') or ''
+        uptime_raw = _monitor_command('uptime')
     except Exception as e:
         uptime_raw = ''
         error_msg = error_msg or str(e)
     try:
-        memory_raw = send_flipper_command('free') or ''
+        memory_raw = _monitor_command('free')
     except Exception as e:
         memory_raw = ''
         error_msg = error_msg or str(e)
@@ -398,10 +567,11 @@ def flipper_monitor():
 
     result = {
         'connected': True,
-        'port': getattr(flipper_ser, 'port', None) if flipper_ser else None,
+        'port': flipper_port(),
         'info': info_lines,
-        'uptime': uptime_raw.strip() if isinstance(uptime_raw, str) else uptime_raw,
-        'memory': memory_raw.strip() if isinstance(memory_raw, str) else memory_raw,
+        'uptime': uptime_raw.strip(),
+        'memory': memory_raw.strip(),
+        **monitor_fields(info_raw, uptime_raw, memory_raw),
         'last_updated': datetime.utcnow().isoformat() + 'Z',
         'raw': {
             'info': info_raw,
@@ -413,14 +583,126 @@ def flipper_monitor():
     if error_msg:
         result['error'] = error_msg
 
-    return jsonify(result)
+    return result
+
+def _probe_command(command: str) -> str:
+    """Run a probe command on the open port. Unlike send_flipper_command this never (re)connects:
+    the probe runs from inside connect_flipper and must not re-enter it."""
+    if device_broker is not None:
+        return device_broker.call('flipper.command', command, FILE_OPS)
+    if not flipper_connected or flipper_ser is None:
+        raise RuntimeError('Flipper Zero not connected')
+    return flipper_scheduler.run(lambda: _exec_flipper_command(command), FILE_OPS)
+
+def _probe_flipper_capabilities() -> dict:
+    """Probe dialect/firmware for the current connection; also seeds the monitor's `info device`."""
+    global _flipper_static_info
+    epoch = _flipper_epoch
+    caps = probe_capabilities(_probe_command)
+    if caps['info']:
+        _flipper_static_info = {epoch: '\n'.join(caps['info'])}
+    return caps
+
+# Firmware capabilities, probed once per connection (invalidated in _open_flipper)
+_flipper_capabilities = SnapshotCache(_probe_flipper_capabilities, ttl=float('inf'))
+
+def flipper_capabilities() -> dict:
+    """Cached capabilities of the connected Flipper; the stock dialect if probing failed."""
+    try:
+        return _flipper_capabilities.get()
+    except Exception as e:
+        logger.error(f"Flipper capability probe failed: {e}")
+        return {'dialect': 'storage', 'commands': dict(COMMAND_DIALECTS['storage'])}
+
+def _fs_command(op: str, path: str) -> str:
+    """The single CLI command for a file operation in the device's dialect."""
+    return flipper_capabilities()['commands'][op].format(path=path)
+
+# Concurrent and near-simultaneous /flipper_monitor requests share one collection
+_flipper_monitor_cache = SnapshotCache(_collect_flipper_monitor, ttl=FLIPPER_MONITOR_TTL,
+                                       should_cache=lambda r: 'error' not in r)
+
+@app.route('/flipper_monitor')
+def flipper_monitor():
+    if not flipper_connected:
+        return jsonify({'error': 'Not connected', 'connected': False})
+    force = request.args.get('refresh', '').lower() in ('1', 'true', 'yes')
+    snapshot = _flipper_monitor_cache.get(force=force)
+    if request.args.get('compact', '').lower() in ('1', 'true', 'yes'):
+        # Typed fields only: drop the raw command output the text fields already repeat
+        snapshot = {k: v for k, v in snapshot.items() if k != 'raw'}
+    return jsonify(snapshot)
+
+@app.route('/flipper_storage_info')
+def flipper_storage_info():
+    """Label, filesystem type and total/free bytes of /ext or /int."""
+    path = request.args.get('path', '/ext').strip() or '/ext'
+    if path not in ('/ext', '/int'):
+        return jsonify({'error': 'path must be /ext or /int'}), 400
+    out = send_flipper_command(f'storage info {path}', priority=TELEMETRY)
+    if isinstance(out, tuple):
+        return out
+    info = parse_storage_info(out)
+    if info['total_bytes'] is None:
+        return jsonify({'error': 'Unexpected storage info output', 'raw': out}), 502
+    return jsonify({'path': path, **info})
+
+@app.route('/flipper_capabilities')
+def flipper_capabilities_route():
+    if not flipper_connected and not connect_flipper():
+        return jsonify({'error': 'Not connected', 'connected': False})
+    return jsonify(flipper_capabilities())
+
+@app.route('/flipper_scheduler')
+def flipper_scheduler_stats():
+    """Serial queue depth and per-class wait/expiry counters."""
+    if device_broker is not None:
+        return jsonify(device_broker.call('flipper.scheduler'))
+    return jsonify(flipper_scheduler.stats())
 
 @app.route('/flipper_command', methods=['POST'])
 def flipper_command():
     cmd = request.form.get('command', '').strip()
     if not cmd:
         return jsonify({'error': 'Empty command'})
-    return jsonify({'result': send_flipper_command(cmd)})
+    res = send_flipper_command(cmd)
+    if isinstance(res, tuple):
+        return res
+    return jsonify({'result': res})
+
+@with_flipper
+def send_flipper_batch(commands, stop_on_error=False):
+    """Run commands back-to-back in one scheduler job and one serial lock acquisition."""
+    if device_broker is not None:
+        return device_broker.call('flipper.batch', commands, stop_on_error=stop_on_error)
+    def job():
+        with _serial_lock:
+            return run_batch(_exec_flipper_command, commands, stop_on_error=stop_on_error)
+    return flipper_scheduler.run(job, INTERACTIVE)
+
+def _parse_batch_commands(data):
+    """Validate a batch payload; returns (commands, error)."""
+    if not isinstance(data, dict):
+        return None, 'Invalid or missing JSON payload'
+    commands = data.get('commands')
+    if not isinstance(commands, list) or not commands:
+        return None, 'commands must be a non-empty list'
+    if len(commands) > FLIPPER_BATCH_MAX:
+        return None, f'At most {FLIPPER_BATCH_MAX} commands per batch'
+    if not all(isinstance(c, str) and c.strip() for c in commands):
+        return None, 'Every command must be a non-empty string'
+    return [c.strip() for c in commands], None
+
+@app.route('/flipper_batch', methods=['POST'])
+def flipper_batch():
+    data = request.get_json(silent=True)
+    commands, error = _parse_batch_commands(data)
+    if error:
+        return jsonify({'error': error}), 400
+    res = send_flipper_batch(commands, stop_on_error=bool(data.get('stop_on_error')))
+    if isinstance(res, tuple):
+        return res
+    return jsonify(res)
 
 @app.route('/flipper_subghz_tx', methods=['POST'])
 def flipper_subghz_tx():
@@ -453,7 +735,9 @@ def flipper_subghz_tx():
         return jsonify({'error': 'Unknown action'}), 400
 
     try:
-        res = send_flipper_command(cmd)
+        res = send_flipper_command(cmd, priority=TRANSMIT)
+        if isinstance(res, tuple):
+            return res
         return jsonify({'result': res})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -472,60 +756,170 @@ def pineapple_notifications():
 
 @app.route('/pineapple_settings', methods=['POST'])
 def pineapple_settings():
+    """Push settings to the default Pineapple, or with ?units=a,b (or all) to fleet units in parallel."""
+    if request.args.get('units'):
+        return jsonify(_pineapple_fleet_call('/api/pineap/settings', 'PUT', request.json))
     return jsonify(pineapple_api_call('/api/pineap/settings', 'PUT', request.json))
 
+# Pineapple fleet: every unit has its own pooled client and token
+pineapple_fleet = PineappleFleet(timeout=PINEAPPLE_FLEET_TIMEOUT)
+if PINEAPPLE_FLEET:
+    try:
+        pineapple_fleet.load(json.loads(PINEAPPLE_FLEET))
+    except ValueError as e:
+        logger.error(f"Invalid PINEAPPLE_FLEET configuration: {e}")
+
+def _pineapple_fleet_call(endpoint, method='GET', data=None):
+    """Fan out to the units selected by ?units=a,b (default or 'all': every unit)."""
+    units = request.args.get('units', 'all')
+    names = None if units == 'all' else [u for u in units.split(',') if u]
+    results = pineapple_fleet.api_call(endpoint, method, data, names=names)
+    return {'ok': all(r['ok'] for r in results.values()), 'results': results}
+
+@app.route('/pineapple_fleet', methods=['GET', 'POST'])
+def pineapple_fleet_units():
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        name, url = str(data.get('name', '')).strip(), str(data.get('url', '')).strip()
+        if not name or not url.startswith(('http://', 'https://')):
+            return jsonify({'error': 'name and an http(s) url are required'}), 400
+        pineapple_fleet.add(name, url, data.get('username', 'root'), data.get('password', ''))
+    return jsonify({'units': pineapple_fleet.describe()})
+
+@app.route('/pineapple_fleet/<name>', methods=['DELETE'])
+def pineapple_fleet_remove(name):
+    if not pineapple_fleet.remove(name):
+        return jsonify({'error': 'Unknown unit'}), 404
+    return jsonify({'units': pineapple_fleet.describe()})
+
+@app.route('/pineapple_fleet/status')
+def pineapple_fleet_status():
+    return jsonify(_pineapple_fleet_call('/api/status'))
+
+@app.route('/pineapple_fleet/notifications')
+def pineapple_fleet_notifications():
+    return jsonify(_pineapple_fleet_call('/api/notifications'))
+
+@app.route('/pineapple_fleet/logs')
+def pineapple_fleet_logs():
+    return jsonify(_pineapple_fleet_call('/api/pineap/log'))
+
+# Live telemetry: one sampler for all connected browsers
+def _flipper_telemetry() -> dict:
+    if not flipper_connected:
+        return {'connected': False, 'error': 'Not connected'}
+    return _flipper_monitor_cache.get()
+
+telemetry_hub = TelemetryHub(interval=TELEMETRY_INTERVAL)
+telemetry_hub.add_source('flipper', _flipper_telemetry)
+telemetry_hub.add_source('pineapple_status', lambda: pineapple_api_call('/api/status'))
+telemetry_hub.add_source('pineapple_notifications', lambda: pineapple_api_call('/api/notifications'))
+
+@app.route('/telemetry/stream')
+def telemetry_stream():
+    """Server-Sent Events stream: a full snapshot on connect, then per-channel deltas."""
+    channels = [c.strip() for c in request.args.get('channels', '').split(',') if c.strip()]
+    unknown = [c for c in channels if c not in telemetry_hub.channels]
+    if unknown:
+        return jsonify({'error': f'Unknown channels: {", ".join(unknown)}'}), 400
+    sub = telemetry_hub.subscribe(channels or None)
+    return Response(telemetry_hub.stream(sub), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/status/pineapple_network')
 def pineapple_network_status():
     """Diagnostics for Pineapple network auto-discovery and reachability."""
-    ensure_pineapple_url()
-    reachable = _probe_pineapple(PINEAPPLE_URL)
-    return jsonify({'pineapple_url': PINEAPPLE_URL, 'reachable': reachable})
+    base_url = ensure_pineapple_url()
+    reachable = _probe_pineapple(base_url)
+    return jsonify({'pineapple_url': base_url, 'reachable': reachable,
+                    'circuit': pineapple_http.breaker(base_url).status()})
 
 # Flipper FS helpers and endpoints
-def _try_fs_list(path: str) -> str:
-    for cmd in [f'storage list {path}', f'ls {path}', 'storage list', 'ls']:
+def _try_fs_list(path: str):
+    """Typed listing of `path`, or None if the device could not list it."""
+    if not flipper_connected and not connect_flipper():
+        return None
+    if FLIPPER_USE_RPC:
         try:
-            out = send_flipper_command(cmd)
-            if out and isinstance(out, str) and out.strip():
-                return out
-        except Exception:
-            continue
-    return ''
+            return sort_entries(_run_flipper_rpc(lambda rpc: rpc.list(path)))
+        except SchedulerTimeout:
+            return None
+        except RPCError as e:
+            if e.status is not None:
+                return None
+            logger.warning('RPC list failed, falling back to CLI: %s', e)
+        except Exception as e:
+            logger.warning('RPC list failed, falling back to CLI: %s', e)
+    try:
+        out = send_flipper_command(_fs_command('list', path), priority=FILE_OPS)
+    except Exception:
+        return None
+    return parse_storage_list(out) if isinstance(out, str) else None
+
+# Directory listings per path; keyed by connection epoch so a reconnect never serves old data
+_flipper_listings = ListingCache(_try_fs_list, lambda: _flipper_epoch, ttl=FLIPPER_LISTING_TTL)
 
 def _try_fs_read(path: str) -> str:
-    for cmd in [f'storage read {path}', f'cat {path}']:
+    if not flipper_connected and not connect_flipper():
+        return ''
+    try:
+        out = send_flipper_command(_fs_command('read', path), priority=FILE_OPS)
+    except Exception:
+        return ''
+    return out if out and isinstance(out, str) else ''
+
+def _read_file_bytes(path: str):
+    """Read a file byte-for-byte over RPC when enabled; returns None on failure."""
+    if not flipper_connected and not connect_flipper():
+        return None
+    if FLIPPER_USE_RPC:
         try:
-            out = send_flipper_command(cmd)
-            if out and isinstance(out, str):
-                return out
-        except Exception:
-            continue
-    return ''
+            return _run_flipper_rpc(lambda rpc: rpc.read_file(path))
+        except SchedulerTimeout as e:
+            logger.warning('RPC read of %s dropped: %s', path, e)
+            return None
+        except RPCError as e:
+            if e.status is not None:
+                logger.error('RPC read of %s failed: %s', path, e)
+                return None
+            logger.warning('RPC transport failed, falling back to CLI: %s', e)
+        except Exception as e:
+            logger.warning('RPC read failed, falling back to CLI: %s', e)
+    out = _try_fs_read(path)
+    return out.encode() if out else None
 
 def _try_fs_delete(path: str) -> str:
-    for cmd in [f'storage delete {path}', f'rm {path}']:
-        try:
-            out = send_flipper_command(cmd)
-            if out and isinstance(out, str):
-                return out
-        except Exception:
-            continue
-    return ''
+    if not flipper_connected and not connect_flipper():
+        return ''
+    try:
+        out = send_flipper_command(_fs_command('delete', path), priority=FILE_OPS)
+    except Exception:
+        return ''
+    return out if out and isinstance(out, str) else ''
 
 @app.route('/flipper_fs/list')
 def flipper_fs_list():
     path = request.args.get('path', '/ext').strip() or '/ext'
-    out = _try_fs_list(path)
-    entries = [line.strip() for line in out.splitlines() if line.strip()] if out else []
-    return jsonify({'path': path, 'entries': entries, 'raw': out})
+    force = request.args.get('refresh', '').lower() in ('1', 'true', 'yes')
+    listing = _flipper_listings.get(path, force=force)
+    if listing['entries'] is None:
+        return jsonify({'path': path, 'entries': [], 'error': 'Listing failed or unsupported'})
+    return jsonify({'path': path, 'entries': listing['entries'], 'cached': listing['cached'], 'age': listing['age']})
 
 @app.route('/flipper_fs/read')
 def flipper_fs_read():
     path = request.args.get('path', '').strip()
     if not path:
         return jsonify({'error': 'Path required'}), 400
-    out = _try_fs_read(path)
-    return jsonify({'path': path, 'content': out})
+    data = _read_file_bytes(path)
+    if data is None:
+        return jsonify({'path': path, 'content': ''})
+    try:
+        return jsonify({'path': path, 'content': data.decode('utf-8'), 'size': len(data)})
+    except UnicodeDecodeError:
+        # Binary file: keep a lossy preview but also ship the exact bytes
+        return jsonify({'path': path, 'content': data.decode('utf-8', errors='replace'), 'size': len(data),
+                        'binary': True, 'content_base64': base64.b64encode(data).decode('ascii')})
 
 @app.route('/flipper_fs/delete', methods=['POST'])
 def flipper_fs_delete():
@@ -533,21 +927,138 @@ def flipper_fs_delete():
     path = str(data.get('path', '')).strip()
     if not path:
         return jsonify({'error': 'Path required'}), 400
-    out = _try_fs_delete(path)
+    try:
+        out = _try_fs_delete(path)
+    finally:
+        _flipper_listings.invalidate_entry(path)
     if not out:
         return jsonify({'error': 'Delete failed or unsupported'}), 500
     return jsonify({'path': path, 'result': out})
 
+def _open_rpc_stream(path: str):
+    """Start streaming a file over RPC. Returns (stat_info, chunk_iterator).
+    The serial lock and RPC session stay held until the iterator is exhausted or closed.
+    """
+    stack = ExitStack()
+    stack.enter_context(_serial_lock)
+    try:
+        rpc = stack.enter_context(rpc_session(flipper_ser, timeout=FLIPPER_COMMAND_DEADLINE))
+        info = rpc.stat(path)
+    except BaseException:
+        stack.close()
+        raise
+
+    return info, _ClosingStream(rpc.iter_read(path), stack.close)
+
+class _ClosingStream:
+    """Iterable that runs `on_close` when exhausted or closed, even if never iterated."""
+
+    def __init__(self, chunks, on_close):
+        self._chunks = chunks
+        self._on_close = on_close
+
+    def __iter__(self):
+        try:
+            yield from self._chunks
+        finally:
+            self.close()
+
+    def close(self):
+        if self._on_close is not None:
+            on_close, self._on_close = self._on_close, None
+            on_close()
+
+def _gzip_stream(chunks, level: int = 6):
+    comp = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = comp.compress(chunk)
+        if out:
+            yield out
+    yield comp.flush()
+
 @app.route('/flipper_fs/download')
 def flipper_fs_download():
     path = request.args.get('path', '').strip()
     if not path:
         return jsonify({'error': 'Path required'}), 400
-    content = _try_fs_read(path)
-    if content == '':
-        return jsonify({'error': 'Read failed'}), 500
     filename = path.split('/')[-1] or 'flipper_file.txt'
-    return Response(content, headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+    headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+    # Through the broker files arrive whole, so only the buffered path below applies
+    if FLIPPER_USE_RPC and device_broker is None and (flipper_connected or connect_flipper()):
+        try:
+            info, chunks = _open_rpc_stream(path)
+        except RPCError as e:
+            if e.status == 7:
+                return jsonify({'error': 'File not found'}), 404
+            logger.warning('RPC download of %s failed, falling back to CLI: %s', path, e)
+        else:
+            wants_gzip = request.args.get('gzip', '').lower() in ('1', 'true', 'yes') \
+                and 'gzip' in request.headers.get('Accept-Encoding', '')
+            if wants_gzip:
+                headers['Content-Encoding'] = 'gzip'
+                body = _ClosingStream(_gzip_stream(chunks), chunks.close)
+            else:
+                if info and info.get('size') is not None:
+                    headers['Content-Length'] = str(info['size'])
+                body = chunks
+            return Response(body, mimetype='application/octet-stream', headers=headers, direct_passthrough=True)
+    # Text CLI fallback: buffered, as the CLI gives no framing to stream on
+    content = _read_file_bytes(path)
+    if content is None:
+        return jsonify({'error': 'Read failed'}), 500
+    return Response(content, mimetype='application/octet-stream', headers=headers)
+
+# Incremental backup of Flipper storage into a local mirror
+class _AppFlipperLink:
+    """Exposes the app's global serial port through the FlipperDevice interface BackupJob expects."""
+
+    @property
+    def connected(self):
+        return flipper_connected
+
+    def connect(self):
+        return connect_flipper()
+
+    def disconnect(self):
+        disconnect_flipper()
+
+    @contextmanager
+    def rpc_session(self):
+        if device_broker is not None:
+            yield device_broker.rpc()
+            return
+        with _serial_lock:
+            with rpc_session(flipper_ser, timeout=FLIPPER_COMMAND_DEADLINE) as rpc:
+                yield rpc
+
+_backup_job = None
+
+@app.route('/flipper_backup', methods=['POST'])
+def flipper_backup_start():
+    global _backup_job
+    data = request.get_json(silent=True) or {}
+    root = str(data.get('root', '/ext')).strip() or '/ext'
+    with _state_lock:
+        if _backup_job and _backup_job.is_running():
+            return jsonify({'error': 'Backup already running', 'status': _backup_job.status()}), 409
+        _backup_job = BackupJob(_AppFlipperLink(), FLIPPER_BACKUP_DIR, root=root, prune=bool(data.get('prune')))
+        _backup_job.start()
+    return jsonify(_backup_job.status()), 202
+
+@app.route('/flipper_backup/status')
+def flipper_backup_status():
+    if not _backup_job:
+        return jsonify({'state': 'idle'})
+    return jsonify(_backup_job.status())
+
+@app.route('/flipper_backup/cancel', methods=['POST'])
+def flipper_backup_cancel():
+    if _backup_job and _backup_job.is_running():
+        _backup_job.cancel()
+    return jsonify(_backup_job.status() if _backup_job else {'state': 'idle'})
 
 if __name__ == '__main__':
+    # With the debug reloader only the serving child process (WERKZEUG_RUN_MAIN) owns the devices
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_services()
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
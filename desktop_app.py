@@ -4,22 +4,32 @@ A native Windows desktop app for managing Flipper Zero and WiFi Pineapple
 """
 
 import sys
+import os
+import json
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional
 import threading
 import time
 
+# Reference point for STARTUP_PROFILE's time-to-first-window
+_STARTED = time.perf_counter()
+
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QTabWidget, QPushButton, QLabel, QLineEdit, QTextEdit, QMessageBox,
     QComboBox, QSpinBox, QCheckBox, QStatusBar, QProgressBar, QTableWidget,
-    QTableWidgetItem, QFileDialog, QDialog, QDialogButtonBox
+    QTableWidgetItem, QFileDialog, QDialog, QDialogButtonBox, QTreeView, QHeaderView
+)
+from PyQt6.QtCore import (
+    Qt, QTimer, pyqtSignal, QObject, QThread, QRunnable, QThreadPool,
+    QAbstractItemModel, QModelIndex, QSortFilterProxyModel
 )
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QObject, QThread
 from PyQt6.QtGui import QFont, QColor, QIcon
 
 from device_manager import FlipperDevice, PineappleDevice
+from flipper_probe import classify
+from hotplug import HotplugWatcher, enumerate_ports
 
 # Configure logging
 logging.basicConfig(
@@ -29,6 +39,329 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+class JobSignals(QObject):
+    """Signals of one DeviceJob; delivered on the GUI thread"""
+    
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class DeviceJob(QRunnable):
+    """Runs one blocking device call on the thread pool"""
+    
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = JobSignals()
+    
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            logger.error(f"Device job failed: {e}")
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
+
+
+class DeviceJobs(QObject):
+    """Thread pool for device I/O so the GUI thread only ever renders results"""
+    
+    def __init__(self, max_threads: int = 4):
+        super().__init__()
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(max_threads)
+        # Keeps jobs (and their signal objects) alive until their result has been delivered
+        self._active = set()
+    
+    def run(self, fn, *args, on_done=None, on_error=None, **kwargs) -> DeviceJob:
+        """Run fn(*args, **kwargs) off the GUI thread; on_done(result) / on_error(message) run on it"""
+        job = DeviceJob(fn, *args, **kwargs)
+        job.setAutoDelete(False)
+        self._active.add(job)
+        if on_done:
+            job.signals.finished.connect(on_done)
+        if on_error:
+            job.signals.failed.connect(on_error)
+        job.signals.finished.connect(lambda _: self._active.discard(job))
+        job.signals.failed.connect(lambda _: self._active.discard(job))
+        self.pool.start(job)
+        return job
+    
+    def wait(self, msecs: int = 5000) -> bool:
+        return self.pool.waitForDone(msecs)
+
+
+class _FileNode:
+    """One entry of the Flipper file tree; `children` stays None until the directory is listed"""
+    
+    __slots__ = ('name', 'path', 'is_dir', 'size', 'parent', 'row', 'children', 'pending', 'prefetched', 'loading',
+                 'failed')
+    
+    def __init__(self, name: str, path: str, is_dir: bool, size=None, parent=None, row: int = 0):
+        self.name = name
+        self.path = path
+        self.is_dir = is_dir
+        self.size = size
+        self.parent = parent
+        self.row = row
+        self.children = None
+        # Listed entries not yet inserted into the model (handed out a page at a time)
+        self.pending = []
+        # Listing fetched ahead of an expand by the background prefetch
+        self.prefetched = None
+        self.loading = False
+        # The last listing failed; not fetched again until retry() or refresh()
+        self.failed = False
+
+
+class FlipperFileModel(QAbstractItemModel):
+    """Lazy tree of Flipper storage.
+    
+    Directories are listed on expand (canFetchMore/fetchMore) on the job pool, inserted
+    PAGE_SIZE rows at a time, and the first few subdirectories of every listed directory
+    are prefetched so the next expand is instant. Listings come from the device's
+    per-directory cache.
+    """
+    
+    COLUMNS = ("Name", "Size", "Type")
+    PAGE_SIZE = 500
+    PREFETCH_DIRS = 8
+    SORT_ROLE = Qt.ItemDataRole.UserRole
+    
+    load_failed = pyqtSignal(str, str)
+    loaded = pyqtSignal(str, int)
+    
+    def __init__(self, flipper: FlipperDevice, jobs: DeviceJobs, root: str = '/ext'):
+        super().__init__()
+        self.flipper = flipper
+        self.jobs = jobs
+        # Bumped on reset so listings that arrive for a discarded tree are dropped
+        self._generation = 0
+        self._root = _FileNode(root, root, True)
+    
+    # Tree structure
+    
+    def _node(self, index: QModelIndex) -> _FileNode:
+        return index.internalPointer() if index.isValid() else self._root
+    
+    def index(self, row, column, parent=QModelIndex()):
+        node = self._node(parent)
+        if node.children is None or not 0 <= row < len(node.children):
+            return QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+    
+    def parent(self, index=QModelIndex()):
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self._root:
+            return QModelIndex()
+        return self.createIndex(parent.row, 0, parent)
+    
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        node = self._node(parent)
+        return len(node.children) if node.children else 0
+    
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.COLUMNS)
+    
+    def hasChildren(self, parent=QModelIndex()):
+        node = self._node(parent)
+        if not node.is_dir:
+            return False
+        return node.children is None or bool(node.children) or bool(node.pending)
+    
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return node.name
+            if column == 1:
+                return '' if node.is_dir or node.size is None else _format_size(node.size)
+            return 'Folder' if node.is_dir else (node.name.rsplit('.', 1)[-1].upper() if '.' in node.name else 'File')
+        if role == self.SORT_ROLE:
+            if column == 1:
+                return node.size or 0
+            return node.name.lower() if column == 0 else self.data(index)
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return node.path
+        return None
+    
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+    
+    def path(self, index: QModelIndex) -> str:
+        return self._node(index).path
+    
+    def is_dir(self, index: QModelIndex) -> bool:
+        return self._node(index).is_dir
+    
+    # Lazy loading
+    
+    def canFetchMore(self, parent=QModelIndex()):
+        node = self._node(parent)
+        return (node.is_dir and not node.loading and not node.failed
+                and (node.children is None or bool(node.pending)))
+    
+    def fetchMore(self, parent=QModelIndex()):
+        node = self._node(parent)
+        if node.children is not None:
+            self._insert_page(parent, node)
+        elif node.prefetched is not None:
+            self._populate(parent, node, node.prefetched)
+        else:
+            self._load(node)
+    
+    def set_root(self, path: str):
+        self.beginResetModel()
+        self._generation += 1
+        self._root = _FileNode(path, path, True)
+        self.endResetModel()
+    
+    def retry(self, index: QModelIndex):
+        """List a directory whose last listing failed again (e.g. when it is expanded once more)"""
+        node = self._node(index)
+        if node.failed and not node.loading:
+            node.failed = False
+            self._load(node, force=True)
+    
+    def refresh(self, index: QModelIndex = QModelIndex()):
+        """Drop a directory's rows and list it again from the device"""
+        node = self._node(index)
+        if not node.is_dir or node.loading:
+            # The in-flight listing is about to replace the rows anyway
+            return
+        node.failed = False
+        if node.children:
+            self.beginRemoveRows(index, 0, len(node.children) - 1)
+            node.children = []
+            self.endRemoveRows()
+        node.children = None
+        node.pending = []
+        node.prefetched = None
+        self._load(node, force=True)
+    
+    def _load(self, node: _FileNode, force: bool = False):
+        node.loading = True
+        generation = self._generation
+        
+        def done(entries):
+            if generation != self._generation:
+                return
+            node.loading = False
+            self._populate(self._index_of(node), node, entries)
+        
+        def failed(message):
+            if generation != self._generation:
+                return
+            # children stays None so the directory can be listed again
+            node.loading = False
+            node.failed = True
+            self.load_failed.emit(node.path, message)
+        
+        self.jobs.run(self.flipper.list_entries, node.path, force, strict=True, on_done=done, on_error=failed)
+    
+    def _populate(self, index: QModelIndex, node: _FileNode, entries: list):
+        prefix = node.path.rstrip('/')
+        node.children = []
+        node.prefetched = None
+        node.pending = [_FileNode(e['name'], f"{prefix}/{e['name']}", e['type'] == 'dir', e.get('size'), node)
+                        for e in entries]
+        self._insert_page(index, node)
+        self.loaded.emit(node.path, len(node.pending) + len(node.children))
+        self._prefetch([child for child in node.children + node.pending if child.is_dir][:self.PREFETCH_DIRS])
+    
+    def _insert_page(self, index: QModelIndex, node: _FileNode):
+        page, node.pending = node.pending[:self.PAGE_SIZE], node.pending[self.PAGE_SIZE:]
+        if not page:
+            return
+        start = len(node.children)
+        for i, child in enumerate(page):
+            child.row = start + i
+        self.beginInsertRows(index, start, start + len(page) - 1)
+        node.children.extend(page)
+        self.endInsertRows()
+    
+    def _prefetch(self, nodes: list):
+        """List the next level in the background; results wait on the node until it is expanded"""
+        generation = self._generation
+        for child in nodes:
+            if child.children is not None or child.prefetched is not None:
+                continue
+            
+            def done(entries, child=child):
+                if generation == self._generation and child.children is None:
+                    child.prefetched = entries
+            
+            # Failed prefetches are simply dropped; the expand lists the directory itself
+            self.jobs.run(self.flipper.list_entries, child.path, strict=True, on_done=done)
+    
+    def _index_of(self, node: _FileNode) -> QModelIndex:
+        return QModelIndex() if node is self._root else self.createIndex(node.row, 0, node)
+
+
+class FileSortProxy(QSortFilterProxyModel):
+    """Sorts by the model's sort role, keeping folders above files"""
+    
+    def lessThan(self, left, right):
+        source = self.sourceModel()
+        left_dir, right_dir = source.is_dir(left), source.is_dir(right)
+        if left_dir != right_dir:
+            ascending = self.sortOrder() == Qt.SortOrder.AscendingOrder
+            return left_dir if ascending else right_dir
+        return source.data(left, FlipperFileModel.SORT_ROLE) < source.data(right, FlipperFileModel.SORT_ROLE)
+
+
+def _format_size(size: int) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024 or unit == 'MB':
+            return f"{size} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+class LazyTab(QWidget):
+    """Tab placeholder that builds the real tab the first time it is shown"""
+    
+    def __init__(self, factory):
+        super().__init__()
+        self._factory = factory
+        self._pending = {}
+        self.widget = None
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+    
+    def showEvent(self, event):
+        self.build()
+        super().showEvent(event)
+    
+    def build(self):
+        if self.widget is None:
+            self.widget = self._factory()
+            self.layout().addWidget(self.widget)
+            for call in self._pending.values():
+                call(self.widget)
+            self._pending = {}
+        return self.widget
+    
+    def when_built(self, key: str, call):
+        """Apply call(tab) now, or once the tab exists (only the latest call per key is kept)"""
+        if self.widget is not None:
+            call(self.widget)
+        else:
+            self._pending[key] = call
+
+
 class DeviceWorker(QObject):
     """Worker thread for device operations"""
     
@@ -43,14 +376,41 @@ class DeviceWorker(QObject):
         self.running = True
         self.auto_connect = True
         self.interval = 10
+        # Seconds between reconnect attempts while hotplug events drive reconnects; catches a
+        # plug-in whose hotplug retries all failed (port busy, CDC interface slow to come up)
+        self.hotplug_retry_interval = 60
+        self._last_connect_attempt = 0.0
+        # Flipper plug/unplug is handled as it happens rather than on the next poll
+        self.hotplug = HotplugWatcher(self._on_hotplug)
+    
+    def _on_hotplug(self, added, removed):
+        """Runs on the watcher thread; signals are queued to the GUI thread"""
+        if self.flipper.connected and self.flipper.port in {p['device'] for p in removed}:
+            logger.info(f"Flipper on {self.flipper.port} unplugged")
+            self.flipper.disconnect()
+            self.flipper_connected.emit(False)
+        if self.auto_connect and not self.flipper.connected and any(classify(p) != 'other' for p in added):
+            # The node can appear a moment before the CDC interface accepts opens
+            for delay in (0, 0.5, 1.0, 2.0):
+                time.sleep(delay)
+                if self.flipper.connect():
+                    self.flipper_connected.emit(True)
+                    break
     
     def run(self):
         """Background worker loop"""
+        self.hotplug.start()
+        self._last_connect_attempt = time.monotonic()
+        if self.auto_connect and self.flipper.connect():
+            self.flipper_connected.emit(True)
         while self.running:
             try:
-                # Auto-connect flipper
-                if self.auto_connect and not self.flipper.connected:
+                # Poll every cycle without the hotplug watcher, at a slow fallback cadence with it
+                retry_interval = self.hotplug_retry_interval if self.hotplug.running else 0
+                if (self.auto_connect and not self.flipper.connected
+                        and time.monotonic() - self._last_connect_attempt >= retry_interval):
                     logger.info("Auto-connecting Flipper...")
+                    self._last_connect_attempt = time.monotonic()
                     if self.flipper.connect():
                         self.flipper_connected.emit(True)
                 
@@ -63,9 +423,9 @@ class DeviceWorker(QObject):
                     except Exception as e:
                         logger.error(f"Failed to get Flipper status: {e}")
                 
-                # Auto-connect Pineapple
+                # Auto-connect Pineapple (reuses the cached token until it expires or is rejected)
                 if self.auto_connect:
-                    if self.pineapple.authenticate():
+                    if self.pineapple.is_authenticated():
                         self.pineapple_connected.emit(True)
                     else:
                         self.pineapple_connected.emit(False)
@@ -79,14 +439,16 @@ class DeviceWorker(QObject):
     def stop(self):
         """Stop the worker thread"""
         self.running = False
+        self.hotplug.stop()
 
 
 class FlipperTab(QWidget):
     """Flipper Zero management tab"""
     
-    def __init__(self, flipper: FlipperDevice):
+    def __init__(self, flipper: FlipperDevice, jobs: DeviceJobs):
         super().__init__()
         self.flipper = flipper
+        self.jobs = jobs
         self.init_ui()
     
     def init_ui(self):
@@ -130,32 +492,57 @@ class FlipperTab(QWidget):
         file_layout = QHBoxLayout()
         file_layout.addWidget(QLabel("Path:"))
         self.file_path_input = QLineEdit("/ext")
+        self.file_path_input.returnPressed.connect(self.list_files)
         self.list_btn = QPushButton("List Files")
         self.list_btn.clicked.connect(self.list_files)
+        self.refresh_files_btn = QPushButton("Refresh")
+        self.refresh_files_btn.clicked.connect(self.refresh_files)
         file_layout.addWidget(self.file_path_input)
         file_layout.addWidget(self.list_btn)
+        file_layout.addWidget(self.refresh_files_btn)
         
         layout.addLayout(file_layout)
         
-        self.file_list = QTextEdit()
-        self.file_list.setReadOnly(True)
-        layout.addWidget(self.file_list)
+        self.file_model = FlipperFileModel(self.flipper, self.jobs, self.file_path_input.text())
+        self.file_model.load_failed.connect(
+            lambda path, message: self.file_status.setText(f"Failed to list {path}: {message}"))
+        self.file_model.loaded.connect(lambda path, count: self.file_status.setText(f"{path}: {count} entries"))
+        self.file_proxy = FileSortProxy()
+        self.file_proxy.setSourceModel(self.file_model)
+        self.file_tree = QTreeView()
+        self.file_tree.setModel(self.file_proxy)
+        self.file_tree.setUniformRowHeights(True)
+        self.file_tree.expanded.connect(lambda index: self.file_model.retry(self.file_proxy.mapToSource(index)))
+        self.file_tree.setSortingEnabled(True)
+        self.file_tree.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+        self.file_tree.header().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.file_tree)
+        self.file_status = QLabel("")
+        layout.addWidget(self.file_status)
         
         self.setLayout(layout)
         self.refresh_ports()
     
     def refresh_ports(self):
-        """Refresh available serial ports"""
+        """Refresh available serial ports (enumerated on the job pool; it can take a while on Windows)"""
         self.port_combo.clear()
-        try:
-            from serial.tools import list_ports
-            for port in list_ports.comports():
-                self.port_combo.addItem(port.device)
-        except Exception as e:
-            logger.error(f"Failed to enumerate ports: {e}")
+        self.port_combo.addItem("Auto-detect")
+        
+        def failed(message):
+            logger.error(f"Failed to enumerate ports: {message}")
         
-        if self.port_combo.count() == 0:
-            self.port_combo.addItem("Auto-detect")
+        self.jobs.run(enumerate_ports, on_done=self._fill_ports, on_error=failed)
+    
+    def _fill_ports(self, ports):
+        if not ports:
+            return
+        self.port_combo.clear()
+        for port in ports:
+            self.port_combo.addItem(port['device'])
+    
+    def set_connected(self, connected: bool, text: str = None):
+        self.status_label.setText(text or ("Connected" if connected else "Disconnected"))
+        self.status_label.setStyleSheet("color: green" if connected else "color: red")
     
     def connect_flipper(self):
         """Connect to Flipper"""
@@ -163,35 +550,52 @@ class FlipperTab(QWidget):
         if port == "Auto-detect":
             port = None
         
-        if self.flipper.connect(port):
-            self.status_label.setText("Connected")
-            self.status_label.setStyleSheet("color: green")
+        self.connect_btn.setEnabled(False)
+        self.status_label.setText("Connecting...")
+        self.jobs.run(self.flipper.connect, port, on_done=self._on_connected, on_error=self._on_connect_error)
+    
+    def _on_connected(self, ok):
+        self.connect_btn.setEnabled(True)
+        if ok:
+            self.set_connected(True)
             self.monitor_text.clear()
             self.update_monitor()
         else:
-            self.status_label.setText("Connection Failed")
-            self.status_label.setStyleSheet("color: red")
-            QMessageBox.warning(self, "Error", "Failed to connect to Flipper Zero")
+            self._on_connect_error("Failed to connect to Flipper Zero")
+    
+    def _on_connect_error(self, message):
+        self.connect_btn.setEnabled(True)
+        self.set_connected(False, "Connection Failed")
+        QMessageBox.warning(self, "Error", message)
     
     def update_monitor(self):
-        """Update device monitor display"""
-        try:
-            info = self.flipper.get_monitor_info()
-            text = f"Port: {info['port']}\n\n"
-            
-            if info['info']:
-                text += "Device Info:\n"
-                text += "\n".join(info['info']) + "\n\n"
-            
-            if info['uptime']:
-                text += f"Uptime: {info['uptime']}\n"
-            
-            if info['memory']:
-                text += f"Memory: {info['memory']}\n"
-            
-            self.monitor_text.setText(text)
-        except Exception as e:
-            self.monitor_text.setText(f"Error: {e}")
+        """Collect monitor info in the background and render it"""
+        self.jobs.run(self.flipper.get_monitor_info, on_done=self.render_monitor,
+                      on_error=lambda e: self.monitor_text.setText(f"Error: {e}"))
+    
+    def render_monitor(self, info: dict):
+        """Render an already collected monitor snapshot (no device I/O)"""
+        text = f"Port: {info.get('port')}\n\n"
+        
+        if info.get('info'):
+            text += "Device Info:\n"
+            text += "\n".join(info['info']) + "\n\n"
+        
+        if info.get('uptime_seconds') is not None:
+            text += f"Uptime: {timedelta(seconds=info['uptime_seconds'])}\n"
+        elif info.get('uptime'):
+            text += f"Uptime: {info['uptime']}\n"
+        
+        heap = info.get('heap') or {}
+        if 'free_heap_size' in heap and 'total_heap_size' in heap:
+            text += f"Memory: {_format_size(heap['free_heap_size'])} free of {_format_size(heap['total_heap_size'])}\n"
+        elif info.get('memory'):
+            text += f"Memory: {info['memory']}\n"
+        
+        if info.get('error'):
+            text += f"\nError: {info['error']}\n"
+        
+        self.monitor_text.setText(text)
     
     def send_command(self):
         """Send command to Flipper"""
@@ -200,28 +604,41 @@ class FlipperTab(QWidget):
             QMessageBox.warning(self, "Error", "Please enter a command")
             return
         
-        try:
-            result = self.flipper.send_command(cmd)
+        self.send_btn.setEnabled(False)
+        
+        def done(result):
+            self.send_btn.setEnabled(True)
             self.monitor_text.append(f"\n> {cmd}\n{result}")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to send command: {e}")
+        
+        def failed(message):
+            self.send_btn.setEnabled(True)
+            QMessageBox.critical(self, "Error", f"Failed to send command: {message}")
+        
+        self.jobs.run(self.flipper.send_command, cmd, on_done=done, on_error=failed)
     
     def list_files(self):
-        """List files in Flipper storage"""
-        path = self.file_path_input.text().strip()
-        try:
-            files = self.flipper.list_files(path)
-            self.file_list.setText("\n".join(files) if files else "No files found")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to list files: {e}")
+        """Browse Flipper storage from the given path; subdirectories load as they are expanded"""
+        path = self.file_path_input.text().strip() or '/ext'
+        self.file_status.setText(f"Listing {path}...")
+        self.file_model.set_root(path)
+        if self.file_model.canFetchMore():
+            self.file_model.fetchMore()
+    
+    def refresh_files(self):
+        """Re-list the selected directory (or the root) from the device"""
+        current = self.file_proxy.mapToSource(self.file_tree.currentIndex())
+        if current.isValid() and not self.file_model.is_dir(current):
+            current = current.parent()
+        self.file_model.refresh(current)
 
 
 class PineappleTab(QWidget):
     """WiFi Pineapple management tab"""
     
-    def __init__(self, pineapple: PineappleDevice):
+    def __init__(self, pineapple: PineappleDevice, jobs: DeviceJobs):
         super().__init__()
         self.pineapple = pineapple
+        self.jobs = jobs
         self.init_ui()
     
     def init_ui(self):
@@ -259,36 +676,49 @@ class PineappleTab(QWidget):
         layout.addWidget(self.status_text)
         
         # Refresh button
-        refresh_btn = QPushButton("Refresh Status")
-        refresh_btn.clicked.connect(self.refresh_status)
-        layout.addWidget(refresh_btn)
+        self.refresh_btn = QPushButton("Refresh Status")
+        self.refresh_btn.clicked.connect(self.refresh_status)
+        layout.addWidget(self.refresh_btn)
         
         self.setLayout(layout)
     
+    def set_connected(self, connected: bool, text: str = None):
+        self.status_label.setText(text or ("Connected" if connected else "Not Connected"))
+        self.status_label.setStyleSheet("color: green" if connected else "color: red")
+    
     def connect_pineapple(self):
         """Connect to Pineapple"""
         self.pineapple.base_url = self.url_input.text().strip()
         self.pineapple.username = self.username_input.text().strip()
         self.pineapple.password = self.password_input.text()
         
-        if self.pineapple.authenticate():
-            self.status_label.setText("Connected")
-            self.status_label.setStyleSheet("color: green")
+        self.connect_btn.setEnabled(False)
+        self.status_label.setText("Connecting...")
+        self.jobs.run(self.pineapple.authenticate, on_done=self._on_authenticated,
+                      on_error=lambda e: self._on_authenticated(False))
+    
+    def _on_authenticated(self, ok):
+        self.connect_btn.setEnabled(True)
+        if ok:
+            self.set_connected(True)
             self.refresh_status()
         else:
-            self.status_label.setText("Connection Failed")
-            self.status_label.setStyleSheet("color: red")
+            self.set_connected(False, "Connection Failed")
             QMessageBox.warning(self, "Error", "Failed to connect to Pineapple")
     
     def refresh_status(self):
         """Refresh Pineapple status"""
-        try:
-            status = self.pineapple.get_status()
-            import json
-            text = json.dumps(status, indent=2)
-            self.status_text.setText(text)
-        except Exception as e:
-            self.status_text.setText(f"Error: {e}")
+        self.refresh_btn.setEnabled(False)
+        
+        def done(status):
+            self.refresh_btn.setEnabled(True)
+            self.status_text.setText(json.dumps(status, indent=2))
+        
+        def failed(message):
+            self.refresh_btn.setEnabled(True)
+            self.status_text.setText(f"Error: {message}")
+        
+        self.jobs.run(self.pineapple.get_status, on_done=done, on_error=failed)
 
 
 class MainWindow(QMainWindow):
@@ -299,9 +729,12 @@ class MainWindow(QMainWindow):
         
         self.flipper = FlipperDevice()
         self.pineapple = PineappleDevice()
+        self.jobs = DeviceJobs()
+        self.worker = None
         
         self.init_ui()
-        self.setup_workers()
+        # Start the device worker once the window is up rather than before it
+        QTimer.singleShot(0, self.setup_workers)
         
         # Set window properties
         self.setWindowTitle("Bad-Antics Device Manager")
@@ -323,10 +756,10 @@ class MainWindow(QMainWindow):
         title.setFont(title_font)
         layout.addWidget(title)
         
-        # Tabs
+        # Tabs (each is built the first time it is shown)
         self.tabs = QTabWidget()
-        self.flipper_tab = FlipperTab(self.flipper)
-        self.pineapple_tab = PineappleTab(self.pineapple)
+        self.flipper_tab = LazyTab(lambda: FlipperTab(self.flipper, self.jobs))
+        self.pineapple_tab = LazyTab(lambda: PineappleTab(self.pineapple, self.jobs))
         
         self.tabs.addTab(self.flipper_tab, "Flipper Zero")
         self.tabs.addTab(self.pineapple_tab, "WiFi Pineapple")
@@ -352,33 +785,24 @@ class MainWindow(QMainWindow):
         self.worker_thread.start()
     
     def on_flipper_status(self, status):
-        """Handle Flipper status update"""
-        if self.tabs.currentIndex() == 0:  # Flipper tab is active
-            self.flipper_tab.update_monitor()
+        """Render the snapshot the worker already collected"""
+        self.flipper_tab.when_built('monitor', lambda tab: tab.render_monitor(status))
     
     def on_flipper_connected(self, connected):
         """Handle Flipper connection change"""
-        if connected:
-            self.flipper_tab.status_label.setText("Connected")
-            self.flipper_tab.status_label.setStyleSheet("color: green")
-        else:
-            self.flipper_tab.status_label.setText("Disconnected")
-            self.flipper_tab.status_label.setStyleSheet("color: red")
+        self.flipper_tab.when_built('connected', lambda tab: tab.set_connected(connected))
     
     def on_pineapple_connected(self, connected):
         """Handle Pineapple connection change"""
-        if connected:
-            self.pineapple_tab.status_label.setText("Connected")
-            self.pineapple_tab.status_label.setStyleSheet("color: green")
-        else:
-            self.pineapple_tab.status_label.setText("Not Connected")
-            self.pineapple_tab.status_label.setStyleSheet("color: red")
+        self.pineapple_tab.when_built('connected', lambda tab: tab.set_connected(connected))
     
     def closeEvent(self, event):
         """Handle window close"""
-        self.worker.stop()
-        self.worker_thread.quit()
-        self.worker_thread.wait()
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker_thread.quit()
+            self.worker_thread.wait()
+        self.jobs.wait()
         
         if self.flipper.connected:
             self.flipper.disconnect()
@@ -392,6 +816,10 @@ def main():
     
     window = MainWindow()
     window.show()
+    if os.getenv('STARTUP_PROFILE'):
+        # Fires once the first frame has been processed
+        QTimer.singleShot(0, lambda: logger.info(
+            f"First window after {(time.perf_counter() - _STARTED) * 1000:.0f} ms"))
     
     sys.exit(app.exec())
 
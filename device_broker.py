@@ -0,0 +1,319 @@
+"""
+Device broker.
+One process owns the Flipper serial port and the Pineapple session and serves
+them over a local socket (Unix or TCP, authenticated with a shared key), so
+several web workers can share the devices without fighting over the port.
+Run it with `python device_broker.py`; point the app at it with DEVICE_BROKER.
+
+The wire API is deliberately small: connection status, CLI commands/batches and
+single protobuf RPC storage operations for the Flipper, api_call for the Pineapple.
+Everything built on top of those (monitoring, listings, batches, backups) keeps
+running in the client.
+"""
+
+import logging
+import os
+import secrets
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+import local_state
+from device_manager import FlipperDevice, PineappleDevice
+from flipper_probe import classify
+from flipper_rpc import RPCError, CHUNK_SIZE
+from hotplug import HotplugWatcher
+from serial_scheduler import SchedulerTimeout, INTERACTIVE, FILE_OPS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADDRESS = 'unix:' + local_state.state_path('device-broker.sock') if os.name != 'nt' else 'tcp:127.0.0.1:7811'
+KEY_FILE = 'device-broker.key'
+# Storage operations a client may run over the broker's RPC session
+RPC_OPS = frozenset({'ping', 'list', 'stat', 'read_file', 'write_file', 'delete', 'mkdir', 'md5sum'})
+
+
+class BrokerError(RuntimeError):
+    """The broker reported a failure that has no more specific local exception type"""
+
+
+class BrokerUnavailable(ConnectionError):
+    """The broker process could not be reached"""
+
+
+def parse_address(address: str):
+    """'unix:/path/sock' -> path (AF_UNIX); 'tcp:host:port' or 'host:port' -> (host, port)"""
+    if address.startswith('unix:'):
+        return address[len('unix:'):]
+    if address.startswith('tcp:'):
+        address = address[len('tcp:'):]
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def load_key(create: bool = False) -> bytes:
+    """Shared auth key: DEVICE_BROKER_KEY, else a random key kept in the local state directory"""
+    if os.getenv('DEVICE_BROKER_KEY'):
+        return os.getenv('DEVICE_BROKER_KEY').encode()
+    path = local_state.state_path(KEY_FILE)
+    if not os.path.exists(path):
+        if not create:
+            raise BrokerUnavailable(f'No broker key at {path}; start the broker first or set DEVICE_BROKER_KEY')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(secrets.token_hex(32))
+    with open(path) as f:
+        return f.read().strip().encode()
+
+
+def _encode_error(e: Exception):
+    if isinstance(e, RPCError):
+        return ('RPCError', str(e), e.status)
+    if isinstance(e, SchedulerTimeout):
+        return ('SchedulerTimeout', str(e), None)
+    return (type(e).__name__, str(e), None)
+
+
+def _decode_error(kind: str, message: str, status) -> Exception:
+    if kind == 'RPCError':
+        return RPCError(message, status)
+    if kind == 'SchedulerTimeout':
+        return SchedulerTimeout(message)
+    return BrokerError(f'{kind}: {message}' if kind != 'BrokerError' else message)
+
+
+class DeviceBroker:
+    """Serves one FlipperDevice and one PineappleDevice to broker clients"""
+
+    def __init__(self, flipper: FlipperDevice, pineapple: PineappleDevice, address: str = DEFAULT_ADDRESS,
+                 authkey: bytes = None):
+        self.flipper = flipper
+        self.pineapple = pineapple
+        self.address = address
+        self.authkey = authkey if authkey is not None else load_key(create=True)
+        self._listener = None
+        self._stop = threading.Event()
+        self._handlers = {
+            'ping': lambda: 'pong',
+            'flipper.status': self.flipper_status,
+            'flipper.connect': self.flipper_connect,
+            'flipper.disconnect': self.flipper_disconnect,
+            'flipper.command': self.flipper_command,
+            'flipper.batch': self.flipper.send_batch,
+            'flipper.rpc': self.flipper_rpc,
+            'flipper.scheduler': lambda: self.flipper.scheduler.stats(),
+            'pineapple.api_call': self.pineapple.api_call,
+            'pineapple.authenticated': lambda: bool(self.pineapple.token),
+            'pineapple.url': lambda: self.pineapple.base_url,
+        }
+
+    # Flipper
+
+    def flipper_status(self) -> Dict:
+        dev = self.flipper
+        connected = bool(dev.connected and dev.ser is not None and dev.ser.is_open)
+        return {'connected': connected, 'port': dev.port if connected else None,
+                'verified': dev.verified if connected else False, 'epoch': dev.epoch}
+
+    def flipper_connect(self) -> Dict:
+        if not self.flipper_status()['connected']:
+            self.flipper.connect()
+        return self.flipper_status()
+
+    def flipper_disconnect(self) -> Dict:
+        self.flipper.disconnect()
+        return self.flipper_status()
+
+    def flipper_command(self, command: str, priority: int = INTERACTIVE) -> str:
+        return self.flipper.send_command(command, priority)
+
+    def flipper_rpc(self, op: str, args: tuple = (), kwargs: dict = None, priority: int = FILE_OPS):
+        if op not in RPC_OPS:
+            raise BrokerError(f'RPC operation not allowed: {op}')
+
+        def job():
+            with self.flipper.rpc_session() as rpc:
+                return getattr(rpc, op)(*args, **(kwargs or {}))
+
+        return self.flipper.scheduler.run(job, priority)
+
+    # Hotplug: reconnect/disconnect as the port comes and goes
+
+    def on_hotplug(self, added, removed):
+        if self.flipper.connected and self.flipper.port in {p['device'] for p in removed}:
+            logger.info(f"Flipper on {self.flipper.port} unplugged")
+            self.flipper.disconnect()
+        if not self.flipper.connected and any(classify(p) != 'other' for p in added):
+            self.flipper.connect()
+
+    # Serving
+
+    def bind(self):
+        if self._listener is None:
+            from multiprocessing.connection import Listener
+            self._listener = Listener(parse_address(self.address), authkey=self.authkey)
+            logger.info(f"Device broker listening on {self.address}")
+
+    def serve_forever(self):
+        self.bind()
+        while not self._stop.is_set():
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                if self._stop.is_set():
+                    break
+                logger.exception('Broker accept failed')
+                continue
+            except Exception as e:
+                # Failed authentication and the like: drop the client, keep serving
+                logger.warning(f"Rejected broker client: {e}")
+                continue
+            threading.Thread(target=self._serve_client, args=(conn,), daemon=True, name='broker-client').start()
+
+    def start(self) -> 'DeviceBroker':
+        """Serve on a background thread (for embedding and tests)"""
+        self.bind()
+        threading.Thread(target=self.serve_forever, daemon=True, name='device-broker').start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        if self._listener is not None:
+            self._listener.close()
+
+    def _serve_client(self, conn):
+        with conn:
+            while True:
+                try:
+                    method, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+                handler = self._handlers.get(method)
+                try:
+                    if handler is None:
+                        raise BrokerError(f'Unknown broker method: {method}')
+                    reply = ('ok', handler(*args, **kwargs))
+                except Exception as e:
+                    reply = ('error',) + _encode_error(e)
+                try:
+                    conn.send(reply)
+                except (EOFError, OSError):
+                    return
+
+
+class BrokerClient:
+    """Thread-safe client: each calling thread gets its own connection to the broker"""
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, authkey: bytes = None, timeout: float = 120.0):
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self.authkey is None:
+                self.authkey = load_key()
+            from multiprocessing.connection import Client
+            try:
+                conn = Client(parse_address(self.address), authkey=self.authkey)
+            except (OSError, EOFError) as e:
+                raise BrokerUnavailable(f'Device broker unreachable at {self.address}: {e}') from e
+            self._local.conn = conn
+        return conn
+
+    def _drop(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def call(self, method: str, *args, **kwargs):
+        """Invoke a broker method; re-raises RPCError/SchedulerTimeout, BrokerError otherwise"""
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.send((method, args, kwargs))
+                if not conn.poll(self.timeout):
+                    # The reply would arrive out of step with the next request: start over
+                    self._drop()
+                    raise BrokerUnavailable(f'Device broker did not answer {method} within {self.timeout}s')
+                reply = conn.recv()
+                break
+            except (EOFError, OSError) as e:
+                # Broker restarted since this thread's last call: reconnect once
+                self._drop()
+                if attempt:
+                    raise BrokerUnavailable(f'Device broker connection lost: {e}') from e
+        if reply[0] == 'ok':
+            return reply[1]
+        raise _decode_error(*reply[1:])
+
+    def rpc(self, priority: int = FILE_OPS) -> 'RemoteRPC':
+        return RemoteRPC(self, priority)
+
+    @contextmanager
+    def rpc_session(self, priority: int = FILE_OPS) -> Iterator['RemoteRPC']:
+        """Stand-in for FlipperDevice.rpc_session; each operation is its own broker call"""
+        yield RemoteRPC(self, priority)
+
+
+class RemoteRPC:
+    """FlipperRPC look-alike whose storage operations run in the broker"""
+
+    def __init__(self, client: BrokerClient, priority: int = FILE_OPS):
+        self._client = client
+        self._priority = priority
+
+    def __getattr__(self, op):
+        if op not in RPC_OPS:
+            raise AttributeError(op)
+        return lambda *args, **kwargs: self._client.call('flipper.rpc', op, args, kwargs, self._priority)
+
+    def iter_read(self, path: str) -> Iterator[bytes]:
+        # Buffered in the broker; chunked here so callers written for streaming still work
+        data = self.read_file(path)
+        for i in range(0, len(data), CHUNK_SIZE):
+            yield data[i:i + CHUNK_SIZE]
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Own the Flipper/Pineapple connections and serve them locally')
+    parser.add_argument('--listen', default=os.getenv('DEVICE_BROKER', DEFAULT_ADDRESS),
+                        help='unix:/path/to.sock or tcp:host:port')
+    parser.add_argument('--no-hotplug', action='store_true', help='do not watch for serial ports coming and going')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    flipper = FlipperDevice(
+        port=os.getenv('FLIPPER_PORT', 'COM3' if os.name == 'nt' else '/dev/ttyACM0'),
+        idle_timeout=float(os.getenv('FLIPPER_IDLE_TIMEOUT', '0.6')),
+        command_deadline=float(os.getenv('FLIPPER_COMMAND_DEADLINE', '10')),
+        use_rpc=os.getenv('FLIPPER_USE_RPC', 'true').lower() in ('1', 'true', 'yes'))
+    pineapple = PineappleDevice(os.getenv('PINEAPPLE_URL', 'http://172.16.42.1:1471'),
+                                os.getenv('PINEAPPLE_USER', 'root'), os.getenv('PINEAPPLE_PASS', ''))
+    broker = DeviceBroker(flipper, pineapple, address=args.listen)
+    address = parse_address(args.listen)
+    if isinstance(address, str) and os.path.exists(address):
+        # Stale socket from a previous run
+        os.unlink(address)
+    if not args.no_hotplug:
+        HotplugWatcher(broker.on_hotplug).start()
+    flipper.connect()
+    try:
+        broker.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broker.close()
+        flipper.disconnect()
+
+
+if __name__ == '__main__':
+    main()
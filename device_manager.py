@@ -4,33 +4,410 @@ Extracted from Flask app.py for reuse in PyQt6 desktop application
 """
 
 import serial
-from serial.tools import list_ports
 import requests
 import time
 import logging
 import os
-import subprocess
 import re
-import ipaddress
 import threading
-from typing import Optional, List, Dict
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Callable, Any, Iterator
+
+from pineapple_client import PineappleClient, TokenManager, parse_login_response, get_client as get_pineapple_client
+from pineapple_discovery import PineappleLocator
+from flipper_rpc import FlipperRPC, RPCError
+from serial_scheduler import SerialScheduler, INTERACTIVE, FILE_OPS, TELEMETRY
+from flipper_probe import FLIPPER_PROMPT, find_flipper
+from flipper_parsers import parse_device_info, parse_storage_info, monitor_fields
 
 logger = logging.getLogger(__name__)
 
 
+def read_response(ser, prompt: bytes = FLIPPER_PROMPT, idle_timeout: float = 0.6,
+                  deadline: float = 10.0, poll_interval: float = 0.005) -> bytes:
+    """Read a command response until the CLI prompt, an idle gap or a hard deadline.
+
+    Returns the raw bytes with the trailing prompt removed. The idle gap is measured
+    from the last received byte (or from the call when nothing has arrived yet), so a
+    response that stops without a prompt costs at most `idle_timeout`, while a long
+    response keeps streaming until `deadline`.
+    """
+    buf = bytearray()
+    start = time.monotonic()
+    last_rx = start
+    while True:
+        now = time.monotonic()
+        if now - start >= deadline:
+            logger.debug('Response deadline reached after %d bytes', len(buf))
+            break
+        waiting = ser.in_waiting
+        if waiting:
+            chunk = ser.read(waiting)
+            if chunk:
+                buf.extend(chunk)
+                last_rx = time.monotonic()
+                if buf.endswith(prompt):
+                    del buf[-len(prompt):]
+                    break
+                continue
+        if now - last_rx >= idle_timeout:
+            break
+        time.sleep(poll_interval)
+    return bytes(buf)
+
+
+@contextmanager
+def rpc_session(ser, timeout: float = 10.0, drain_timeout: float = 0.2) -> Iterator[FlipperRPC]:
+    """Switch an open port into protobuf RPC mode for the block, then back to the text CLI.
+
+    The caller must hold whatever lock guards the port.
+    """
+    rpc = FlipperRPC(ser, timeout=timeout)
+    rpc.start()
+    try:
+        yield rpc
+    finally:
+        try:
+            rpc.stop()
+        except Exception as e:
+            logger.debug(f"RPC stop failed: {e}")
+        # Swallow the stop acknowledgement and CLI banner so the next command starts clean
+        read_response(ser, idle_timeout=drain_timeout, deadline=timeout)
+
+
+class SnapshotCache:
+    """Single-flight cache: concurrent callers share one in-flight load and reuse its result for `ttl` seconds"""
+
+    def __init__(self, loader: Callable[[], Any], ttl: float = 2.0,
+                 should_cache: Callable[[Any], bool] = None):
+        self.loader = loader
+        self.ttl = ttl
+        self.should_cache = should_cache or (lambda value: True)
+        self._lock = threading.Lock()
+        self._value = None
+        self._stamp = 0.0
+        self._valid = False
+        self._inflight = None
+        self._inflight_result = None
+        self._leader = None
+        # Bumped by invalidate(); a load that started before the bump is not stored
+        self._generation = 0
+
+    def get(self, force: bool = False) -> Any:
+        """Return the cached value, loading it (once for all concurrent callers) when stale"""
+        with self._lock:
+            if not force and self._valid and (time.monotonic() - self._stamp) < self.ttl:
+                return self._value
+            if self._inflight is not None:
+                if self._leader == threading.get_ident():
+                    # The loader called back into its own cache: waiting would wait forever
+                    raise RuntimeError('SnapshotCache loader re-entered its own cache')
+                event, result = self._inflight, self._inflight_result
+                leader = False
+            else:
+                event, result = threading.Event(), {}
+                self._inflight, self._inflight_result = event, result
+                generation = self._generation
+                self._leader = threading.get_ident()
+                leader = True
+
+        if not leader:
+            event.wait()
+            if 'error' in result:
+                raise result['error']
+            return result['value']
+
+        try:
+            value = self.loader()
+            result['value'] = value
+            with self._lock:
+                if generation == self._generation and self.should_cache(value):
+                    self._value = value
+                    self._stamp = time.monotonic()
+                    self._valid = True
+            return value
+        except Exception as e:
+            result['error'] = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight = None
+                self._inflight_result = None
+                self._leader = None
+            event.set()
+
+    def peek(self) -> Any:
+        """The cached value, if any, without loading (may be stale)"""
+        with self._lock:
+            return self._value if self._valid else None
+
+    def invalidate(self):
+        """Drop the cached value so the next get() reloads"""
+        with self._lock:
+            self._valid = False
+            self._generation += 1
+
+
+# `storage list` lines: "[D] name" or "[F] name 1234b" (older firmware may print 12K etc.)
+_LIST_LINE_RE = re.compile(r'^\[(?P<kind>[DF])\]\s+(?P<name>.+?)(?:\s+(?P<size>\d+(?:\.\d+)?)\s*(?P<unit>[bBkKmMgG]i?[bB]?)?)?$')
+_SIZE_UNITS = {'': 1, 'b': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+
+
+def parse_storage_list(text: str) -> Optional[List[Dict]]:
+    """Parse `storage list` output into [{'name', 'type', 'size'}] sorted dirs first.
+
+    Returns None when the output is not a listing (unknown command, storage error),
+    and [] for an empty directory.
+    """
+    entries = []
+    recognised = False
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith(('storage list', 'ls ')) or line in ('ls', '>:'):
+            continue
+        if line == 'Empty':
+            recognised = True
+            continue
+        m = _LIST_LINE_RE.match(line)
+        if not m:
+            if 'error' in line.lower() or 'not found' in line.lower():
+                return None
+            continue
+        recognised = True
+        if m.group('kind') == 'D':
+            name = line[3:].strip()
+            entries.append({'name': name, 'type': 'dir', 'size': 0})
+            continue
+        size = None
+        if m.group('size'):
+            unit = (m.group('unit') or '')[:1].lower()
+            size = int(float(m.group('size')) * _SIZE_UNITS[unit])
+        entries.append({'name': m.group('name'), 'type': 'file', 'size': size})
+    if not recognised:
+        return None
+    return sort_entries(entries)
+
+
+def sort_entries(entries: List[Dict]) -> List[Dict]:
+    return sorted(entries, key=lambda e: (e['type'] != 'dir', e['name'].lower()))
+
+
+def parent_path(path: str) -> str:
+    parent = path.rstrip('/').rsplit('/', 1)[0]
+    return parent or '/'
+
+
+class ListingCache:
+    """Per-path directory listing cache keyed by connection epoch.
+
+    Fresh entries are returned directly; entries older than `ttl` are returned as-is
+    while a background refresh runs. Listings loaded under an older epoch are never
+    stored, so a reconnect cannot be repopulated with stale data.
+    """
+
+    def __init__(self, loader: Callable[[str], Optional[List[Dict]]], epoch: Callable[[], int],
+                 ttl: float = 30.0):
+        self.loader = loader
+        self.epoch = epoch
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._refreshing = set()
+
+    @staticmethod
+    def _norm(path: str) -> str:
+        return '/' + path.strip('/')
+
+    def get(self, path: str, force: bool = False) -> Dict:
+        """Return {'entries', 'cached', 'age'}; entries is None when the listing failed"""
+        path = self._norm(path)
+        epoch = self.epoch()
+        with self._lock:
+            hit = None if force else self._entries.get((epoch, path))
+        if hit is not None:
+            age = time.monotonic() - hit[0]
+            if age >= self.ttl:
+                self._refresh_async(epoch, path)
+            return {'entries': [dict(e) for e in hit[1]], 'cached': True, 'age': round(age, 2)}
+        entries = self._load(epoch, path)
+        return {'entries': entries, 'cached': False, 'age': 0.0}
+
+    def _load(self, epoch: int, path: str) -> Optional[List[Dict]]:
+        entries = self.loader(path)
+        if entries is not None:
+            with self._lock:
+                if self.epoch() == epoch:
+                    self._entries[(epoch, path)] = (time.monotonic(), [dict(e) for e in entries])
+        return entries
+
+    def _refresh_async(self, epoch: int, path: str):
+        with self._lock:
+            if (epoch, path) in self._refreshing:
+                return
+            self._refreshing.add((epoch, path))
+
+        def run():
+            try:
+                self._load(epoch, path)
+            except Exception as e:
+                logger.debug(f"Background listing refresh of {path} failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard((epoch, path))
+
+        threading.Thread(target=run, daemon=True, name='flipper-listing-refresh').start()
+
+    def invalidate(self, path: str = None):
+        """Drop one directory's listing, or everything when path is None"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                return
+            path = self._norm(path)
+            for key in [k for k in self._entries if k[1] == path]:
+                del self._entries[key]
+
+    def invalidate_entry(self, path: str):
+        """A file or directory at `path` was created, changed or removed"""
+        self.invalidate(parent_path(self._norm(path)))
+        self.invalidate(path)
+
+
+# File-operation command templates per CLI dialect; 'storage' is the stock Flipper CLI
+COMMAND_DIALECTS = {
+    'storage': {'list': 'storage list {path}', 'read': 'storage read {path}', 'delete': 'storage delete {path}'},
+    'posix': {'list': 'ls {path}', 'read': 'cat {path}', 'delete': 'rm {path}'},
+}
+
+
+def detect_dialect(help_text: str) -> str:
+    """Pick the file command dialect from `help` output, defaulting to the stock CLI"""
+    words = set(re.findall(r'[A-Za-z_]+', help_text))
+    if 'storage' not in words and ({'ls', 'cat', 'rm'} & words):
+        return 'posix'
+    return 'storage'
+
+
+def probe_capabilities(send: Callable[[str], str]) -> Dict:
+    """Ask the firmware what it speaks, once per connection.
+
+    Returns {'dialect', 'commands', 'firmware_version', 'api_level', 'hardware', 'uid', 'info'}.
+    """
+    try:
+        info_raw = send('info device') or ''
+    except Exception as e:
+        logger.debug(f"Capability probe: info device failed: {e}")
+        info_raw = ''
+    try:
+        help_raw = send('help') or ''
+    except Exception as e:
+        logger.debug(f"Capability probe: help failed: {e}")
+        help_raw = ''
+    info = parse_device_info(info_raw)
+    major, minor = info.get('firmware_api_major'), info.get('firmware_api_minor')
+    dialect = detect_dialect(help_raw)
+    caps = {
+        'dialect': dialect,
+        'commands': dict(COMMAND_DIALECTS[dialect]),
+        'firmware_version': info.get('firmware_version'),
+        'api_level': f"{major}.{minor}" if major and minor else major,
+        'hardware': info.get('hardware_name'),
+        'uid': info.get('hardware_uid'),
+        'info': [line.strip() for line in info_raw.splitlines() if line.strip()],
+    }
+    logger.info(f"Flipper firmware {caps['firmware_version'] or 'unknown'} (API {caps['api_level'] or '?'}), "
+                f"{dialect} command dialect")
+    return caps
+
+
+# First-line markers of a failed CLI command
+_CLI_ERROR_RE = re.compile(r'command not found|^\s*error\b|\berror:|^\s*usage:', re.IGNORECASE | re.MULTILINE)
+
+
+def is_error_output(text: str) -> bool:
+    return bool(_CLI_ERROR_RE.search(text or ''))
+
+
+def run_batch(send: Callable[[str], str], commands: List[str], stop_on_error: bool = False) -> Dict:
+    """Run commands in order with `send` (already holding the port).
+
+    Returns {'ok', 'completed', 'stopped', 'elapsed_ms', 'results': [{'command', 'ok',
+    'output', 'elapsed_ms'[, 'error']}]}.
+    """
+    results = []
+    stopped = False
+    batch_start = time.monotonic()
+    for command in commands:
+        start = time.monotonic()
+        entry = {'command': command}
+        try:
+            output = send(command)
+            entry.update(ok=not is_error_output(output), output=output)
+        except Exception as e:
+            entry.update(ok=False, output='', error=str(e))
+        entry['elapsed_ms'] = round((time.monotonic() - start) * 1000, 2)
+        results.append(entry)
+        if not entry['ok'] and stop_on_error:
+            stopped = len(results) < len(commands)
+            break
+    return {
+        'ok': all(r['ok'] for r in results) and len(results) == len(commands),
+        'completed': len(results),
+        'stopped': stopped,
+        'elapsed_ms': round((time.monotonic() - batch_start) * 1000, 2),
+        'results': results,
+    }
+
+
 class FlipperDevice:
     """Manages Flipper Zero serial connection"""
     
-    def __init__(self, port: str = None, baud: int = 230400, timeout: float = 2.0):
+    def __init__(self, port: str = None, baud: int = 230400, timeout: float = 2.0,
+                 idle_timeout: float = 0.6, command_deadline: float = 10.0,
+                 monitor_ttl: float = 2.0, use_rpc: bool = True, listing_ttl: float = 30.0,
+                 auto_detect: bool = True):
         self.port = port
+        # Try other ports when the configured one fails; off for fleet members pinned to a port
+        self.auto_detect = auto_detect
+        # Ports auto-detect must leave alone (e.g. held by other devices); a callable returning a list
+        self.exclude_ports = lambda: []
+        # Whether the open port answered the CLI handshake
+        self.verified = False
         self.baud = baud
         self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.command_deadline = command_deadline
+        # Use the binary-safe protobuf RPC for file transfers, falling back to the CLI
+        self.use_rpc = use_rpc
         self.ser = None
         self.connected = False
         self._lock = threading.Lock()
+        # `info device` output is static for a connection; reset on (re)connect
+        self._device_info = None
+        self._monitor_cache = SnapshotCache(self._collect_monitor_info, ttl=monitor_ttl)
+        # Bumped on every connect/disconnect so directory listings never outlive a connection
+        self._epoch = 0
+        self._listings = ListingCache(self._load_listing, lambda: self._epoch, ttl=listing_ttl)
+        # Command dialect and firmware details, probed once per connection
+        self._capabilities = SnapshotCache(
+            lambda: probe_capabilities(lambda command: self.send_command(command, priority=FILE_OPS)), ttl=float('inf'))
+        # CLI commands run on one owner thread so user commands jump ahead of monitor polling
+        self.scheduler = SerialScheduler(name='flipper-device-serial')
+    
+    @property
+    def epoch(self) -> int:
+        """Connection generation; changes on every connect and disconnect"""
+        return self._epoch
     
     def connect(self, port: str = None) -> bool:
-        """Attempt to connect to Flipper Zero"""
+        """Attempt to connect to Flipper Zero and probe its capabilities"""
+        if not self._open(port):
+            return False
+        self.capabilities()
+        return True
+    
+    def _open(self, port: str = None) -> bool:
+        """Open the configured port, or the best Flipper found by a parallel handshake probe"""
         if port:
             self.port = port
         
@@ -39,38 +416,21 @@ class FlipperDevice:
                 if self.ser and self.ser.is_open:
                     self.ser.close()
                 
-                ports_to_try = []
-                if self.port:
-                    ports_to_try.append(self.port)
-                
-                # Add all available ports for auto-detect
-                try:
-                    for p in list_ports.comports():
-                        if p.device not in ports_to_try:
-                            ports_to_try.append(p.device)
-                except Exception as e:
-                    logger.debug(f"Could not enumerate serial ports: {e}")
+                found = find_flipper(lambda p: serial.Serial(p, self.baud, timeout=self.timeout),
+                                     preferred=self.port, exclude=self.exclude_ports(),
+                                     auto_detect=self.auto_detect or not self.port)
+                if found is None:
+                    self.connected = False
+                    return False
                 
-                for port_candidate in ports_to_try:
-                    if not port_candidate:
-                        continue
-                    
-                    try:
-                        logger.info(f'Trying Flipper on port {port_candidate}')
-                        candidate = serial.Serial(port_candidate, self.baud, timeout=self.timeout)
-                        time.sleep(0.1)
-                        
-                        if candidate.is_open:
-                            self.ser = candidate
-                            self.port = port_candidate
-                            self.connected = True
-                            logger.info(f"Flipper Zero connected on {port_candidate}")
-                            return True
-                    except Exception as e:
-                        logger.debug(f"Failed to open {port_candidate}: {e}")
-                
-                self.connected = False
-                return False
+                self.port, self.ser, self.verified = found
+                self.connected = True
+                self._device_info = None
+                self._monitor_cache.invalidate()
+                self._capabilities.invalidate()
+                self._epoch += 1
+                logger.info(f"Flipper Zero connected on {self.port}")
+                return True
             
             except Exception as e:
                 logger.error(f"Flipper connection failed: {e}")
@@ -83,234 +443,327 @@ class FlipperDevice:
             if self.ser and self.ser.is_open:
                 self.ser.close()
             self.connected = False
+            self._device_info = None
+            self._monitor_cache.invalidate()
+            self._capabilities.invalidate()
+            self._epoch += 1
     
-    def send_command(self, command: str) -> str:
-        """Send command to Flipper and receive response"""
+    def send_command(self, command: str, priority: int = INTERACTIVE) -> str:
+        """Send command to Flipper and receive response, queued by priority"""
         if not self.connected:
             raise RuntimeError("Flipper not connected")
-        
+        key = command if priority == TELEMETRY else None
+        return self.scheduler.run(lambda: self._exec_command(command), priority, key=key)
+    
+    def _exec_command(self, command: str) -> str:
         with self._lock:
-            try:
-                self.ser.reset_input_buffer()
-                self.ser.write((command + '\r\n').encode())
-                time.sleep(0.6)
-                response = self.ser.read(self.ser.in_waiting).decode(errors='ignore').strip()
-                return response or 'Command sent.'
-            except Exception as e:
-                logger.error(f"Flipper command failed: {e}")
-                raise
+            return self._exec_locked(command)
+    
+    def _exec_locked(self, command: str) -> str:
+        """Write one command and read its prompt-framed response; caller holds self._lock"""
+        try:
+            self.ser.reset_input_buffer()
+            self.ser.write((command + '\r\n').encode())
+            raw = read_response(self.ser, idle_timeout=self.idle_timeout, deadline=self.command_deadline)
+            response = raw.decode(errors='ignore').strip()
+            return response or 'Command sent.'
+        except Exception as e:
+            logger.error(f"Flipper command failed: {e}")
+            raise
+    
+    def send_batch(self, commands: List[str], stop_on_error: bool = False,
+                   priority: int = INTERACTIVE) -> Dict:
+        """Run commands back-to-back under one lock acquisition; see run_batch for the result"""
+        if not self.connected:
+            raise RuntimeError("Flipper not connected")
+        
+        def job():
+            with self._lock:
+                return run_batch(self._exec_locked, commands, stop_on_error=stop_on_error)
+        
+        return self.scheduler.run(job, priority)
+    
+    def capabilities(self, probe: bool = True) -> Dict:
+        """Firmware version, API level and command dialect of the connected device
+
+        With probe=False only an already-probed result is returned (or {}), never blocking on I/O.
+        """
+        if not self.connected:
+            return {}
+        if not probe:
+            return self._capabilities.peek() or {}
+        try:
+            caps = self._capabilities.get()
+        except Exception as e:
+            logger.error(f"Capability probe failed: {e}")
+            return {'dialect': 'storage', 'commands': dict(COMMAND_DIALECTS['storage'])}
+        if self._device_info is None and caps.get('info'):
+            self._device_info = list(caps['info'])
+        return caps
+    
+    def _file_command(self, op: str, path: str) -> str:
+        return self.capabilities()['commands'][op].format(path=path)
+    
+    def get_monitor_info(self, force: bool = False) -> Dict:
+        """Get Flipper monitor info (device info, uptime, memory)
+
+        Concurrent callers share one collection; results are reused for `monitor_ttl` seconds.
+        """
+        if not self.connected:
+            return {'connected': False, 'port': self.port, 'info': [], 'uptime': '', 'memory': ''}
+        return dict(self._monitor_cache.get(force=force))
     
-    def get_monitor_info(self) -> Dict:
-        """Get Flipper monitor info (device info, uptime, memory)"""
+    def get_storage_info(self, path: str = '/ext') -> Optional[Dict]:
+        """{'label', 'type', 'total_bytes', 'free_bytes'} for /ext or /int; None when not connected"""
+        if not self.connected:
+            return None
+        return parse_storage_info(self.send_command(f'storage info {path}', TELEMETRY))
+    
+    def _collect_monitor_info(self) -> Dict:
+        """Run the monitor commands against the device"""
         result = {'connected': self.connected, 'port': self.port, 'info': [], 'uptime': '', 'memory': ''}
         
         if not self.connected:
             return result
         
         try:
-            result['info'] = [line.strip() for line in self.send_command('info device').splitlines() if line.strip()]
+            if self._device_info is None:
+                self._device_info = [line.strip() for line in self.send_command('info device', TELEMETRY).splitlines() if line.strip()]
+            result['info'] = list(self._device_info)
         except Exception as e:
             logger.error(f"Failed to get device info: {e}")
         
         try:
-            result['uptime'] = self.send_command('uptime').strip()
+            result['uptime'] = self.send_command('uptime', TELEMETRY).strip()
         except Exception as e:
             logger.error(f"Failed to get uptime: {e}")
         
         try:
-            result['memory'] = self.send_command('free').strip()
+            result['memory'] = self.send_command('free', TELEMETRY).strip()
         except Exception as e:
             logger.error(f"Failed to get memory: {e}")
         
+        result.update(monitor_fields('\n'.join(result['info']), result['uptime'], result['memory']))
         return result
     
-    def list_files(self, path: str = '/ext') -> List[str]:
-        """List files in Flipper storage"""
+    def list_entries(self, path: str = '/ext', force: bool = False, strict: bool = False) -> List[Dict]:
+        """Typed directory listing [{'name', 'type', 'size'}], served from the listing cache.
+        
+        Returns [] when not connected or the listing failed, or raises RuntimeError with `strict`.
+        """
         if not self.connected:
+            if strict:
+                raise RuntimeError('Flipper Zero not connected')
             return []
-        
-        for cmd in [f'storage list {path}', f'ls {path}', 'storage list', 'ls']:
+        entries = self._listings.get(path, force=force)['entries']
+        if entries is None and strict:
+            raise RuntimeError(f'Listing {path} failed or unsupported')
+        return entries or []
+    
+    def list_files(self, path: str = '/ext', force: bool = False) -> List[str]:
+        """List files in Flipper storage as display lines"""
+        return [f"[{'D' if e['type'] == 'dir' else 'F'}] {e['name']}" +
+                (f" {e['size']}b" if e['type'] == 'file' and e['size'] is not None else '')
+                for e in self.list_entries(path, force=force)]
+    
+    def _load_listing(self, path: str) -> Optional[List[Dict]]:
+        """Fetch a listing from the device: one RPC round-trip, else the CLI fallbacks"""
+        if not self.connected:
+            return None
+        if self.use_rpc:
             try:
-                out = self.send_command(cmd)
-                if out and out.strip():
-                    return [line.strip() for line in out.splitlines() if line.strip()]
-            except Exception:
-                continue
+                return sort_entries(self._rpc_call(lambda rpc: rpc.list(path)))
+            except RPCError as e:
+                if e.status is not None:
+                    return None
+                logger.warning(f"RPC transport failed, falling back to CLI: {e}")
+        
+        try:
+            return parse_storage_list(self.send_command(self._file_command('list', path), FILE_OPS))
+        except Exception as e:
+            logger.error(f"Listing {path} failed: {e}")
+            return None
+    
+    @contextmanager
+    def rpc_session(self) -> Iterator[FlipperRPC]:
+        """Hold the port in protobuf RPC mode for the duration of the block"""
+        if not self.connected:
+            raise RuntimeError("Flipper not connected")
+        with self._lock:
+            with rpc_session(self.ser, timeout=self.command_deadline) as rpc:
+                yield rpc
+    
+    def _rpc_call(self, op: Callable[[FlipperRPC], Any], priority: int = FILE_OPS) -> Any:
+        """Run op(rpc) inside one RPC session as a scheduler job, queued by priority"""
+        def job():
+            with self.rpc_session() as rpc:
+                return op(rpc)
         
-        return []
+        return self.scheduler.run(job, priority)
+    
+    def read_file_bytes(self, path: str, strict: bool = False) -> bytes:
+        """Read a file byte-for-byte, via RPC when enabled
+
+        Failures return b'' unless strict, where they raise so callers can tell an empty file from an error.
+        """
+        if not self.connected:
+            if strict:
+                raise RuntimeError('Flipper Zero not connected')
+            return b''
+        if self.use_rpc:
+            try:
+                return self._rpc_call(lambda rpc: rpc.read_file(path))
+            except RPCError as e:
+                if e.status is not None:
+                    if strict:
+                        raise
+                    logger.error(f"RPC read of {path} failed: {e}")
+                    return b''
+                logger.warning(f"RPC transport failed, falling back to CLI: {e}")
+        if strict:
+            return self.send_command(self._file_command('read', path), FILE_OPS).encode()
+        return self.read_file(path, use_rpc=False).encode()
+    
+    def stream_file(self, path: str) -> Iterator[bytes]:
+        """Yield a file's contents chunk by chunk over RPC, holding the port until exhausted or closed
+
+        Not a scheduler job: the session stays open across yields, which a job cannot do.
+        """
+        with self.rpc_session() as rpc:
+            yield from rpc.iter_read(path)
     
-    def read_file(self, path: str) -> str:
+    def write_file(self, path: str, data: bytes) -> bool:
+        """Upload a file via RPC (the text CLI cannot carry binary data)"""
+        if not self.connected:
+            return False
+        try:
+            self._rpc_call(lambda rpc: rpc.write_file(path, data))
+            return True
+        except RPCError as e:
+            logger.error(f"RPC write of {path} failed: {e}")
+            return False
+        finally:
+            self._listings.invalidate_entry(path)
+    
+    def read_file(self, path: str, use_rpc: bool = None) -> str:
         """Read file from Flipper storage"""
         if not self.connected:
             return ''
         
-        for cmd in [f'storage read {path}', f'cat {path}']:
-            try:
-                return self.send_command(cmd)
-            except Exception:
-                continue
+        if self.use_rpc if use_rpc is None else use_rpc:
+            return self.read_file_bytes(path).decode(errors='ignore')
         
-        return ''
+        try:
+            return self.send_command(self._file_command('read', path), FILE_OPS)
+        except Exception as e:
+            logger.error(f"Reading {path} failed: {e}")
+            return ''
     
     def delete_file(self, path: str) -> bool:
         """Delete file from Flipper storage"""
         if not self.connected:
             return False
         
-        for cmd in [f'storage delete {path}', f'rm {path}']:
-            try:
-                result = self.send_command(cmd)
-                return bool(result and 'error' not in result.lower())
-            except Exception:
-                continue
-        
-        return False
+        try:
+            result = self.send_command(self._file_command('delete', path), FILE_OPS)
+            return bool(result and 'error' not in result.lower())
+        except Exception as e:
+            logger.error(f"Deleting {path} failed: {e}")
+            return False
+        finally:
+            self._listings.invalidate_entry(path)
 
 
 class PineappleDevice:
     """Manages WiFi Pineapple connection and API"""
     
-    def __init__(self, url: str = 'http://172.16.42.1', username: str = 'root', password: str = ''):
-        self.base_url = url
+    def __init__(self, url: str = 'http://172.16.42.1', username: str = 'root', password: str = '',
+                 client: PineappleClient = None, auto_discover: bool = True, key: str = 'default'):
         self.username = username
         self.password = password
-        self.token = None
-        self._last_probe = 0.0
+        self.http = client or get_pineapple_client()
+        # Fleet units have fixed URLs: probing the local defaults could latch onto another unit
+        self.auto_discover = auto_discover
+        self.locator = PineappleLocator(url, self._probe_url, key=key)
+        self.tokens = TokenManager(self._login)
         self._lock = threading.Lock()
     
-    def _discover_candidates(self) -> List[str]:
-        """Discover possible Pineapple addresses on Windows"""
-        candidates = []
-        
-        try:
-            out = subprocess.check_output(['ipconfig'], text=True, timeout=5, errors='ignore')
-            for m in re.finditer(r'IPv4 Address[^:]*:\s*([0-9]{1,3}(?:\.[0-9]{1,3}){3})', out):
-                ip = m.group(1)
-                try:
-                    addr = ipaddress.ip_address(ip)
-                    if addr in ipaddress.ip_network('172.16.0.0/16'):
-                        octets = ip.split('.')
-                        base = f"http://{octets[0]}.{octets[1]}.{octets[2]}.1"
-                        if f"{base}:1471" not in candidates:
-                            candidates.append(f"{base}:1471")
-                        if base not in candidates:
-                            candidates.append(base)
-                except Exception:
-                    continue
-        except Exception:
-            pass
-        
-        # Always include common defaults
-        if 'http://172.16.42.1:1471' not in candidates:
-            candidates.append('http://172.16.42.1:1471')
-        if 'http://172.16.42.1' not in candidates:
-            candidates.append('http://172.16.42.1')
-        
-        return candidates
-    
     def _probe_url(self, url: str, timeout: float = 3.0) -> bool:
         """Check if Pineapple is reachable at given URL"""
-        try:
-            test_url = f"{url}/api/status" if not url.endswith('/api/status') else url
-            r = requests.get(test_url, timeout=timeout)
-            return r.status_code == 200 or r.status_code in (401, 403)
-        except Exception:
-            return False
+        return self.http.probe(url, timeout=timeout)
+    
+    @property
+    def base_url(self) -> str:
+        return self.locator.url
+    
+    @base_url.setter
+    def base_url(self, url: str):
+        self.locator.set_url(url)
     
     def discover_url(self, force: bool = False) -> str:
-        """Auto-discover Pineapple URL"""
-        now = time.time()
-        
-        # Use cached result if recent enough
-        if not force and (now - self._last_probe) < 30:
+        """Auto-discover Pineapple URL (probes all candidates in parallel; blocking)"""
+        if not self.auto_discover:
             return self.base_url
+        return self.locator.discover(force=force)
+    
+    def _login(self):
+        """POST /api/login, rediscovering the URL once if the first attempt fails"""
+        creds = {'username': self.username, 'password': self.password}
+        self.discover_url()
+        token, expires_in = parse_login_response(self.http.post(self.base_url, '/api/login', json=creds))
+        if token or not self.auto_discover:
+            if token:
+                logger.info('Pineapple authenticated')
+            return token, expires_in
         
-        # Try current URL first
-        if self._probe_url(self.base_url):
-            self._last_probe = now
-            return self.base_url
-        
-        # Try candidates
-        candidates = self._discover_candidates()
-        for candidate in candidates:
-            if self._probe_url(candidate):
-                with self._lock:
-                    self.base_url = candidate
-                self._last_probe = now
-                logger.info(f'Discovered Pineapple at: {candidate}')
-                return candidate
-        
-        self._last_probe = now
-        return self.base_url
+        # Retry with forced discovery
+        self.discover_url(force=True)
+        token, expires_in = parse_login_response(self.http.post(self.base_url, '/api/login', json=creds))
+        if token:
+            logger.info('Pineapple authenticated (after rediscovery)')
+        return token, expires_in
+    
+    @property
+    def token(self) -> Optional[str]:
+        """Currently cached token, if still valid"""
+        return self.tokens.token
     
     def authenticate(self) -> bool:
-        """Authenticate with Pineapple and get token"""
-        try:
-            self.discover_url()
-            resp = requests.post(
-                f'{self.base_url}/api/login',
-                json={'username': self.username, 'password': self.password},
-                timeout=8
-            )
-            
-            if resp.status_code == 200:
-                data = resp.json()
-                self.token = data.get('token')
-                if self.token:
-                    logger.info('Pineapple authenticated')
-                    return True
-            
-            # Retry with forced discovery
-            self.discover_url(force=True)
-            resp = requests.post(
-                f'{self.base_url}/api/login',
-                json={'username': self.username, 'password': self.password},
-                timeout=8
-            )
-            
-            if resp.status_code == 200:
-                data = resp.json()
-                self.token = data.get('token')
-                if self.token:
-                    logger.info('Pineapple authenticated (after rediscovery)')
-                    return True
-        
-        except Exception as e:
-            logger.error(f"Pineapple authentication failed: {e}")
-        
-        return False
+        """Force a fresh login (e.g. after the user changed URL or credentials)"""
+        return bool(self.tokens.get(force=True))
     
     def is_authenticated(self) -> bool:
-        """Check if we have a valid token"""
-        if not self.token:
-            return self.authenticate()
-        return True
+        """Check if we have a valid token, logging in only when it is missing or expired"""
+        return bool(self.tokens.get())
     
     def api_call(self, endpoint: str, method: str = 'GET', data: dict = None) -> Dict:
-        """Make API call to Pineapple"""
-        if not self.is_authenticated():
-            return {'error': 'Pineapple authentication failed'}
-        
-        headers = {'Authorization': f'Bearer {self.token}'}
-        url = f'{self.base_url}{endpoint}'
-        
-        try:
-            resp = requests.request(method, url, headers=headers, json=data, timeout=10)
+        """Make API call to Pineapple, re-authenticating once if the token is rejected"""
+        for attempt in range(2):
+            token = self.tokens.get()
+            if not token:
+                return {'error': 'Pineapple authentication failed'}
+            
+            headers = {'Authorization': f'Bearer {token}'}
+            
+            try:
+                resp = self.http.request(method, self.base_url, endpoint, headers=headers, json=data)
+            except requests.Timeout:
+                return {'error': 'Pineapple request timed out'}
+            except requests.ConnectionError:
+                return {'error': 'Cannot reach WiFi Pineapple'}
+            except Exception as e:
+                return {'error': str(e)}
+            
+            if resp.status_code in (401, 403) and attempt == 0:
+                self.tokens.invalidate(token)
+                continue
             
             if resp.status_code == 200:
                 try:
                     return resp.json()
                 except ValueError:
                     return {'result': resp.text}
-            else:
-                return {'error': f'{resp.status_code}: {resp.text}'}
-        
-        except requests.Timeout:
-            return {'error': 'Pineapple request timed out'}
-        except requests.ConnectionError:
-            return {'error': 'Cannot reach WiFi Pineapple'}
-        except Exception as e:
-            return {'error': str(e)}
+            return {'error': f'{resp.status_code}: {resp.text}'}
     
     def get_status(self) -> Dict:
         """Get Pineapple status"""
@@ -0,0 +1,322 @@
+"""
+Incremental backup/sync of Flipper storage into a local mirror.
+Walks the device tree over RPC, compares size/md5 against a manifest kept next to
+the mirror and transfers only files that changed. One RPC session is held for
+the whole run and reopened only after a transport error. The manifest is saved
+every few files or seconds and when the run ends, so an interrupted run (unplug,
+crash) resumes close to where it stopped.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from flipper_rpc import RPCError
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = '.flipper_manifest.json'
+# Files whose md5 is looked up per RPC session when listings do not include it
+MD5_BATCH = 32
+# Manifest checkpoint: after this many transferred files or seconds, whichever comes first
+MANIFEST_SAVE_FILES = 25
+MANIFEST_SAVE_INTERVAL = 5.0
+
+
+class BackupCancelled(Exception):
+    pass
+
+
+class BackupJob:
+    """Mirror `root` on the device into `dest_dir`, transferring only changed files.
+
+    `device` needs `connected`, `connect()` and an `rpc_session()` context manager,
+    as provided by FlipperDevice.
+    """
+
+    def __init__(self, device, dest_dir: str, root: str = '/ext', prune: bool = False,
+                 reconnect_attempts: int = 5, reconnect_delay: float = 2.0,
+                 on_progress: Callable[[Dict], None] = None):
+        self.device = device
+        self.dest_dir = os.path.abspath(dest_dir)
+        self.root = '/' + root.strip('/')
+        self.prune = prune
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_delay = reconnect_delay
+        self.on_progress = on_progress
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._session = None
+        self._unsaved = 0
+        self._saved_at = 0.0
+        self.progress = {
+            'state': 'idle', 'root': self.root, 'dest': self.dest_dir,
+            'files_total': 0, 'files_checked': 0, 'files_changed': 0, 'files_done': 0,
+            'bytes_total': 0, 'bytes_done': 0, 'current': None, 'reconnects': 0,
+            'errors': [], 'started_at': None, 'finished_at': None,
+        }
+
+    # Public API
+
+    def start(self) -> threading.Thread:
+        """Run the backup on a background thread"""
+        self._thread = threading.Thread(target=self._run_safe, daemon=True, name='flipper-backup')
+        self._thread.start()
+        return self._thread
+
+    def cancel(self):
+        self._cancel.set()
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def status(self) -> Dict:
+        with self._lock:
+            status = dict(self.progress)
+            status['errors'] = list(status['errors'])
+            return status
+
+    def run(self) -> Dict:
+        """Run the backup synchronously and return the final status"""
+        self._update(state='scanning', started_at=datetime.utcnow().isoformat() + 'Z', finished_at=None)
+        manifest = self._load_manifest()
+        self._saved_at = time.monotonic()
+        try:
+            remote = self._scan()
+            changed = self._compare(remote, manifest)
+            self._update(state='transferring', files_changed=len(changed),
+                         bytes_total=sum(remote[p]['size'] for p in changed))
+            for path in changed:
+                self._transfer(path, remote[path], manifest)
+            self._reconcile_deleted(remote, manifest)
+        finally:
+            self._close_session()
+            if self._unsaved:
+                self._save_manifest(manifest)
+        self._update(state='done', current=None, finished_at=datetime.utcnow().isoformat() + 'Z')
+        return self.status()
+
+    # Steps
+
+    def _scan(self) -> Dict[str, Dict]:
+        """Walk the device tree; returns {remote_path: {'size', 'md5'}} for every file"""
+        files = {}
+        pending = [self.root]
+        while pending:
+            directory = pending.pop()
+            entries = self._with_session(lambda rpc: rpc.list(directory, include_md5=True))
+            for entry in entries:
+                path = f"{directory.rstrip('/')}/{entry['name']}"
+                if entry['type'] == 'dir':
+                    pending.append(path)
+                else:
+                    files[path] = {'size': entry['size'], 'md5': entry.get('md5')}
+            self._update(files_total=len(files), current=directory)
+        return files
+
+    def _compare(self, remote: Dict[str, Dict], manifest: Dict) -> List[str]:
+        """Return remote paths whose content differs from the local mirror"""
+        known = manifest['files']
+        changed, need_md5 = [], []
+        for path, info in sorted(remote.items()):
+            local = self._local_path(path)
+            if local is None:
+                self._record_error(path, 'Refusing to write outside the mirror directory')
+                continue
+            entry = known.get(path)
+            if not entry or entry.get('size') != info['size'] or not os.path.exists(local):
+                changed.append(path)
+            elif info['md5'] is None:
+                # Same size: only the device-side md5 can tell whether it changed
+                need_md5.append(path)
+            elif info['md5'] != entry.get('md5'):
+                changed.append(path)
+            else:
+                self._bump('files_checked')
+        for i in range(0, len(need_md5), MD5_BATCH):
+            batch = need_md5[i:i + MD5_BATCH]
+            sums = self._with_session(lambda rpc: [rpc.md5sum(p) for p in batch])
+            for path, md5 in zip(batch, sums):
+                remote[path]['md5'] = md5
+                if md5 != known[path].get('md5'):
+                    changed.append(path)
+                self._bump('files_checked')
+        self._update(files_checked=len(remote))
+        return changed
+
+    def _transfer(self, path: str, info: Dict, manifest: Dict):
+        self._update(current=path)
+        local = self._local_path(path)
+        os.makedirs(os.path.dirname(local), exist_ok=True)
+
+        def download(rpc):
+            digest = hashlib.md5()
+            received = 0
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(local), prefix='.part-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in rpc.iter_read(path):
+                        self._check_cancel()
+                        f.write(chunk)
+                        digest.update(chunk)
+                        received += len(chunk)
+                        self._bump('bytes_done', len(chunk))
+            except BaseException:
+                os.unlink(tmp)
+                # A retried download starts from zero again
+                self._bump('bytes_done', -received)
+                raise
+            return tmp, digest.hexdigest()
+
+        try:
+            tmp, md5 = self._with_session(download)
+        except RPCError as e:
+            self._record_error(path, e)
+            return
+        if info.get('md5') and md5 != info['md5']:
+            os.unlink(tmp)
+            self._record_error(path, f'md5 mismatch (device {info["md5"]}, received {md5})')
+            return
+        os.replace(tmp, local)
+        manifest['files'][path] = {'size': info['size'], 'md5': md5,
+                                   'synced_at': datetime.utcnow().isoformat() + 'Z'}
+        self._unsaved += 1
+        if self._unsaved >= MANIFEST_SAVE_FILES or time.monotonic() - self._saved_at >= MANIFEST_SAVE_INTERVAL:
+            self._save_manifest(manifest)
+        self._bump('files_done')
+
+    def _reconcile_deleted(self, remote: Dict[str, Dict], manifest: Dict):
+        gone = [p for p in manifest['files'] if p not in remote and p.startswith(self.root + '/')]
+        for path in gone:
+            manifest['files'].pop(path, None)
+            if self.prune:
+                local = self._local_path(path)
+                if local and os.path.exists(local):
+                    os.unlink(local)
+        self._unsaved += len(gone)
+
+    # Reconnect/resume
+
+    def _with_session(self, fn):
+        """Run fn(rpc) in the job's RPC session, reopening it after the device comes back from a transport error"""
+        attempt = 0
+        while True:
+            self._check_cancel()
+            try:
+                return fn(self._open_session())
+            except RPCError as e:
+                if e.status is not None:
+                    raise
+                err = e
+            except BackupCancelled:
+                raise
+            except Exception as e:
+                err = e
+            attempt += 1
+            if attempt > self.reconnect_attempts:
+                raise RuntimeError(f'Device unavailable: {err}')
+            logger.warning('Backup interrupted (%s); reconnecting (%d/%d)', err, attempt, self.reconnect_attempts)
+            self._bump('reconnects')
+            self._close_session()
+            try:
+                self.device.disconnect()
+            except Exception:
+                pass
+            self._cancel.wait(self.reconnect_delay)
+
+    def _open_session(self):
+        if self._session is None:
+            if not self.device.connected and not self.device.connect():
+                raise RuntimeError('Flipper not connected')
+            stack = ExitStack()
+            rpc = stack.enter_context(self.device.rpc_session())
+            self._session = (stack, rpc)
+        return self._session[1]
+
+    def _close_session(self):
+        if self._session is None:
+            return
+        stack, _ = self._session
+        self._session = None
+        try:
+            stack.close()
+        except Exception as e:
+            # The port may already be gone; the reconnect path resets it anyway
+            logger.debug('Closing backup RPC session failed: %s', e)
+
+    # Helpers
+
+    def _local_path(self, remote_path: str) -> Optional[str]:
+        """Mirror path for a device path, or None if it would escape the mirror directory"""
+        local = os.path.normpath(os.path.join(self.dest_dir, remote_path.lstrip('/')))
+        if not local.startswith(self.dest_dir + os.sep):
+            return None
+        return local
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.dest_dir, MANIFEST_NAME)
+
+    def _load_manifest(self) -> Dict:
+        try:
+            with open(self._manifest_path(), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if isinstance(manifest.get('files'), dict):
+                return manifest
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning('Ignoring unreadable backup manifest: %s', e)
+        return {'version': 1, 'files': {}}
+
+    def _save_manifest(self, manifest: Dict):
+        os.makedirs(self.dest_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.dest_dir, prefix='.manifest-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp, self._manifest_path())
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+
+    def _check_cancel(self):
+        if self._cancel.is_set():
+            raise BackupCancelled()
+
+    def _record_error(self, path: str, error):
+        logger.error('Backup of %s failed: %s', path, error)
+        with self._lock:
+            self.progress['errors'].append({'path': path, 'error': str(error)})
+
+    def _bump(self, key: str, amount: int = 1):
+        with self._lock:
+            self.progress[key] += amount
+        self._notify()
+
+    def _update(self, **fields):
+        with self._lock:
+            self.progress.update(fields)
+        self._notify()
+
+    def _notify(self):
+        if self.on_progress:
+            try:
+                self.on_progress(self.status())
+            except Exception:
+                logger.debug('Backup progress callback failed')
+
+    def _run_safe(self):
+        try:
+            self.run()
+        except BackupCancelled:
+            self._update(state='cancelled', finished_at=datetime.utcnow().isoformat() + 'Z')
+        except Exception as e:
+            logger.error('Backup failed: %s', e)
+            self._record_error(self.progress.get('current') or self.root, e)
+            self._update(state='failed', finished_at=datetime.utcnow().isoformat() + 'Z')
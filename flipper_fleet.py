@@ -0,0 +1,209 @@
+"""
+Fleet of Flipper Zeros (e.g. on a powered USB hub).
+Each device is a FlipperDevice pinned to its own port, so every device has its
+own serial-owner thread; fan-out operations run on all of them concurrently and
+return per-device results keyed by serial number (hardware UID) or port.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from serial.tools import list_ports
+
+from device_manager import FlipperDevice
+from flipper_probe import is_flipper_port
+
+logger = logging.getLogger(__name__)
+
+
+class FleetMember:
+    """A managed device plus the health counters reported by /status/devices"""
+
+    def __init__(self, device_id: str, device: FlipperDevice):
+        self.id = device_id
+        self.device = device
+        self.last_ok = None
+        self.last_error = None
+        self.ops = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self._lock = threading.Lock()
+
+    def record(self, ok: bool, error: str = None):
+        with self._lock:
+            self.ops += 1
+            if ok:
+                self.last_ok = datetime.utcnow().isoformat() + 'Z'
+                self.consecutive_failures = 0
+            else:
+                self.failures += 1
+                self.consecutive_failures += 1
+                self.last_error = error
+
+    def status(self) -> Dict:
+        dev = self.device
+        caps = dev.capabilities(probe=False)
+        connected = bool(dev.connected and dev.ser is not None and dev.ser.is_open)
+        with self._lock:
+            return {
+                'id': self.id,
+                'port': dev.port,
+                'connected': connected,
+                'healthy': connected and self.consecutive_failures == 0,
+                'name': caps.get('hardware'),
+                'firmware_version': caps.get('firmware_version'),
+                'api_level': caps.get('api_level'),
+                'queue': dev.scheduler.stats()['depth'],
+                'ops': self.ops,
+                'failures': self.failures,
+                'consecutive_failures': self.consecutive_failures,
+                'last_ok': self.last_ok,
+                'last_error': self.last_error,
+            }
+
+
+class FlipperFleet:
+    """Registry of Flippers keyed by hardware UID (or port when the firmware does not report one)"""
+
+    def __init__(self, device_factory: Callable[[str], FlipperDevice] = None, max_workers: int = 16):
+        self.device_factory = device_factory or (lambda port: FlipperDevice(port=port, auto_detect=False))
+        self.max_workers = max_workers
+        self._members = {}
+        self._lock = threading.Lock()
+        self._pool = None
+
+    # Registry
+
+    def scan(self, exclude: Iterable[str] = ()) -> List[str]:
+        """Connect every Flipper port not yet managed (nor in `exclude`); returns the new device ids"""
+        exclude = set(p for p in exclude if p)
+        managed = set(self.ports())
+        try:
+            ports = [p.device for p in list_ports.comports() if is_flipper_port(p)]
+        except Exception as e:
+            logger.debug(f"Could not enumerate serial ports: {e}")
+            ports = []
+        candidates = [p for p in ports if p not in managed and p not in exclude]
+        added = [device_id for device_id in self._map(self._attach, candidates).values() if device_id]
+        if added:
+            logger.info(f"Fleet: {len(added)} new Flipper(s), {len(self)} managed")
+        return added
+
+    def _attach(self, port: str) -> Optional[str]:
+        device = self.device_factory(port)
+        if not device.connect():
+            return None
+        caps = device.capabilities()
+        device_id = caps.get('uid') or port
+        with self._lock:
+            old = self._members.get(device_id)
+            if old is not None and old.device is not device:
+                # Same Flipper re-enumerated on a new port
+                old.device.disconnect()
+            self._members[device_id] = FleetMember(device_id, device)
+        return device_id
+
+    def add(self, device_id: str, device: FlipperDevice) -> FleetMember:
+        with self._lock:
+            member = self._members[device_id] = FleetMember(device_id, device)
+        return member
+
+    def remove(self, device_id: str) -> bool:
+        with self._lock:
+            member = self._members.pop(device_id, None)
+        if member is None:
+            return False
+        member.device.disconnect()
+        return True
+
+    def get(self, device_id: str) -> Optional[FleetMember]:
+        with self._lock:
+            return self._members.get(device_id)
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return sorted(self._members)
+
+    def ports(self) -> List[str]:
+        """Ports currently held by connected fleet members"""
+        with self._lock:
+            return [m.device.port for m in self._members.values() if m.device.connected]
+
+    def disconnect_ports(self, ports: Iterable[str]) -> List[str]:
+        """Disconnect members on ports that went away; they stay registered and reconnect on next use"""
+        ports = set(ports)
+        with self._lock:
+            gone = [m for m in self._members.values() if m.device.port in ports]
+        for member in gone:
+            member.device.disconnect()
+        return [m.id for m in gone]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._members)
+
+    def status(self) -> List[Dict]:
+        with self._lock:
+            members = list(self._members.values())
+        return [m.status() for m in sorted(members, key=lambda m: m.id)]
+
+    # Fan-out
+
+    def run(self, fn: Callable[[FlipperDevice], object], device_ids: List[str] = None) -> Dict[str, Dict]:
+        """Call fn(device) on every selected device concurrently.
+
+        Returns {device_id: {'ok', 'elapsed_ms', 'result' | 'error'}}; unknown ids report an error.
+        """
+        with self._lock:
+            targets = {i: self._members.get(i) for i in (device_ids if device_ids is not None else self._members)}
+
+        def call(item):
+            device_id, member = item
+            if member is None:
+                return {'ok': False, 'error': 'Unknown device', 'elapsed_ms': 0.0}
+            start = time.monotonic()
+            try:
+                if not member.device.connected and not member.device.connect():
+                    raise RuntimeError('Flipper not connected')
+                result = fn(member.device)
+                outcome = {'ok': True, 'result': result}
+            except Exception as e:
+                outcome = {'ok': False, 'error': str(e)}
+            outcome['elapsed_ms'] = round((time.monotonic() - start) * 1000, 2)
+            member.record(outcome['ok'], outcome.get('error'))
+            return outcome
+
+        return dict(zip(targets, self._map(call, list(targets.items())).values()))
+
+    def send_batch(self, commands: List[str], device_ids: List[str] = None, stop_on_error: bool = False) -> Dict:
+        return self.run(lambda d: d.send_batch(commands, stop_on_error=stop_on_error), device_ids)
+
+    def list_entries(self, path: str, device_ids: List[str] = None) -> Dict:
+        return self.run(lambda d: d.list_entries(path, strict=True), device_ids)
+
+    def read_file_bytes(self, path: str, device_ids: List[str] = None) -> Dict:
+        return self.run(lambda d: d.read_file_bytes(path, strict=True), device_ids)
+
+    def write_file(self, path: str, data: bytes, device_ids: List[str] = None) -> Dict:
+        return self.run(lambda d: d.write_file(path, data), device_ids)
+
+    def close(self):
+        for device_id in self.ids():
+            self.remove(device_id)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+
+    def _map(self, fn, items: list) -> Dict[int, object]:
+        """Run fn over items on the shared pool; results by input index"""
+        if not items:
+            return {}
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='flipper-fleet')
+            pool = self._pool
+        futures = [pool.submit(fn, item) for item in items]
+        return {i: f.result() for i, f in enumerate(futures)}
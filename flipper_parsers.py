@@ -0,0 +1,76 @@
+"""
+Parsers for Flipper CLI monitor output.
+Turn `info device`, `free`, `uptime` and `storage info` responses into typed
+records so API clients do not have to re-parse the text. Every parser tolerates
+the echoed command line and missing fields; unknown lines are ignored.
+"""
+
+import re
+from typing import Dict, Optional
+
+# "key : value" (info device pads keys with spaces before the colon)
+_KEY_VALUE_RE = re.compile(r'^\s*([^\s:]+)\s*:\s*(.*?)\s*$')
+# "Free heap size: 112344"
+_FREE_LINE_RE = re.compile(r'^\s*([A-Za-z][A-Za-z ]*?)\s*:\s*(\d+)\s*$')
+# "Uptime: 1d 2h3m4s" / "Uptime: 0h0m5s"
+_UPTIME_PART_RE = re.compile(r'(\d+)\s*([dhms])(?![a-z])', re.IGNORECASE)
+_UPTIME_LINE_RE = re.compile(r'uptime\s*:\s*(.+)', re.IGNORECASE)
+# "16088320KiB total" / "188KiB free"
+_STORAGE_SIZE_RE = re.compile(r'^\s*(\d+)\s*([KMG]?)i?B\s+(total|free)\s*$', re.IGNORECASE)
+_STORAGE_FIELD_RE = re.compile(r'^\s*(Label|Type)\s*:\s*(.*?)\s*$', re.IGNORECASE)
+_NON_WORD_RE = re.compile(r'\W+')
+
+_UNIT_SECONDS = {'d': 86400, 'h': 3600, 'm': 60, 's': 1}
+_SIZE_MULTIPLIERS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_device_info(text: str) -> Dict[str, str]:
+    """`info device` "key : value" lines as a dict (dotted keys normalised to underscores)"""
+    info = {}
+    for line in text.splitlines():
+        match = _KEY_VALUE_RE.match(line)
+        if match:
+            info[match.group(1).replace('.', '_')] = match.group(2)
+    return info
+
+
+def parse_free(text: str) -> Dict[str, int]:
+    """`free` output as byte counts keyed by the snake_cased label ('free_heap_size', 'pool_free', ...)"""
+    memory = {}
+    for line in text.splitlines():
+        match = _FREE_LINE_RE.match(line)
+        if match:
+            memory[_NON_WORD_RE.sub('_', match.group(1).strip().lower())] = int(match.group(2))
+    return memory
+
+
+def parse_uptime(text: str) -> Optional[int]:
+    """`uptime` output in seconds; None when there is no recognisable duration"""
+    match = _UPTIME_LINE_RE.search(text)
+    parts = _UPTIME_PART_RE.findall(match.group(1) if match else text)
+    if not parts:
+        return None
+    return sum(int(value) * _UNIT_SECONDS[unit.lower()] for value, unit in parts)
+
+
+def parse_storage_info(text: str) -> Dict:
+    """`storage info <path>` as {'label', 'type', 'total_bytes', 'free_bytes'} (absent fields are None)"""
+    info = {'label': None, 'type': None, 'total_bytes': None, 'free_bytes': None}
+    for line in text.splitlines():
+        size = _STORAGE_SIZE_RE.match(line)
+        if size:
+            info[f'{size.group(3).lower()}_bytes'] = int(size.group(1)) * _SIZE_MULTIPLIERS[size.group(2).upper()]
+            continue
+        field = _STORAGE_FIELD_RE.match(line)
+        if field:
+            info[field.group(1).lower()] = field.group(2) or None
+    return info
+
+
+def monitor_fields(info_raw: str, uptime_raw: str, memory_raw: str) -> Dict:
+    """Typed monitor fields: {'device': {...}, 'uptime_seconds': int|None, 'heap': {...}}"""
+    return {
+        'device': parse_device_info(info_raw),
+        'uptime_seconds': parse_uptime(uptime_raw),
+        'heap': parse_free(memory_raw),
+    }
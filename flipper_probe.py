@@ -0,0 +1,178 @@
+"""
+Flipper port discovery.
+Filters serial ports by USB VID/PID and descriptors, probes the remaining
+candidates concurrently with a CLI handshake (newline -> `>: ` prompt) and
+remembers which USB serial numbers turned out to be Flipper Zeros, so the
+next connect tries that port alone first.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from serial.tools import list_ports
+
+import local_state
+
+logger = logging.getLogger(__name__)
+
+# USB VID/PID of the Flipper Zero CDC serial interface
+FLIPPER_USB_IDS = {(0x0483, 0x5740)}
+FLIPPER_PROMPT = b'>: '
+CACHE_FILE = 'flipper_ports.json'
+
+
+def port_info(port) -> Dict:
+    """The list_ports metadata we care about, as a plain dict"""
+    return {attr: getattr(port, attr, None)
+            for attr in ('device', 'vid', 'pid', 'serial_number', 'description', 'product', 'manufacturer')}
+
+
+def classify(info: Dict) -> str:
+    """'flipper' (VID/PID or descriptor match), 'other' (USB IDs of something else) or 'unknown'"""
+    if (info.get('vid'), info.get('pid')) in FLIPPER_USB_IDS:
+        return 'flipper'
+    text = ' '.join(str(info.get(attr) or '') for attr in ('product', 'description', 'manufacturer'))
+    if 'flipper' in text.lower():
+        return 'flipper'
+    return 'other' if info.get('vid') is not None and info.get('pid') is not None else 'unknown'
+
+
+def is_flipper_port(port) -> bool:
+    return classify(port_info(port)) == 'flipper'
+
+
+def handshake(ser, timeout: float = 0.5, poll_interval: float = 0.005) -> bool:
+    """Send a bare newline and wait for the CLI prompt"""
+    try:
+        ser.reset_input_buffer()
+        ser.write(b'\r\n')
+    except Exception:
+        return False
+    buf = bytearray()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        waiting = ser.in_waiting
+        if waiting:
+            buf.extend(ser.read(waiting))
+            if FLIPPER_PROMPT in buf:
+                # Swallow the rest of the banner so the first command starts clean
+                time.sleep(poll_interval)
+                if ser.in_waiting:
+                    ser.read(ser.in_waiting)
+                return True
+            continue
+        time.sleep(poll_interval)
+    return False
+
+
+def _close(ser):
+    try:
+        ser.close()
+    except Exception:
+        pass
+
+
+def _load_cache() -> Dict:
+    return local_state.load_json(CACHE_FILE, {}) or {}
+
+
+def _remember(info: Dict):
+    serial_number = info.get('serial_number')
+    if not serial_number:
+        return
+    cache = _load_cache()
+    if cache.get(serial_number, {}).get('port') != info['device']:
+        cache[serial_number] = {'port': info['device'], 'verified_at': datetime.utcnow().isoformat() + 'Z'}
+        local_state.save_json(CACHE_FILE, cache)
+
+
+def candidate_ports(preferred: str = None, exclude: Iterable[str] = (), auto_detect: bool = True) -> List[Dict]:
+    """Ports worth probing, most likely first: known Flipper serials, the configured port,
+    VID/PID or descriptor matches, a configured port the OS does not list, then ports without
+    USB metadata. Ports that identify as other devices are dropped unless configured.
+    """
+    exclude = set(p for p in exclude if p)
+    try:
+        infos = [port_info(p) for p in list_ports.comports()]
+    except Exception as e:
+        logger.debug(f"Could not enumerate serial ports: {e}")
+        infos = []
+    listed = any(i['device'] == preferred for i in infos)
+    if preferred and not listed:
+        infos.insert(0, {'device': preferred})
+    if not auto_detect:
+        infos = [i for i in infos if i['device'] == preferred]
+    known = _load_cache()
+
+    def rank(info):
+        if info.get('serial_number') in known:
+            return 0
+        if info['device'] == preferred:
+            return 1 if listed else 3
+        return 2 if classify(info) == 'flipper' else 4
+
+    ports = [i for i in infos if i['device'] and i['device'] not in exclude
+             and (i['device'] == preferred or classify(i) != 'other')]
+    return sorted(ports, key=rank)
+
+
+def find_flipper(open_port: Callable[[str], object], preferred: str = None, exclude: Iterable[str] = (),
+                 auto_detect: bool = True, handshake_timeout: float = 0.5,
+                 max_workers: int = 8) -> Optional[Tuple[str, object, bool]]:
+    """Open the most likely Flipper port; returns (port, serial, verified) or None.
+
+    Candidates are probed concurrently, so connect time is bounded by the slowest single
+    open + handshake rather than their sum. A port that answered the handshake always wins;
+    otherwise the best-ranked port that opened is returned unverified, but only if it is the
+    configured port or identifies as a Flipper by USB metadata.
+    """
+    candidates = candidate_ports(preferred, exclude, auto_detect)
+    if not candidates:
+        return None
+
+    def probe(info):
+        try:
+            ser = open_port(info['device'])
+        except Exception as e:
+            logger.debug(f"Failed to open {info['device']}: {e}")
+            return None, False
+        if not getattr(ser, 'is_open', False):
+            _close(ser)
+            return None, False
+        return ser, handshake(ser, handshake_timeout)
+
+    known = _load_cache()
+    # Fast path: a port whose USB serial number was a Flipper last time is tried alone
+    first = candidates[0]
+    if first.get('serial_number') in known:
+        ser, verified = probe(first)
+        if verified:
+            logger.info(f"Flipper Zero found on {first['device']} (known serial)")
+            return first['device'], ser, True
+        if ser is not None:
+            _close(ser)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(candidates)), thread_name_prefix='flipper-probe') as pool:
+        outcomes = list(pool.map(probe, candidates))
+
+    winner = next((i for i, (ser, ok) in enumerate(outcomes) if ok), None)
+    if winner is None:
+        # Nothing answered (busy CLI, RPC mode left over): take the best port that opened, as long
+        # as it is configured or looks like a Flipper; a silent port without USB metadata is not one
+        winner = next((i for i, (ser, ok) in enumerate(outcomes) if ser is not None
+                       and (candidates[i]['device'] == preferred or classify(candidates[i]) == 'flipper')), None)
+    for i, (ser, _) in enumerate(outcomes):
+        if ser is not None and i != winner:
+            _close(ser)
+    if winner is None:
+        return None
+    info, (ser, verified) = candidates[winner], outcomes[winner]
+    if verified:
+        _remember(info)
+        logger.info(f"Flipper Zero found on {info['device']}")
+    else:
+        logger.warning(f"No Flipper answered the handshake; using {info['device']} unverified")
+    return info['device'], ser, verified
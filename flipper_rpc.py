@@ -0,0 +1,370 @@
+"""
+Flipper Zero native RPC transport.
+After `start_rpc_session` the CLI switches to length-delimited protobuf `PB.Main`
+frames. Only the handful of messages used for storage transfer are implemented,
+with a minimal wire-format codec so no protobuf runtime or generated code is needed.
+"""
+
+import logging
+import time
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# PB.Main fields (flipper.proto)
+MAIN_COMMAND_ID = 1
+MAIN_COMMAND_STATUS = 2
+MAIN_HAS_NEXT = 3
+MAIN_EMPTY = 4
+MAIN_PING_REQUEST = 5
+MAIN_PING_RESPONSE = 6
+MAIN_STORAGE_LIST_REQUEST = 7
+MAIN_STORAGE_LIST_RESPONSE = 8
+MAIN_STORAGE_READ_REQUEST = 9
+MAIN_STORAGE_READ_RESPONSE = 10
+MAIN_STORAGE_WRITE_REQUEST = 11
+MAIN_STORAGE_DELETE_REQUEST = 12
+MAIN_STORAGE_MKDIR_REQUEST = 13
+MAIN_STORAGE_MD5SUM_REQUEST = 14
+MAIN_STORAGE_MD5SUM_RESPONSE = 15
+MAIN_STOP_SESSION = 19
+MAIN_STORAGE_STAT_REQUEST = 24
+MAIN_STORAGE_STAT_RESPONSE = 25
+
+# PB_Storage.File fields
+FILE_TYPE = 1
+FILE_NAME = 2
+FILE_SIZE = 3
+FILE_DATA = 4
+FILE_MD5 = 5
+FILE_TYPE_FILE = 0
+FILE_TYPE_DIR = 1
+
+# PB.CommandStatus names for error messages
+COMMAND_STATUS = {
+    0: 'OK',
+    1: 'ERROR',
+    2: 'ERROR_DECODE',
+    3: 'ERROR_NOT_IMPLEMENTED',
+    4: 'ERROR_BUSY',
+    5: 'ERROR_STORAGE_NOT_READY',
+    6: 'ERROR_STORAGE_EXIST',
+    7: 'ERROR_STORAGE_NOT_EXIST',
+    8: 'ERROR_STORAGE_INVALID_PARAMETER',
+    9: 'ERROR_STORAGE_DENIED',
+    10: 'ERROR_STORAGE_INVALID_NAME',
+    11: 'ERROR_STORAGE_INTERNAL',
+    12: 'ERROR_STORAGE_NOT_IMPLEMENTED',
+    13: 'ERROR_STORAGE_ALREADY_OPEN',
+    18: 'ERROR_STORAGE_DIR_NOT_EMPTY',
+}
+
+# Largest data payload the firmware accepts per storage frame
+CHUNK_SIZE = 512
+
+_WIRE_VARINT = 0
+_WIRE_LEN = 2
+
+
+class RPCError(Exception):
+    """Raised when the device answers with a non-OK status or the session breaks"""
+
+    def __init__(self, message: str, status: int = None):
+        super().__init__(message)
+        self.status = status
+
+
+# --- Minimal protobuf wire codec -------------------------------------------------
+
+def encode_varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        b = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+
+def decode_varint(buf: bytes, pos: int = 0):
+    """Return (value, next_pos)"""
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(buf):
+            raise RPCError('Truncated varint')
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+
+
+def field_varint(number: int, value: int) -> bytes:
+    return encode_varint(number << 3 | _WIRE_VARINT) + encode_varint(int(value))
+
+
+def field_bytes(number: int, value) -> bytes:
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    return encode_varint(number << 3 | _WIRE_LEN) + encode_varint(len(value)) + value
+
+
+def decode_fields(buf: bytes) -> Dict[int, list]:
+    """Decode a message into {field_number: [values]} (varints as int, length-delimited as bytes)"""
+    fields: Dict[int, list] = {}
+    pos = 0
+    while pos < len(buf):
+        key, pos = decode_varint(buf, pos)
+        number, wire = key >> 3, key & 7
+        if wire == _WIRE_VARINT:
+            value, pos = decode_varint(buf, pos)
+        elif wire == _WIRE_LEN:
+            length, pos = decode_varint(buf, pos)
+            value = bytes(buf[pos:pos + length])
+            pos += length
+        elif wire == 1:
+            value = bytes(buf[pos:pos + 8])
+            pos += 8
+        elif wire == 5:
+            value = bytes(buf[pos:pos + 4])
+            pos += 4
+        else:
+            raise RPCError(f'Unsupported wire type {wire}')
+        fields.setdefault(number, []).append(value)
+    return fields
+
+
+def _first(fields: Dict[int, list], number: int, default=None):
+    values = fields.get(number)
+    return values[0] if values else default
+
+
+def encode_file(name: str = None, data: bytes = None, ftype: int = None, size: int = None,
+                md5: str = None) -> bytes:
+    out = b''
+    if ftype:
+        out += field_varint(FILE_TYPE, ftype)
+    if name:
+        out += field_bytes(FILE_NAME, name)
+    if size:
+        out += field_varint(FILE_SIZE, size)
+    if data:
+        out += field_bytes(FILE_DATA, data)
+    if md5:
+        out += field_bytes(FILE_MD5, md5)
+    return out
+
+
+def decode_file(buf: bytes) -> Dict:
+    fields = decode_fields(buf)
+    return {
+        'name': _first(fields, FILE_NAME, b'').decode('utf-8', errors='replace'),
+        'type': 'dir' if _first(fields, FILE_TYPE, FILE_TYPE_FILE) == FILE_TYPE_DIR else 'file',
+        'size': _first(fields, FILE_SIZE, 0),
+        'data': _first(fields, FILE_DATA, b''),
+        'md5': _first(fields, FILE_MD5, b'').decode('ascii', errors='ignore') or None,
+    }
+
+
+def encode_main(command_id: int, content_field: int, content: bytes = b'',
+                has_next: bool = False, status: int = 0) -> bytes:
+    """Encode a PB.Main message (without the length prefix)"""
+    out = field_varint(MAIN_COMMAND_ID, command_id) if command_id else b''
+    if status:
+        out += field_varint(MAIN_COMMAND_STATUS, status)
+    if has_next:
+        out += field_varint(MAIN_HAS_NEXT, 1)
+    return out + field_bytes(content_field, content)
+
+
+def frame(message: bytes) -> bytes:
+    """Length-delimit a message the way pb_encode_delimited does"""
+    return encode_varint(len(message)) + message
+
+
+class RPCMessage:
+    """Decoded PB.Main frame"""
+
+    def __init__(self, raw: bytes):
+        fields = decode_fields(raw)
+        self.command_id = _first(fields, MAIN_COMMAND_ID, 0)
+        self.status = _first(fields, MAIN_COMMAND_STATUS, 0)
+        self.has_next = bool(_first(fields, MAIN_HAS_NEXT, 0))
+        self.content_field = None
+        self.content = b''
+        for number, values in fields.items():
+            if number > MAIN_HAS_NEXT:
+                self.content_field = number
+                self.content = values[0] if isinstance(values[0], bytes) else b''
+                break
+
+
+# --- Session --------------------------------------------------------------------
+
+class FlipperRPC:
+    """Protobuf RPC session over an open Flipper serial port.
+
+    Not thread-safe; callers hold the device lock for the lifetime of the session.
+    """
+
+    def __init__(self, ser, timeout: float = 5.0):
+        self.ser = ser
+        self.timeout = timeout
+        self.active = False
+        self._command_id = 0
+        self._rx = bytearray()
+
+    # Session control
+
+    def start(self):
+        """Switch the CLI into RPC mode"""
+        self.ser.reset_input_buffer()
+        self.ser.write(b'start_rpc_session\r')
+        # The CLI echoes the command line; everything after it is protobuf
+        self._read_until(b'\n')
+        self.active = True
+        self._rx.clear()
+
+    def stop(self):
+        """Return the port to the text CLI"""
+        if not self.active:
+            return
+        try:
+            self._send(MAIN_STOP_SESSION, b'')
+        finally:
+            self.active = False
+            self._rx.clear()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.stop()
+        except Exception as e:
+            logger.debug(f"RPC stop failed: {e}")
+
+    # Framing
+
+    def _next_id(self) -> int:
+        self._command_id = (self._command_id % 0xFFFFFFFF) + 1
+        return self._command_id
+
+    def _read_some(self, deadline: float) -> bytes:
+        waiting = getattr(self.ser, 'in_waiting', 0)
+        chunk = self.ser.read(waiting or 1)
+        if not chunk and time.monotonic() >= deadline:
+            raise RPCError('Timed out waiting for RPC response')
+        return chunk
+
+    def _read_until(self, marker: bytes):
+        deadline = time.monotonic() + self.timeout
+        buf = bytearray()
+        while not buf.endswith(marker):
+            buf.extend(self._read_some(deadline))
+        return bytes(buf)
+
+    def _read_frame(self) -> RPCMessage:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                length, pos = decode_varint(self._rx)
+            except RPCError:
+                length, pos = None, 0
+            if length is not None and len(self._rx) >= pos + length:
+                raw = bytes(self._rx[pos:pos + length])
+                del self._rx[:pos + length]
+                return RPCMessage(raw)
+            self._rx.extend(self._read_some(deadline))
+
+    def _send(self, content_field: int, content: bytes, command_id: int = None, has_next: bool = False) -> int:
+        command_id = command_id or self._next_id()
+        self.ser.write(frame(encode_main(command_id, content_field, content, has_next=has_next)))
+        return command_id
+
+    def _responses(self, command_id: int) -> Iterator[RPCMessage]:
+        """Yield every frame answering `command_id` until has_next is cleared"""
+        while True:
+            msg = self._read_frame()
+            if msg.command_id != command_id:
+                logger.debug('Skipping RPC frame for command %s', msg.command_id)
+                continue
+            if msg.status:
+                raise RPCError(f"RPC command failed: {COMMAND_STATUS.get(msg.status, msg.status)}", msg.status)
+            yield msg
+            if not msg.has_next:
+                return
+
+    def _call(self, content_field: int, content: bytes = b'') -> List[RPCMessage]:
+        return list(self._responses(self._send(content_field, content)))
+
+    # Commands
+
+    def ping(self, data: bytes = b'') -> bytes:
+        replies = self._call(MAIN_PING_REQUEST, field_bytes(1, data) if data else b'')
+        return _first(decode_fields(replies[-1].content), 1, b'')
+
+    def iter_read(self, path: str) -> Iterator[bytes]:
+        """Stream a file's contents chunk by chunk as the device sends them"""
+        command_id = self._send(MAIN_STORAGE_READ_REQUEST, field_bytes(1, path))
+        for msg in self._responses(command_id):
+            file_buf = _first(decode_fields(msg.content), 1)
+            if file_buf:
+                data = decode_file(file_buf)['data']
+                if data:
+                    yield data
+
+    def read_file(self, path: str) -> bytes:
+        return b''.join(self.iter_read(path))
+
+    def write_file(self, path: str, data: bytes, chunk_size: int = CHUNK_SIZE):
+        """Upload a file; chunks are pipelined back-to-back and acknowledged once at the end"""
+        command_id = self._next_id()
+        chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)] or [b'']
+        payload = bytearray()
+        for i, chunk in enumerate(chunks):
+            request = field_bytes(1, path) + field_bytes(2, encode_file(data=chunk))
+            payload += frame(encode_main(command_id, MAIN_STORAGE_WRITE_REQUEST, request,
+                                         has_next=i < len(chunks) - 1))
+        self.ser.write(bytes(payload))
+        for _ in self._responses(command_id):
+            pass
+
+    def list(self, path: str, include_md5: bool = False) -> List[Dict]:
+        """List a directory; with include_md5, newer firmware also returns each file's md5"""
+        request = field_bytes(1, path) + (field_varint(2, 1) if include_md5 else b'')
+        entries = []
+        for msg in self._call(MAIN_STORAGE_LIST_REQUEST, request):
+            for file_buf in decode_fields(msg.content).get(1, []):
+                entry = decode_file(file_buf)
+                entry.pop('data', None)
+                if not include_md5:
+                    entry.pop('md5', None)
+                entries.append(entry)
+        return entries
+
+    def stat(self, path: str) -> Optional[Dict]:
+        replies = self._call(MAIN_STORAGE_STAT_REQUEST, field_bytes(1, path))
+        file_buf = _first(decode_fields(replies[-1].content), 1)
+        if not file_buf:
+            return None
+        entry = decode_file(file_buf)
+        entry.pop('data', None)
+        entry.pop('md5', None)
+        return entry
+
+    def md5sum(self, path: str) -> str:
+        replies = self._call(MAIN_STORAGE_MD5SUM_REQUEST, field_bytes(1, path))
+        return _first(decode_fields(replies[-1].content), 1, b'').decode('ascii', errors='ignore')
+
+    def delete(self, path: str, recursive: bool = False):
+        request = field_bytes(1, path) + (field_varint(2, 1) if recursive else b'')
+        self._call(MAIN_STORAGE_DELETE_REQUEST, request)
+
+    def mkdir(self, path: str):
+        self._call(MAIN_STORAGE_MKDIR_REQUEST, field_bytes(1, path))
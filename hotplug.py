@@ -0,0 +1,169 @@
+"""
+Serial-port hotplug watcher.
+On Linux an inotify watch on /dev wakes the watcher as soon as a tty node
+appears or disappears; elsewhere (or if inotify is unavailable) it diffs the
+port enumeration once a second. Either way callers get add/remove events with
+list_ports metadata, and `ports()` serves the last enumeration as a cache
+that only changes when the hardware does.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import re
+import select
+import struct
+import threading
+from typing import Callable, Dict, List, Optional
+
+from serial.tools import list_ports
+
+from flipper_probe import port_info
+
+logger = logging.getLogger(__name__)
+
+IN_ATTRIB = 0x00000004
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+_EVENT_HEADER = struct.Struct('iIII')
+# /dev entries that can be serial ports (ACM/USB adapters, RFCOMM, macOS call-out devices)
+_SERIAL_NODE_RE = re.compile(r'^(tty(ACM|USB|AMA|S|rfcomm)\d+|cu\..+|tty\..+)$')
+
+
+def enumerate_ports() -> List[Dict]:
+    try:
+        return sorted((port_info(p) for p in list_ports.comports()), key=lambda p: p['device'] or '')
+    except Exception as e:
+        logger.debug(f"Could not enumerate serial ports: {e}")
+        return []
+
+
+class _Inotify:
+    """Minimal ctypes inotify binding; raises OSError when unsupported"""
+
+    def __init__(self, path: str, mask: int):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        if libc.inotify_add_watch(self.fd, path.encode(), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f'inotify_add_watch({path}) failed')
+
+    def read_names(self, timeout: float) -> Optional[List[str]]:
+        """Names touched within `timeout` seconds; None on timeout"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return None
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names, offset = [], 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            names.append(data[offset:offset + length].rstrip(b'\0').decode(errors='ignore'))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class HotplugWatcher:
+    """Calls on_change(added, removed) with port-info dicts whenever serial ports come or go"""
+
+    def __init__(self, on_change: Callable[[List[Dict], List[Dict]], None] = None,
+                 poll_interval: float = 1.0, debounce: float = 0.2, use_inotify: bool = True,
+                 dev_dir: str = '/dev'):
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        # udev creates the node first and fixes permissions/metadata a moment later
+        self.debounce = debounce
+        self.use_inotify = use_inotify
+        self.dev_dir = dev_dir
+        self.backend = None
+        self._ports = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> 'HotplugWatcher':
+        if self.running:
+            return self
+        self._stop.clear()
+        self.rescan(notify=False)
+        self._thread = threading.Thread(target=self._run, daemon=True, name='serial-hotplug')
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def ports(self) -> List[Dict]:
+        """Cached enumeration, refreshed only when a hotplug event arrives (or on first use)"""
+        with self._lock:
+            cached = self._ports
+        if cached is None:
+            self.rescan(notify=False)
+            with self._lock:
+                cached = self._ports
+        return [dict(p) for p in cached]
+
+    def invalidate(self):
+        with self._lock:
+            self._ports = None
+
+    def rescan(self, notify: bool = True):
+        """Re-enumerate, update the cache and report what changed"""
+        current = enumerate_ports()
+        with self._lock:
+            previous = self._ports
+            self._ports = current
+        if previous is None or not notify:
+            return [], []
+        before = {p['device']: p for p in previous}
+        after = {p['device']: p for p in current}
+        added = [after[d] for d in after if d not in before]
+        removed = [before[d] for d in before if d not in after]
+        if (added or removed) and self.on_change:
+            logger.info('Serial hotplug: +%s -%s', [p['device'] for p in added], [p['device'] for p in removed])
+            try:
+                self.on_change(added, removed)
+            except Exception as e:
+                logger.error(f"Hotplug handler failed: {e}")
+        return added, removed
+
+    def _run(self):
+        notifier = None
+        if self.use_inotify and os.path.isdir(self.dev_dir):
+            try:
+                notifier = _Inotify(self.dev_dir, IN_CREATE | IN_DELETE | IN_ATTRIB)
+            except (OSError, AttributeError) as e:
+                logger.debug(f"inotify unavailable, polling instead: {e}")
+        self.backend = 'inotify' if notifier else 'poll'
+        try:
+            while not self._stop.is_set():
+                if notifier is None:
+                    self._stop.wait(self.poll_interval)
+                    self.rescan()
+                    continue
+                names = notifier.read_names(timeout=1.0)
+                if not names or not any(_SERIAL_NODE_RE.match(n) for n in names):
+                    continue
+                # Let a burst of events (node, by-id links, permission changes) settle first
+                while notifier.read_names(timeout=self.debounce):
+                    pass
+                self.rescan()
+        finally:
+            if notifier is not None:
+                notifier.close()
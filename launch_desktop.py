@@ -1,38 +1,201 @@
 #!/usr/bin/env python3
 """
 Launcher script for Flipper-Pineapple Manager Desktop Application
-Installs dependencies and launches the PyQt6 app
+Checks dependencies and launches the PyQt6 app
+
+pip only runs when a requirement is missing or at the wrong version. The check
+result is cached against a fingerprint of the requirements file, the interpreter
+and the site-packages directories, so an unchanged environment starts without
+even reading package metadata.
 """
 
+import hashlib
+import importlib
+import json
+import os
+import re
 import subprocess
 import sys
-import os
+import time
 import logging
+from importlib import metadata
+
+import local_state
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def install_dependencies():
-    """Install required packages"""
-    logger.info("Installing dependencies...")
-    
-    requirements_file = os.path.join(os.path.dirname(__file__), 'requirements-desktop.txt')
-    
+REQUIREMENTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'requirements-desktop.txt')
+CACHE_FILE = 'launcher.json'
+
+_REQUIREMENT_RE = re.compile(r'^\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?\s*(.*?)\s*$')
+_SPEC_RE = re.compile(r'^(===|==|!=|~=|>=|<=|>|<)\s*(\S+)$')
+
+
+def parse_requirements(path: str = REQUIREMENTS_FILE):
+    """[(name, [(op, version), ...]), ...] for each requirement line; options and markers are skipped"""
+    requirements = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].split(';', 1)[0].strip()
+            if not line or line.startswith('-'):
+                continue
+            match = _REQUIREMENT_RE.match(line)
+            if not match:
+                continue
+            specs = []
+            for part in filter(None, (p.strip() for p in match.group(2).split(','))):
+                spec = _SPEC_RE.match(part)
+                if spec:
+                    specs.append(spec.groups())
+            requirements.append((match.group(1), specs))
+    return requirements
+
+
+_VERSION_RE = re.compile(r'^\s*v?(\d+(?:\.\d+)*)(.*)$')
+_PRERELEASE_RE = re.compile(r'^[-_.]?(a|b|c|rc|alpha|beta|pre|preview|dev)', re.IGNORECASE)
+
+
+def _specifier_set():
+    """packaging's SpecifierSet when it is importable (it usually is, pip depends on it)"""
     try:
-        subprocess.check_call([sys.executable, '-m', 'pip', 'install', '-r', requirements_file])
+        from packaging.specifiers import SpecifierSet
+    except ImportError:
+        return None
+    return SpecifierSet
+
+
+def _parse_version(version: str):
+    """(release tuple, is_prerelease); post and local segments are ignored"""
+    match = _VERSION_RE.match(version)
+    if not match:
+        return (), False
+    release = tuple(int(part) for part in match.group(1).split('.'))
+    return release, bool(_PRERELEASE_RE.match(match.group(2)))
+
+
+def _pad(release: tuple, length: int) -> tuple:
+    return release + (0,) * (length - len(release))
+
+
+def version_matches(installed: str, op: str, wanted: str) -> bool:
+    if op == '===':
+        return installed == wanted
+    specifier_set = _specifier_set()
+    if specifier_set is not None:
+        try:
+            return specifier_set(op + wanted).contains(installed, prereleases=True)
+        except Exception:
+            # Unparseable version or specifier: use the simple comparison below
+            pass
+    have, have_pre = _parse_version(installed)
+    if op == '==' and wanted.endswith('.*'):
+        prefix, _ = _parse_version(wanted[:-2])
+        return _pad(have, len(prefix))[:len(prefix)] == prefix
+    want, want_pre = _parse_version(wanted)
+    length = max(len(have), len(want))
+    # A pre-release sorts before its release
+    have_key = (_pad(have, length), 0 if have_pre else 1)
+    want_key = (_pad(want, length), 0 if want_pre else 1)
+    if op == '==':
+        return have_key == want_key and (not have_pre or installed.strip() == wanted.strip())
+    if op == '!=':
+        return not version_matches(installed, '==', wanted)
+    if op == '>=':
+        return have_key >= want_key
+    if op == '<=':
+        return have_key <= want_key
+    if op == '>':
+        return have_key > want_key
+    if op == '<':
+        return have_key < want_key
+    if op == '~=':
+        # ~=X.Y.Z means >=X.Y.Z and ==X.Y.*, compared on the unpadded prefix
+        prefix = want[:-1]
+        return have_key >= want_key and _pad(have, len(prefix))[:len(prefix)] == prefix
+    return True
+
+
+def unsatisfied(requirements) -> list:
+    """Requirement names that are not installed or whose installed version does not match"""
+    missing = []
+    for name, specs in requirements:
+        try:
+            installed = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            missing.append(name)
+            continue
+        if not all(version_matches(installed, op, wanted) for op, wanted in specs):
+            logger.info(f"{name} {installed} does not satisfy {','.join(op + v for op, v in specs)}")
+            missing.append(name)
+    return missing
+
+
+def fingerprint(path: str = REQUIREMENTS_FILE) -> str:
+    """Changes whenever the requirements, the interpreter or an installed distribution changes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        digest.update(f.read())
+    digest.update(sys.executable.encode())
+    digest.update(sys.version.encode())
+    # Installing or removing a distribution touches its site directory
+    for entry in sys.path:
+        if entry and os.path.isdir(entry):
+            try:
+                digest.update(f'{entry}:{os.stat(entry).st_mtime_ns}'.encode())
+            except OSError:
+                pass
+    return digest.hexdigest()
+
+
+def install_dependencies(requirements_file: str = REQUIREMENTS_FILE, force: bool = False):
+    """Run pip only when the environment does not satisfy the requirements; returns (ok, timings)"""
+    timings = {}
+    start = time.perf_counter()
+    key = fingerprint(requirements_file)
+    cached = local_state.load_json(CACHE_FILE, {}) or {}
+    timings['fingerprint'] = time.perf_counter() - start
+    if not force and cached.get('fingerprint') == key:
+        logger.info("Dependencies unchanged since last launch")
+        return True, timings
+
+    start = time.perf_counter()
+    missing = unsatisfied(parse_requirements(requirements_file))
+    timings['check'] = time.perf_counter() - start
+    if missing and not force:
+        logger.info(f"Missing or mismatched: {', '.join(missing)}")
+    if missing or force:
+        logger.info("Installing dependencies...")
+        start = time.perf_counter()
+        try:
+            subprocess.check_call([sys.executable, '-m', 'pip', 'install', '-r', requirements_file])
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Failed to install dependencies: {e}")
+            return False, timings
+        finally:
+            timings['install'] = time.perf_counter() - start
         logger.info("Dependencies installed successfully")
-        return True
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Failed to install dependencies: {e}")
-        return False
+        # pip changed site-packages: fingerprint the result rather than the pre-install tree
+        importlib.invalidate_caches()
+        if unsatisfied(parse_requirements(requirements_file)):
+            return False, timings
+        key = fingerprint(requirements_file)
+
+    local_state.save_json(CACHE_FILE, {'fingerprint': key, 'checked_at': time.time()})
+    return True, timings
 
-def launch_app():
+
+def launch_app(timings: dict = None):
     """Launch the desktop application"""
     logger.info("Launching Flipper-Pineapple Manager...")
-    
+
     try:
         # Import here so dependencies are already installed
+        start = time.perf_counter()
         from desktop_app import main
+        if timings is not None:
+            timings['import'] = time.perf_counter() - start
+            logger.info("Startup timings: " + json.dumps({k: round(v * 1000, 1) for k, v in timings.items()}) + " ms")
         main()
     except ImportError as e:
         logger.error(f"Failed to import application: {e}")
@@ -43,9 +206,12 @@ def launch_app():
         sys.exit(1)
 
 if __name__ == '__main__':
-    # Try to install dependencies first
-    if not install_dependencies():
-        logger.warning("Some dependencies may not have installed. Attempting to launch anyway...")
-    
+    force = '--reinstall' in sys.argv[1:]
+    timings = {}
+    if '--skip-install' not in sys.argv[1:]:
+        ok, timings = install_dependencies(force=force)
+        if not ok:
+            logger.warning("Some dependencies may not have installed. Attempting to launch anyway...")
+
     # Launch the application
-    launch_app()
+    launch_app(timings)
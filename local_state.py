@@ -0,0 +1,53 @@
+"""
+Small persistent state store for caches that should survive restarts
+(last-known-good Pineapple URL, port fingerprints, ...).
+Files are JSON under BADANTICS_STATE_DIR (default ~/.badantics) and are written atomically.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+
+def state_dir() -> str:
+    return os.getenv('BADANTICS_STATE_DIR', os.path.join(os.path.expanduser('~'), '.badantics'))
+
+
+def state_path(name: str) -> str:
+    return os.path.join(state_dir(), name)
+
+
+def load_json(name: str, default: Any = None) -> Any:
+    """Load a JSON state file, returning `default` when missing or unreadable"""
+    path = state_path(name)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except Exception as e:
+        logger.debug(f"Ignoring unreadable state file {path}: {e}")
+        return default
+
+
+def save_json(name: str, data: Any) -> bool:
+    """Atomically replace a JSON state file; returns False if it could not be written"""
+    path = state_path(name)
+    with _lock:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, path)
+            return True
+        except Exception as e:
+            logger.debug(f"Could not write state file {path}: {e}")
+            return False
@@ -0,0 +1,336 @@
+"""
+Shared HTTP client for WiFi Pineapple API traffic.
+Wraps a pooled keep-alive requests.Session with per-endpoint timeouts and a
+retry/backoff policy so polling does not pay a TCP handshake on every call.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Per-endpoint read timeouts (seconds); longest matching prefix wins
+DEFAULT_TIMEOUTS = {
+    '/api/login': 8.0,
+    '/api/status': 5.0,
+    '/api/notifications': 5.0,
+    '/api/pineap/log': 10.0,
+    '/api/pineap/settings': 10.0,
+}
+DEFAULT_TIMEOUT = 10.0
+PROBE_TIMEOUT = 3.0
+# TCP connect timeout; the Pineapple is on a local link so a slow connect means it is gone
+CONNECT_TIMEOUT = float(os.getenv('PINEAPPLE_CONNECT_TIMEOUT', '3'))
+
+POOL_CONNECTIONS = int(os.getenv('PINEAPPLE_POOL_CONNECTIONS', '4'))
+POOL_MAXSIZE = int(os.getenv('PINEAPPLE_POOL_MAXSIZE', '8'))
+RETRIES = int(os.getenv('PINEAPPLE_RETRIES', '2'))
+BACKOFF_FACTOR = float(os.getenv('PINEAPPLE_BACKOFF', '0.3'))
+
+# Assumed token lifetime when the login response does not say; refreshed a little early
+TOKEN_TTL = float(os.getenv('PINEAPPLE_TOKEN_TTL', '1800'))
+TOKEN_REFRESH_MARGIN = 30.0
+# After a failed login, callers get None for this long instead of hammering /api/login
+LOGIN_RETRY_AFTER = float(os.getenv('PINEAPPLE_LOGIN_RETRY_AFTER', '5'))
+
+# Consecutive transport failures that open the circuit, and how long it stays open before a trial call
+BREAKER_THRESHOLD = int(os.getenv('PINEAPPLE_BREAKER_THRESHOLD', '3'))
+BREAKER_RESET = float(os.getenv('PINEAPPLE_BREAKER_RESET', '15'))
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of sending a request while the circuit for a Pineapple is open"""
+
+    def __init__(self, base_url: str, retry_in: float):
+        super().__init__(f'Pineapple at {base_url} unavailable (circuit open, retry in {retry_in:.0f}s)')
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """closed -> open after `threshold` consecutive failures; after `reset_timeout` one
+    half-open trial call decides between closing again and another open period.
+    """
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, reset_timeout: float = BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def retry_in(self) -> float:
+        """Seconds until a trial call is allowed (0 when calls go through)"""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def rejecting(self) -> bool:
+        """True while calls would fail fast, without claiming the half-open trial"""
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() < self.opened_at + self.reset_timeout
+            return self.state == HALF_OPEN and self._trial
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() >= self.opened_at + self.reset_timeout:
+                self.state = HALF_OPEN
+                self._trial = False
+            if self.state == HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info('Pineapple circuit closed')
+            self.state = CLOSED
+            self.failures = 0
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.threshold:
+                if self.state != OPEN:
+                    logger.warning('Pineapple circuit opened after %d failure(s)', self.failures)
+                    self.trips += 1
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self._trial = False
+
+    def status(self) -> Dict:
+        retry_in = self.retry_in()
+        with self._lock:
+            return {'state': self.state, 'failures': self.failures, 'trips': self.trips,
+                    'retry_in': round(retry_in, 2)}
+
+
+def _build_session(retries: int, backoff_factor: float, pool_connections: int, pool_maxsize: int,
+                   connect_retries: int = None) -> requests.Session:
+    retry = Retry(
+        total=retries,
+        connect=retries if connect_retries is None else connect_retries,
+        # One read retry covers keep-alive sockets the device closed while idle
+        read=min(retries, 1),
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(502, 503, 504),
+        # Never replay non-idempotent calls (login, reboot) after a read error
+        allowed_methods=frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT'}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class PineappleClient:
+    """Pooled keep-alive HTTP client for the Pineapple REST API"""
+
+    def __init__(self, timeouts: Dict[str, float] = None, default_timeout: float = DEFAULT_TIMEOUT,
+                 connect_timeout: float = CONNECT_TIMEOUT, retries: int = RETRIES,
+                 backoff_factor: float = BACKOFF_FACTOR, pool_connections: int = POOL_CONNECTIONS,
+                 pool_maxsize: int = POOL_MAXSIZE, breaker_threshold: int = BREAKER_THRESHOLD,
+                 breaker_reset: float = BREAKER_RESET):
+        self.timeouts = dict(DEFAULT_TIMEOUTS if timeouts is None else timeouts)
+        self.default_timeout = default_timeout
+        self.connect_timeout = connect_timeout
+        # No connect retries: the breaker must see each refused/timed-out connect, so a dead
+        # unit costs one connect timeout per call instead of several with backoff in between
+        self.session = _build_session(retries, backoff_factor, pool_connections, pool_maxsize, connect_retries=0)
+        # Reachability probes must fail fast, so they get their own session without retries
+        self.probe_session = _build_session(0, 0, pool_connections, pool_maxsize)
+        # One breaker per base URL; probes bypass them so discovery can still find a revived device
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self._breakers = {}
+        self._breakers_lock = threading.Lock()
+
+    def breaker(self, base_url: str) -> CircuitBreaker:
+        with self._breakers_lock:
+            breaker = self._breakers.get(base_url)
+            if breaker is None:
+                breaker = self._breakers[base_url] = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+            return breaker
+
+    def timeout_for(self, endpoint: str) -> float:
+        """Return the configured read timeout for an API path"""
+        best = None
+        for prefix in self.timeouts:
+            if endpoint.startswith(prefix) and (best is None or len(prefix) > len(best)):
+                best = prefix
+        return self.timeouts[best] if best else self.default_timeout
+
+    def request(self, method: str, base_url: str, endpoint: str, timeout: float = None, **kwargs) -> requests.Response:
+        """Issue a request against `base_url + endpoint` on the pooled session.
+        Raises CircuitOpenError without touching the network while the device is considered dead.
+        """
+        breaker = self.breaker(base_url)
+        if not breaker.allow():
+            raise CircuitOpenError(base_url, breaker.retry_in())
+        read_timeout = timeout if timeout is not None else self.timeout_for(endpoint)
+        try:
+            resp = self.session.request(method, f'{base_url}{endpoint}',
+                                        timeout=(min(self.connect_timeout, read_timeout), read_timeout), **kwargs)
+        except Exception:
+            breaker.record_failure()
+            raise
+        if resp.status_code in (502, 503, 504):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return resp
+
+    def get(self, base_url: str, endpoint: str, **kwargs) -> requests.Response:
+        return self.request('GET', base_url, endpoint, **kwargs)
+
+    def post(self, base_url: str, endpoint: str, **kwargs) -> requests.Response:
+        return self.request('POST', base_url, endpoint, **kwargs)
+
+    def probe(self, base_url: str, timeout: float = PROBE_TIMEOUT) -> bool:
+        """Return True if the Pineapple API appears reachable at base_url"""
+        try:
+            # status endpoint is lightweight; 401/403 still proves the API is there
+            u = f"{base_url}/api/status" if not base_url.endswith('/api/status') else base_url
+            r = self.probe_session.get(u, timeout=timeout)
+            return r.status_code == 200 or r.status_code in (401, 403)
+        except Exception:
+            return False
+
+    def close(self):
+        self.session.close()
+        self.probe_session.close()
+
+
+class TokenManager:
+    """Caches a Pineapple auth token and refreshes it only on expiry or rejection.
+
+    `login` returns (token, expires_in) where expires_in may be None. Concurrent callers
+    that find the token missing or stale wait for a single login instead of each
+    posting their own.
+    """
+
+    def __init__(self, login: Callable[[], Tuple[Optional[str], Optional[float]]],
+                 ttl: float = TOKEN_TTL, refresh_margin: float = TOKEN_REFRESH_MARGIN,
+                 retry_after: float = LOGIN_RETRY_AFTER):
+        self.login = login
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.retry_after = retry_after
+        self._token = None
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        self._failed_at = 0.0
+        self._attempts = 0
+        self._state_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def token(self) -> Optional[str]:
+        """The cached token if it has not expired, without triggering a login"""
+        with self._state_lock:
+            return self._token if self._fresh() else None
+
+    def _fresh(self) -> bool:
+        return bool(self._token) and time.monotonic() < self._refresh_at
+
+    def _store(self, token: str, expires_in: Optional[float]):
+        """Cache a token; caller holds _state_lock"""
+        lifetime = expires_in or self.ttl
+        now = time.monotonic()
+        self._token = token
+        self._expires_at = now + lifetime
+        # A short-lived token would never be fresh under the full margin: refresh by half-life at the latest
+        self._refresh_at = self._expires_at - min(self.refresh_margin, lifetime / 2)
+
+    def get(self, force: bool = False) -> Optional[str]:
+        """Return a valid token, logging in at most once for all concurrent callers"""
+        with self._state_lock:
+            if not force and self._fresh():
+                return self._token
+            if not force and (time.monotonic() - self._failed_at) < self.retry_after:
+                return None
+            attempts = self._attempts
+
+        with self._refresh_lock:
+            with self._state_lock:
+                # Someone else finished a login while we were waiting: share its outcome
+                if self._attempts != attempts:
+                    return self._token if self._fresh() else None
+            try:
+                token, expires_in = self.login()
+            except Exception as e:
+                logger.error('Pineapple login failed: %s', e)
+                token, expires_in = None, None
+            with self._state_lock:
+                self._attempts += 1
+                if token:
+                    self._store(token, expires_in)
+                    self._failed_at = 0.0
+                else:
+                    self._token = None
+                    self._failed_at = time.monotonic()
+                return token
+
+    def invalidate(self, token: str = None):
+        """Drop the cached token; pass the rejected token so a newer one is not thrown away"""
+        with self._state_lock:
+            if token is None or token == self._token:
+                self._token = None
+                self._expires_at = 0.0
+                self._refresh_at = 0.0
+
+    def set(self, token: str, expires_in: float = None):
+        """Install a token obtained elsewhere"""
+        with self._state_lock:
+            self._store(token, expires_in)
+
+
+def parse_login_response(resp: requests.Response) -> Tuple[Optional[str], Optional[float]]:
+    """Extract (token, expires_in) from a /api/login response"""
+    if resp.status_code != 200:
+        return None, None
+    try:
+        data = resp.json()
+    except ValueError:
+        logger.error('Pineapple login returned non-JSON response')
+        return None, None
+    if not isinstance(data, dict):
+        return None, None
+    expires_in = data.get('expires_in')
+    try:
+        expires_in = float(expires_in) if expires_in else None
+    except (TypeError, ValueError):
+        expires_in = None
+    return data.get('token'), expires_in
+
+
+_shared_client: Optional[PineappleClient] = None
+_shared_lock = threading.Lock()
+
+
+def get_client() -> PineappleClient:
+    """Return the process-wide client shared by the Flask app and PineappleDevice"""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = PineappleClient()
+        return _shared_client
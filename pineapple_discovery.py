@@ -0,0 +1,196 @@
+"""
+WiFi Pineapple URL discovery.
+Builds candidate base URLs from the host's USB/RNDIS interfaces, probes them
+concurrently and remembers the last-known-good URL across restarts.
+"""
+
+import ipaddress
+import logging
+import os
+import re
+import socket
+import struct
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional
+
+import local_state
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CANDIDATES = ['http://172.16.42.1:1471', 'http://172.16.42.1']
+# Pineapple management networks live in 172.16.<x>.0/24 with the device at .1
+PINEAPPLE_NETWORK = ipaddress.ip_network('172.16.0.0/16')
+STATE_FILE = 'pineapple_discovery.json'
+# Interface enumeration is cheap on Linux but shells out on Windows; reuse it briefly
+INTERFACE_CACHE_TTL = 60.0
+
+_IPCONFIG_RE = re.compile(r'IPv4 Address[^:]*:\s*([0-9]{1,3}(?:\.[0-9]{1,3}){3})')
+
+_iface_cache = {'stamp': 0.0, 'addrs': []}
+_iface_lock = threading.Lock()
+
+
+def _windows_addresses() -> List[str]:
+    """IPv4 addresses reported by ipconfig"""
+    try:
+        out = subprocess.check_output(['ipconfig'], text=True, timeout=5, errors='ignore')
+    except Exception:
+        return []
+    return [m.group(1) for m in _IPCONFIG_RE.finditer(out)]
+
+
+def _linux_networks(route_file: str = '/proc/net/route') -> List[str]:
+    """Directly connected IPv4 networks from the kernel routing table, as host .1 addresses"""
+    addrs = []
+    try:
+        with open(route_file) as f:
+            lines = f.read().splitlines()[1:]
+    except OSError:
+        return addrs
+    for line in lines:
+        fields = line.split()
+        if len(fields) < 8:
+            continue
+        try:
+            dest = socket.inet_ntoa(struct.pack('<L', int(fields[1], 16)))
+            mask = socket.inet_ntoa(struct.pack('<L', int(fields[7], 16)))
+            net = ipaddress.ip_network(f'{dest}/{mask}', strict=False)
+        except (ValueError, struct.error, OSError):
+            continue
+        if net.prefixlen == 0 or net.num_addresses < 4:
+            continue
+        addrs.append(str(net.network_address + 1))
+    return addrs
+
+
+def local_addresses() -> List[str]:
+    """Host-side IPv4 addresses (or connected-network .1 hosts) worth deriving candidates from"""
+    with _iface_lock:
+        if time.monotonic() - _iface_cache['stamp'] < INTERFACE_CACHE_TTL:
+            return list(_iface_cache['addrs'])
+    if os.name == 'nt':
+        addrs = _windows_addresses()
+    elif os.path.exists('/proc/net/route'):
+        addrs = _linux_networks()
+    else:
+        addrs = []
+    with _iface_lock:
+        _iface_cache['stamp'] = time.monotonic()
+        _iface_cache['addrs'] = list(addrs)
+    return addrs
+
+
+def candidate_urls(addresses: List[str] = None) -> List[str]:
+    """Likely Pineapple base URLs derived from local interfaces, followed by the classic defaults"""
+    cands = []
+    for ip in local_addresses() if addresses is None else addresses:
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            continue
+        if addr not in PINEAPPLE_NETWORK:
+            continue
+        octets = ip.split('.')
+        base = f"http://{octets[0]}.{octets[1]}.{octets[2]}.1"
+        for url in (f"{base}:1471", base):
+            if url not in cands:
+                cands.append(url)
+    for url in DEFAULT_CANDIDATES:
+        if url not in cands:
+            cands.append(url)
+    return cands
+
+
+def probe_first(candidates: List[str], probe: Callable[[str], bool], max_workers: int = 8) -> Optional[str]:
+    """Probe all candidates concurrently and return the first one that answers"""
+    if not candidates:
+        return None
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(candidates)), thread_name_prefix='pineapple-probe')
+    try:
+        futures = {pool.submit(probe, url): url for url in candidates}
+        for fut in as_completed(futures):
+            try:
+                if fut.result():
+                    return futures[fut]
+            except Exception:
+                continue
+        return None
+    finally:
+        # Do not wait for slower probes once we have an answer
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class PineappleLocator:
+    """Tracks the Pineapple base URL, rediscovering it in parallel and persisting the winner"""
+
+    def __init__(self, url: str, probe: Callable[[str], bool], key: str = 'default',
+                 recheck_interval: float = 30.0):
+        self.probe = probe
+        self.key = key
+        self.recheck_interval = recheck_interval
+        self.url = self._saved_url(url) or url
+        self._configured = url
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _saved_url(self, configured: str) -> Optional[str]:
+        """The remembered URL, unless the configured URL changed since it was stored.
+        An explicitly configured URL always beats a cache written under a different one."""
+        saved = (local_state.load_json(STATE_FILE, {}) or {}).get(self.key)
+        if isinstance(saved, str):
+            # Older state files only kept the URL: trust it for the default/discovery case only
+            saved = {'url': saved, 'configured': None}
+        if not isinstance(saved, dict) or not saved.get('url'):
+            return None
+        if not configured or configured in DEFAULT_CANDIDATES or configured == saved.get('configured'):
+            return saved['url']
+        return None
+
+    def is_stale(self) -> bool:
+        return (time.monotonic() - self._last_check) >= self.recheck_interval
+
+    def discover(self, force: bool = False) -> str:
+        """Blocking discovery; call only from background threads"""
+        if not force and not self.is_stale():
+            return self.url
+        candidates = [self.url]
+        for url in [self._configured] + candidate_urls():
+            if url not in candidates:
+                candidates.append(url)
+        found = probe_first(candidates, self.probe)
+        with self._lock:
+            self._last_check = time.monotonic()
+            if found and found != self.url:
+                logger.info('Detected Pineapple base URL: %s', found)
+                self.url = found
+        if found:
+            self._remember(found)
+        return self.url
+
+    def _remember(self, url: str):
+        state = local_state.load_json(STATE_FILE, {}) or {}
+        entry = {'url': url, 'configured': self._configured}
+        if state.get(self.key) != entry:
+            state[self.key] = entry
+            local_state.save_json(STATE_FILE, state)
+
+    def refresh_async(self, force: bool = False) -> str:
+        """Return the current URL immediately and rediscover in the background when due"""
+        if force or self.is_stale():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self.discover, kwargs={'force': force},
+                                                    daemon=True, name='pineapple-discovery')
+                    self._thread.start()
+        return self.url
+
+    def set_url(self, url: str):
+        """Pin a user-supplied URL (e.g. typed into the desktop app)"""
+        with self._lock:
+            self.url = url
+            self._configured = url
+            self._last_check = time.monotonic()
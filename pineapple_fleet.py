@@ -0,0 +1,117 @@
+"""
+Fleet of WiFi Pineapples.
+Each unit is a PineappleDevice with its own pooled client and token; fan-out
+calls hit every unit concurrently so a slow or dead unit only costs its own
+timeout.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+from device_manager import PineappleDevice
+from pineapple_client import PineappleClient
+
+logger = logging.getLogger(__name__)
+
+
+class PineappleFleet:
+    """Registry of Pineapples by name with concurrent fan-out"""
+
+    def __init__(self, max_workers: int = 16, timeout: float = 30.0,
+                 client_factory: Callable[[], PineappleClient] = PineappleClient):
+        self.max_workers = max_workers
+        # Upper bound on one fan-out call; units still running are reported as timed out
+        self.timeout = timeout
+        self.client_factory = client_factory
+        self._units = {}
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def add(self, name: str, url: str, username: str = 'root', password: str = '') -> PineappleDevice:
+        """Register (or replace) a unit; it gets its own keep-alive pool and token"""
+        unit = PineappleDevice(url.rstrip('/'), username, password, client=self.client_factory(),
+                               auto_discover=False, key=f'fleet:{name}')
+        with self._lock:
+            old = self._units.get(name)
+            self._units[name] = unit
+        if old is not None:
+            old.http.close()
+        return unit
+
+    def load(self, specs: List[Dict]):
+        """Register units from [{'name', 'url', 'username', 'password'}]"""
+        for spec in specs or []:
+            try:
+                self.add(spec['name'], spec['url'], spec.get('username', 'root'), spec.get('password', ''))
+            except (KeyError, TypeError) as e:
+                logger.error(f"Ignoring invalid Pineapple fleet entry {spec!r}: {e}")
+
+    def remove(self, name: str) -> bool:
+        with self._lock:
+            unit = self._units.pop(name, None)
+        if unit is None:
+            return False
+        unit.http.close()
+        return True
+
+    def get(self, name: str) -> Optional[PineappleDevice]:
+        with self._lock:
+            return self._units.get(name)
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return sorted(self._units)
+
+    def describe(self) -> List[Dict]:
+        with self._lock:
+            units = sorted(self._units.items())
+        return [{'name': name, 'url': unit.base_url, 'username': unit.username,
+                 'authenticated': bool(unit.token)} for name, unit in units]
+
+    def run(self, fn: Callable[[PineappleDevice], Dict], names: List[str] = None) -> Dict[str, Dict]:
+        """Call fn(unit) on every selected unit concurrently.
+
+        Returns {name: {'ok', 'result' | 'error', 'elapsed_ms'}}; a result dict carrying
+        'error' (the api_call convention) counts as a failure.
+        """
+        with self._lock:
+            targets = {n: self._units.get(n) for n in (names if names is not None else self._units)}
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='pineapple-fleet')
+            pool = self._pool
+
+        def call(unit):
+            start = time.monotonic()
+            try:
+                result = fn(unit)
+                outcome = {'ok': not (isinstance(result, dict) and 'error' in result), 'result': result}
+            except Exception as e:
+                outcome = {'ok': False, 'error': str(e)}
+            outcome['elapsed_ms'] = round((time.monotonic() - start) * 1000, 2)
+            return outcome
+
+        futures = {name: pool.submit(call, unit) for name, unit in targets.items() if unit is not None}
+        wait(list(futures.values()), timeout=self.timeout)
+        results = {}
+        for name, unit in targets.items():
+            future = futures.get(name)
+            if future is None:
+                results[name] = {'ok': False, 'error': 'Unknown unit', 'elapsed_ms': 0.0}
+            elif future.done():
+                results[name] = future.result()
+            else:
+                results[name] = {'ok': False, 'error': 'Timed out', 'elapsed_ms': round(self.timeout * 1000, 2)}
+        return results
+
+    def api_call(self, endpoint: str, method: str = 'GET', data: dict = None,
+                 names: List[str] = None) -> Dict[str, Dict]:
+        return self.run(lambda unit: unit.api_call(endpoint, method, data), names)
+
+    def close(self):
+        for name in self.names():
+            self.remove(name)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
@@ -0,0 +1,156 @@
+"""
+Priority scheduler for a shared serial link.
+A single owner thread runs queued jobs in priority order
+(interactive > transmit > file ops > telemetry). Jobs that wait longer than
+their class deadline are dropped, and duplicate pending telemetry requests
+are coalesced so polls never pile up in front of the user.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE, TRANSMIT, FILE_OPS, TELEMETRY = 0, 1, 2, 3
+CLASS_NAMES = {INTERACTIVE: 'interactive', TRANSMIT: 'transmit', FILE_OPS: 'file', TELEMETRY: 'telemetry'}
+# Seconds a job may wait in the queue before it is dropped as stale
+DEFAULT_DEADLINES = {INTERACTIVE: 30.0, TRANSMIT: 15.0, FILE_OPS: 60.0, TELEMETRY: 3.0}
+
+
+class SchedulerTimeout(TimeoutError):
+    """A job expired in the queue before the serial link was free"""
+
+
+class _Job:
+    __slots__ = ('priority', 'fn', 'key', 'future', 'enqueued', 'expires')
+
+    def __init__(self, priority: int, fn: Callable[[], Any], key, deadline: float):
+        self.priority = priority
+        self.fn = fn
+        self.key = key
+        self.future = Future()
+        self.enqueued = time.monotonic()
+        self.expires = self.enqueued + deadline if deadline else None
+
+
+class SerialScheduler:
+    """Run callables on one owner thread, highest priority first"""
+
+    def __init__(self, deadlines: Dict[int, float] = None, name: str = 'serial-owner'):
+        self.deadlines = dict(DEFAULT_DEADLINES)
+        self.deadlines.update(deadlines or {})
+        self.name = name
+        self._cond = threading.Condition()
+        self._heap = []
+        self._seq = itertools.count()
+        self._pending_keys = {}
+        self._thread = None
+        self._owner_ident = None
+        self._running = None
+        self._stats = {cls: {'submitted': 0, 'completed': 0, 'failed': 0, 'expired': 0,
+                             'coalesced': 0, 'max_wait_ms': 0.0, 'total_wait_ms': 0.0}
+                       for cls in CLASS_NAMES.values()}
+
+    def on_owner_thread(self) -> bool:
+        return threading.get_ident() == self._owner_ident
+
+    def submit(self, fn: Callable[[], Any], priority: int = INTERACTIVE, key=None,
+               deadline: float = None) -> Future:
+        """Queue fn; with `key`, an identical pending job of the same class is shared instead"""
+        stats = self._stats[CLASS_NAMES[priority]]
+        with self._cond:
+            if key is not None:
+                pending = self._pending_keys.get((priority, key))
+                if pending is not None and not pending.future.done():
+                    stats['coalesced'] += 1
+                    return pending.future
+            job = _Job(priority, fn, key, self.deadlines.get(priority) if deadline is None else deadline)
+            heapq.heappush(self._heap, (priority, next(self._seq), job))
+            if key is not None:
+                self._pending_keys[(priority, key)] = job
+            stats['submitted'] += 1
+            self._ensure_thread()
+            self._cond.notify()
+        return job.future
+
+    def run(self, fn: Callable[[], Any], priority: int = INTERACTIVE, key=None,
+            deadline: float = None, timeout: float = None) -> Any:
+        """Submit and wait for the result; runs inline when already on the owner thread"""
+        if self.on_owner_thread():
+            return fn()
+        return self.submit(fn, priority, key=key, deadline=deadline).result(timeout)
+
+    def stats(self) -> Dict:
+        """Queue depth per class plus per-class counters"""
+        with self._cond:
+            depth = {cls: 0 for cls in CLASS_NAMES.values()}
+            for priority, _, job in self._heap:
+                depth[CLASS_NAMES[priority]] += 1
+            classes = {}
+            for priority, cls in CLASS_NAMES.items():
+                counters = classes[cls] = dict(self._stats[cls])
+                started = counters['completed'] + counters['failed']
+                counters['avg_wait_ms'] = round(counters['total_wait_ms'] / started, 2) if started else 0.0
+                counters['deadline'] = self.deadlines[priority]
+            return {
+                'running': CLASS_NAMES.get(self._running),
+                'depth': depth,
+                'queued': sum(depth.values()),
+                'classes': classes,
+            }
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, daemon=True, name=self.name)
+            self._thread.start()
+
+    def _next_job(self) -> _Job:
+        with self._cond:
+            while not self._heap:
+                self._cond.wait()
+            _, _, job = heapq.heappop(self._heap)
+            if job.key is not None and self._pending_keys.get((job.priority, job.key)) is job:
+                del self._pending_keys[(job.priority, job.key)]
+            stats = self._stats[CLASS_NAMES[job.priority]]
+            now = time.monotonic()
+            if job.expires is not None and now > job.expires:
+                stats['expired'] += 1
+                if job.future.set_running_or_notify_cancel():
+                    job.future.set_exception(SchedulerTimeout(
+                        f'{CLASS_NAMES[job.priority]} request expired after {now - job.enqueued:.1f}s in queue'))
+                return None
+            waited_ms = (now - job.enqueued) * 1000
+            stats['total_wait_ms'] += waited_ms
+            stats['max_wait_ms'] = max(stats['max_wait_ms'], round(waited_ms, 2))
+            self._running = job.priority
+            return job
+
+    def _loop(self):
+        self._owner_ident = threading.get_ident()
+        while True:
+            job = self._next_job()
+            if job is None:
+                continue
+            if not job.future.set_running_or_notify_cancel():
+                with self._cond:
+                    self._running = None
+                continue
+            stats = self._stats[CLASS_NAMES[job.priority]]
+            try:
+                result = job.fn()
+            except BaseException as e:
+                with self._cond:
+                    stats['failed'] += 1
+                job.future.set_exception(e)
+            else:
+                with self._cond:
+                    stats['completed'] += 1
+                job.future.set_result(result)
+            finally:
+                with self._cond:
+                    self._running = None
@@ -0,0 +1,97 @@
+"""
+Cold-start profiler.
+Imports a module in a fresh interpreter under `-X importtime` and reports the
+slowest imports, plus time to the web app's first response or the desktop
+app's first window.
+
+    python startup_profile.py app --first-request /
+    python startup_profile.py desktop_app --first-window
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+_CHILD = r'''
+import importlib, json, sys, time
+start = time.perf_counter()
+module = importlib.import_module(MODULE)
+result = {'import_ms': (time.perf_counter() - start) * 1000}
+if REQUEST_PATH:
+    t = time.perf_counter()
+    response = module.app.test_client().get(REQUEST_PATH)
+    result['first_response_ms'] = (time.perf_counter() - t) * 1000
+    result['status'] = response.status_code
+if FIRST_WINDOW:
+    from PyQt6.QtWidgets import QApplication
+    t = time.perf_counter()
+    qt_app = QApplication(sys.argv)
+    window = module.MainWindow()
+    window.show()
+    qt_app.processEvents()
+    result['first_window_ms'] = (time.perf_counter() - t) * 1000
+    window.close()
+result['total_ms'] = (time.perf_counter() - start) * 1000
+print('STARTUP_PROFILE ' + json.dumps(result), flush=True)
+'''
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Rows of `-X importtime` output as {'module', 'self_ms', 'cumulative_ms', 'depth'}"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue
+        # One space after the bar, then two per nesting level
+        stripped = name.lstrip(' ')
+        rows.append({'module': stripped.rstrip(), 'self_ms': self_us / 1000, 'cumulative_ms': cumulative_us / 1000,
+                     'depth': (len(name) - len(stripped) - 1) // 2})
+    return rows
+
+
+def profile(module: str = 'app', request_path: str = None, first_window: bool = False, timeout: float = 60) -> Dict:
+    """Cold-start numbers for `module`; devices are never auto-connected while profiling"""
+    script = (f'MODULE = {module!r}\nREQUEST_PATH = {request_path!r}\nFIRST_WINDOW = {first_window!r}\n' + _CHILD)
+    env = dict(os.environ, AUTO_CONNECT_FLIPPER='false', AUTO_CONNECT_PINEAPPLE='false', HOTPLUG_WATCH='false')
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', script], cwd=ROOT, env=env,
+                          capture_output=True, text=True, timeout=timeout)
+    result = {}
+    for line in proc.stdout.splitlines():
+        if line.startswith('STARTUP_PROFILE '):
+            result = json.loads(line[len('STARTUP_PROFILE '):])
+    if not result:
+        raise RuntimeError(f'Profiling {module} failed:\n{proc.stderr[-2000:]}')
+    result['imports'] = parse_importtime(proc.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report where cold-start time goes')
+    parser.add_argument('module', nargs='?', default='app')
+    parser.add_argument('--first-request', metavar='PATH', help='also time the first response to PATH (web app)')
+    parser.add_argument('--first-window', action='store_true', help='also time the first MainWindow (desktop app)')
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    result = profile(args.module, args.first_request, args.first_window)
+    imports = result.pop('imports')
+    print(f"{'self ms':>9} {'cumul ms':>9}  module")
+    for row in sorted(imports, key=lambda r: r['self_ms'], reverse=True)[:args.top]:
+        print(f"{row['self_ms']:9.1f} {row['cumulative_ms']:9.1f}  {'  ' * row['depth']}{row['module']}")
+    print()
+    for key, value in result.items():
+        print(f"{key}: {round(value, 1) if isinstance(value, float) else value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+Background device supervisor.
+Every device gets its own asyncio task on a dedicated event-loop thread, with
+its own cadence, exponential backoff with jitter and health state. Checks are
+ordinary blocking callables run on a per-device executor, so a Pineapple that
+takes seconds to time out never delays a Flipper reconnect.
+"""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+STARTING, HEALTHY, DEGRADED, DOWN, DISABLED = 'starting', 'healthy', 'degraded', 'down', 'disabled'
+
+
+class DeviceTask:
+    """Health state machine for one device: starting -> healthy <-> degraded -> down"""
+
+    def __init__(self, name: str, check: Callable[[], bool], interval: float, retry_base: float = 2.0,
+                 max_backoff: float = 300.0, jitter: float = 0.2, timeout: float = 30.0,
+                 down_after: int = 3, enabled: bool = True):
+        self.name = name
+        self.check = check
+        self.interval = interval
+        self.retry_base = retry_base
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.timeout = timeout
+        # Consecutive failures before a degraded device is reported down
+        self.down_after = down_after
+        self.state = STARTING if enabled else DISABLED
+        self.checks = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_ok = None
+        self.last_error = None
+        self.last_duration_ms = None
+        self.next_check = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'supervise-{name}')
+        self.wake = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.state != DISABLED
+
+    def record(self, ok: bool, error: str = None, duration: float = 0.0):
+        self.checks += 1
+        self.last_duration_ms = round(duration * 1000, 2)
+        if ok:
+            if self.state != HEALTHY:
+                logger.info(f"{self.name}: {self.state} -> {HEALTHY}")
+            self.state = HEALTHY
+            self.consecutive_failures = 0
+            self.last_ok = datetime.utcnow().isoformat() + 'Z'
+            return
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+        state = DOWN if self.state in (STARTING, DOWN) or self.consecutive_failures >= self.down_after else DEGRADED
+        if state != self.state:
+            logger.info(f"{self.name}: {self.state} -> {state} ({error})")
+        self.state = state
+
+    def delay(self) -> float:
+        """Seconds until the next check: the cadence while healthy, backoff with jitter while failing"""
+        if not self.consecutive_failures:
+            return self.interval
+        backoff = min(self.max_backoff, self.retry_base * 2 ** (self.consecutive_failures - 1))
+        return backoff * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def status(self) -> Dict:
+        return {
+            'state': self.state,
+            'interval': self.interval,
+            'checks': self.checks,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'last_ok': self.last_ok,
+            'last_error': self.last_error,
+            'last_duration_ms': self.last_duration_ms,
+            'next_check_in': round(max(0.0, self.next_check - time.monotonic()), 2) if self.next_check else None,
+        }
+
+
+class Supervisor:
+    """Runs one DeviceTask per device on a private asyncio loop"""
+
+    def __init__(self, name: str = 'supervisor'):
+        self.name = name
+        self._tasks = {}
+        self._loop = None
+        self._thread = None
+        self._started = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def add(self, name: str, check: Callable[[], bool], interval: float, **options) -> DeviceTask:
+        """Register a device check; check() returns truthy when healthy and may raise"""
+        if self.running:
+            raise RuntimeError('Supervisor already started')
+        task = self._tasks[name] = DeviceTask(name, check, interval, **options)
+        return task
+
+    def start(self) -> 'Supervisor':
+        if self.running:
+            return self
+        self._started.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name=self.name)
+        self._thread.start()
+        self._started.wait(5)
+        return self
+
+    def stop(self):
+        if self._loop is not None and self.running:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+        for task in self._tasks.values():
+            task.executor.shutdown(wait=False)
+
+    def wake(self, name: str):
+        """Run a device's check now instead of waiting out its cadence or backoff"""
+        task = self._tasks.get(name)
+        if task is not None and task.wake is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(task.wake.set)
+
+    def get(self, name: str) -> Optional[DeviceTask]:
+        return self._tasks.get(name)
+
+    def status(self) -> Dict:
+        return {'running': self.running, 'devices': {name: task.status() for name, task in self._tasks.items()}}
+
+    def _run(self):
+        # Imported here: asyncio is a noticeable share of the web app's cold start
+        import asyncio
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        for task in self._tasks.values():
+            if task.enabled:
+                task.wake = asyncio.Event()
+                self._loop.create_task(self._supervise(task))
+        self._loop.call_soon(self._started.set)
+        try:
+            self._loop.run_forever()
+        finally:
+            pending = asyncio.all_tasks(self._loop)
+            for task in pending:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self._loop.close()
+
+    async def _supervise(self, task: DeviceTask):
+        import asyncio
+        # asyncio.wait rather than wait_for: the latter can swallow a cancel that races a
+        # finishing check, which would keep the task alive through stop()
+        loop = asyncio.get_running_loop()
+        while True:
+            task.wake.clear()
+            start = time.monotonic()
+            check = loop.run_in_executor(task.executor, task.check)
+            done, _ = await asyncio.wait({check}, timeout=task.timeout)
+            if not done:
+                task.record(False, f'check timed out after {task.timeout}s', time.monotonic() - start)
+            elif check.exception() is not None:
+                task.record(False, str(check.exception()), time.monotonic() - start)
+            else:
+                ok = check.result()
+                task.record(bool(ok), None if ok else 'check failed', time.monotonic() - start)
+            delay = task.delay()
+            task.next_check = time.monotonic() + delay
+            waiter = loop.create_task(task.wake.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=delay)
+            finally:
+                waiter.cancel()
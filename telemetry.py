@@ -0,0 +1,160 @@
+"""
+Shared telemetry sampler with fan-out to many subscribers.
+One background thread samples each registered source once per interval and
+publishes only what changed, so device load does not grow with the number of
+connected clients.
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def compute_delta(old, new) -> Optional[Dict]:
+    """Return the top-level changes between two samples, or None when nothing changed.
+
+    Dict samples yield {'set': {...changed keys...}, 'removed': [...]}; any other value
+    is replaced wholesale with {'value': new}.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        changed = {k: v for k, v in new.items() if k not in old or old[k] != v}
+        removed = [k for k in old if k not in new]
+        if not changed and not removed:
+            return None
+        return {'set': changed, 'removed': removed}
+    if old == new:
+        return None
+    return {'value': new}
+
+
+class Subscription:
+    """A single client's view of the hub: a bounded event queue and its channel filter"""
+
+    def __init__(self, channels: Iterable[str], max_queue: int = 32):
+        self.channels = set(channels)
+        self.events = queue.Queue(maxsize=max_queue)
+
+    def put(self, event: Dict):
+        """Queue an event, dropping the oldest one when a slow client falls behind"""
+        while True:
+            try:
+                self.events.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.events.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+class TelemetryHub:
+    """Samples registered sources on one thread and fans the results out to subscribers"""
+
+    def __init__(self, interval: float = 5.0, max_queue: int = 32, autostart: bool = True):
+        self.interval = interval
+        self.max_queue = max_queue
+        self.autostart = autostart
+        self._sources: Dict[str, Callable[[], Dict]] = {}
+        self._latest: Dict[str, Dict] = {}
+        self._subscribers: List[Subscription] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add_source(self, name: str, sampler: Callable[[], Dict]):
+        """Register a channel sampled by `sampler` each interval"""
+        self._sources[name] = sampler
+
+    @property
+    def channels(self) -> List[str]:
+        return list(self._sources)
+
+    def subscribe(self, channels: Iterable[str] = None) -> Subscription:
+        """Create a subscription; it immediately receives the latest snapshot of its channels"""
+        wanted = [c for c in (channels or self._sources) if c in self._sources]
+        sub = Subscription(wanted, self.max_queue)
+        with self._lock:
+            self._subscribers.append(sub)
+            snapshot = {c: self._latest[c] for c in wanted if c in self._latest}
+            if self.autostart and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, daemon=True, name='telemetry')
+                self._thread.start()
+        if snapshot:
+            sub.put({'event': 'snapshot', 'data': snapshot})
+        # Sample promptly for a channel nobody has seen yet
+        if len(snapshot) < len(wanted):
+            self._wake.set()
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def _active_channels(self) -> set:
+        with self._lock:
+            active = set()
+            for sub in self._subscribers:
+                active |= sub.channels
+            return active
+
+    def sample_once(self):
+        """Sample every channel that has at least one subscriber and publish the changes"""
+        for name in self._active_channels():
+            sampler = self._sources.get(name)
+            if sampler is None:
+                continue
+            try:
+                value = sampler()
+            except Exception as e:
+                logger.error('Telemetry source %s failed: %s', name, e)
+                value = {'error': str(e)}
+            with self._lock:
+                previous = self._latest.get(name)
+                self._latest[name] = value
+                subscribers = [s for s in self._subscribers if name in s.channels]
+            if previous is None:
+                event = {'event': 'snapshot', 'data': {name: value}}
+            else:
+                delta = compute_delta(previous, value)
+                if delta is None:
+                    continue
+                event = {'event': 'delta', 'data': {name: delta}}
+            for sub in subscribers:
+                sub.put(event)
+
+    def _run(self):
+        logger.info('Telemetry sampler started (interval=%s)', self.interval)
+        while True:
+            if self.subscriber_count():
+                started = time.monotonic()
+                self.sample_once()
+                remaining = max(0.0, self.interval - (time.monotonic() - started))
+            else:
+                # Idle until someone subscribes
+                remaining = None
+            self._wake.wait(remaining)
+            self._wake.clear()
+
+    def stream(self, sub: Subscription, heartbeat: float = 15.0) -> Iterator[str]:
+        """Yield Server-Sent Events for a subscription until the client disconnects"""
+        try:
+            yield f'retry: {int(self.interval * 1000)}\n\n'
+            while True:
+                try:
+                    event = sub.events.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+        finally:
+            self.unsubscribe(sub)
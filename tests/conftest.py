@@ -0,0 +1,25 @@
+import os
+import tempfile
+
+# Keep the background auto-connect worker from touching real ports/network during tests
+os.environ.setdefault('AUTO_CONNECT_FLIPPER', 'false')
+os.environ.setdefault('AUTO_CONNECT_PINEAPPLE', 'false')
+os.environ.setdefault('HOTPLUG_WATCH', 'false')
+# Persistent caches (last-known-good URLs, ...) go to a throwaway directory
+os.environ['BADANTICS_STATE_DIR'] = tempfile.mkdtemp(prefix='badantics-test-')
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _reset_app_state():
+    import app
+    app.flipper_connected = False
+    app.flipper_ser = None
+    app._flipper_monitor_cache.invalidate()
+    app._flipper_listings.invalidate()
+    app._flipper_capabilities.invalidate()
+    app._flipper_static_info = {}
+    yield
+    app.flipper_connected = False
+    app.flipper_ser = None
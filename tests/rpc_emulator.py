@@ -0,0 +1,168 @@
+"""Local emulator of the Flipper CLI + protobuf RPC protocol, exposed as a fake serial port."""
+import hashlib
+
+import flipper_rpc as pb
+
+
+class RPCEmulatorSerial:
+    """Fake serial port backed by an in-memory filesystem {path: bytes}; directories are implied"""
+
+    def __init__(self, files=None, port='COM9'):
+        self.files = dict(files or {})
+        self.port = port
+        self.is_open = True
+        self.timeout = 0.2
+        self.rpc_mode = False
+        self.cli_commands = []
+        self.frames_seen = 0
+        self.md5_requests = 0
+        self.read_requests = 0
+        # Newer firmware can return md5 sums inline in directory listings
+        self.supports_list_md5 = True
+        # Simulate an unplug after this many frames (None = never)
+        self.fail_after_frames = None
+        self._out = bytearray()
+        self._in = bytearray()
+        self._writes = {}
+
+    # serial.Serial surface
+
+    @property
+    def in_waiting(self):
+        return len(self._out)
+
+    def read(self, n=1):
+        data = bytes(self._out[:n])
+        del self._out[:n]
+        return data
+
+    def reset_input_buffer(self):
+        self._out.clear()
+
+    def close(self):
+        self.is_open = False
+
+    def write(self, data):
+        if not self.is_open:
+            raise OSError('port not open')
+        self._in.extend(data)
+        if self.rpc_mode:
+            self._process_frames()
+        else:
+            self._process_cli()
+        return len(data)
+
+    # CLI side
+
+    def _process_cli(self):
+        while b'\r' in self._in:
+            line, _, rest = bytes(self._in).partition(b'\r')
+            self._in = bytearray(rest.lstrip(b'\n'))
+            command = line.decode().strip()
+            if not command:
+                # Bare newline: the CLI just prints a fresh prompt
+                self._out += b'\r\n>: '
+                continue
+            self.cli_commands.append(command)
+            if command == 'start_rpc_session':
+                self._out += b'start_rpc_session\r\n'
+                self.rpc_mode = True
+                self._process_frames()
+                return
+            self._out += (command + '\r\n').encode() + self.cli_response(command) + b'\r\n>: '
+
+    def cli_response(self, command):
+        """Text CLI output for a command; override in tests as needed"""
+        return b''
+
+    # RPC side
+
+    def _process_frames(self):
+        while self.rpc_mode:
+            try:
+                length, pos = pb.decode_varint(self._in)
+            except pb.RPCError:
+                return
+            if len(self._in) < pos + length:
+                return
+            raw = bytes(self._in[pos:pos + length])
+            del self._in[:pos + length]
+            self.frames_seen += 1
+            if self.fail_after_frames is not None and self.frames_seen > self.fail_after_frames:
+                self.fail_after_frames = None
+                self.rpc_mode = False
+                self.is_open = False
+                self._in.clear()
+                raise OSError('device disconnected')
+            self._handle(pb.RPCMessage(raw))
+
+    def _reply(self, command_id, field=pb.MAIN_EMPTY, content=b'', has_next=False, status=0):
+        self._out += pb.frame(pb.encode_main(command_id, field, content, has_next=has_next, status=status))
+
+    def _entries(self, path):
+        prefix = path.rstrip('/') + '/'
+        children = {}
+        for name, data in self.files.items():
+            if name.startswith(prefix):
+                head, sep, _ = name[len(prefix):].partition('/')
+                children[head] = (pb.FILE_TYPE_DIR, 0) if sep else (pb.FILE_TYPE_FILE, len(data))
+        return children
+
+    def _handle(self, msg):
+        fields = pb.decode_fields(msg.content)
+        path = pb._first(fields, 1, b'').decode()
+        cid = msg.command_id
+        if msg.content_field == pb.MAIN_STOP_SESSION:
+            self._reply(cid)
+            self.rpc_mode = False
+            self._out += b'\r\n>: '
+        elif msg.content_field == pb.MAIN_PING_REQUEST:
+            self._reply(cid, pb.MAIN_PING_RESPONSE, msg.content)
+        elif msg.content_field == pb.MAIN_STORAGE_READ_REQUEST:
+            self.read_requests += 1
+            if path not in self.files:
+                self._reply(cid, status=7)
+                return
+            data = self.files[path]
+            chunks = [data[i:i + pb.CHUNK_SIZE] for i in range(0, len(data), pb.CHUNK_SIZE)] or [b'']
+            for i, chunk in enumerate(chunks):
+                self._reply(cid, pb.MAIN_STORAGE_READ_RESPONSE,
+                            pb.field_bytes(1, pb.encode_file(data=chunk)), has_next=i < len(chunks) - 1)
+        elif msg.content_field == pb.MAIN_STORAGE_WRITE_REQUEST:
+            file_buf = pb._first(fields, 2, b'')
+            self._writes.setdefault(cid, bytearray()).extend(pb.decode_file(file_buf)['data'])
+            if not msg.has_next:
+                self.files[path] = bytes(self._writes.pop(cid))
+                self._reply(cid)
+        elif msg.content_field == pb.MAIN_STORAGE_LIST_REQUEST:
+            include_md5 = self.supports_list_md5 and pb._first(fields, 2, 0)
+            content = b''
+            for name, (ftype, size) in sorted(self._entries(path).items()):
+                md5 = None
+                if include_md5 and ftype == pb.FILE_TYPE_FILE:
+                    md5 = hashlib.md5(self.files[path.rstrip('/') + '/' + name]).hexdigest()
+                content += pb.field_bytes(1, pb.encode_file(name=name, ftype=ftype, size=size, md5=md5))
+            self._reply(cid, pb.MAIN_STORAGE_LIST_RESPONSE, content)
+        elif msg.content_field == pb.MAIN_STORAGE_STAT_REQUEST:
+            if path in self.files:
+                info = pb.encode_file(name=path.rsplit('/', 1)[-1], size=len(self.files[path]))
+            elif self._entries(path):
+                info = pb.encode_file(name=path.rsplit('/', 1)[-1], ftype=pb.FILE_TYPE_DIR)
+            else:
+                self._reply(cid, status=7)
+                return
+            self._reply(cid, pb.MAIN_STORAGE_STAT_RESPONSE, pb.field_bytes(1, info))
+        elif msg.content_field == pb.MAIN_STORAGE_MD5SUM_REQUEST:
+            self.md5_requests += 1
+            if path not in self.files:
+                self._reply(cid, status=7)
+                return
+            digest = hashlib.md5(self.files[path]).hexdigest()
+            self._reply(cid, pb.MAIN_STORAGE_MD5SUM_RESPONSE, pb.field_bytes(1, digest))
+        elif msg.content_field == pb.MAIN_STORAGE_DELETE_REQUEST:
+            if self.files.pop(path, None) is None:
+                self._reply(cid, status=7)
+                return
+            self._reply(cid)
+        else:
+            self._reply(cid, status=3)
@@ -0,0 +1,87 @@
+import multiprocessing
+
+import pytest
+
+import app as app_module
+from device_broker import BrokerClient, BrokerError, DeviceBroker, parse_address
+from device_manager import FlipperDevice
+from flipper_rpc import RPCError
+from rpc_emulator import RPCEmulatorSerial
+
+KEY = b'test-broker-key'
+
+
+class StubPineapple:
+    token = 'tok'
+    base_url = 'http://pineapple'
+
+    def __init__(self):
+        self.calls = []
+
+    def api_call(self, endpoint, method='GET', data=None):
+        self.calls.append((endpoint, method, data))
+        return {'endpoint': endpoint}
+
+
+@pytest.fixture
+def broker(monkeypatch, tmp_path):
+    ser = RPCEmulatorSerial({'/ext/notes.txt': b'hello', '/ext/subghz/door.sub': b'\x00\x01'})
+    monkeypatch.setattr('serial.Serial', lambda *a, **k: ser)
+    monkeypatch.setattr('serial.tools.list_ports.comports', lambda: [])
+    flipper = FlipperDevice(port=ser.port, idle_timeout=0.01)
+    pineapple = StubPineapple()
+    server = DeviceBroker(flipper, pineapple, address=f'unix:{tmp_path}/broker.sock', authkey=KEY).start()
+    yield server
+    server.close()
+    flipper.disconnect()
+
+
+def test_parse_address():
+    assert parse_address('unix:/run/x.sock') == '/run/x.sock'
+    assert parse_address('tcp:0.0.0.0:7811') == ('0.0.0.0', 7811)
+    assert parse_address(':7811') == ('127.0.0.1', 7811)
+
+
+def test_client_round_trips(broker):
+    client = BrokerClient(broker.address, authkey=KEY)
+    assert client.call('ping') == 'pong'
+    status = client.call('flipper.connect')
+    assert status['connected'] and status['port'] == 'COM9'
+    rpc = client.rpc()
+    assert {e['name'] for e in rpc.list('/ext')} == {'notes.txt', 'subghz'}
+    assert rpc.read_file('/ext/subghz/door.sub') == b'\x00\x01'
+    assert b''.join(rpc.iter_read('/ext/notes.txt')) == b'hello'
+    # Device errors keep their type and status across the socket
+    with pytest.raises(RPCError) as err:
+        rpc.read_file('/ext/missing')
+    assert err.value.status is not None
+    with pytest.raises(AttributeError):
+        rpc.iter_dir
+    with pytest.raises(BrokerError):
+        client.call('flipper.rpc', 'ping_all')
+    with pytest.raises(BrokerError):
+        client.call('no.such.method')
+    assert client.call('pineapple.api_call', '/api/status') == {'endpoint': '/api/status'}
+
+
+def test_wrong_key_is_rejected(broker):
+    client = BrokerClient(broker.address, authkey=b'wrong')
+    with pytest.raises(multiprocessing.AuthenticationError):
+        client.call('ping')
+    # The broker keeps serving other clients
+    assert BrokerClient(broker.address, authkey=KEY).call('ping') == 'pong'
+
+
+def test_app_as_thin_client(broker, monkeypatch):
+    monkeypatch.setattr(app_module, 'device_broker', BrokerClient(broker.address, authkey=KEY))
+    monkeypatch.setattr(app_module, '_broker_flipper', {})
+    with app_module.app.test_client() as c:
+        data = c.get('/flipper_fs/list?path=/ext').get_json()
+        assert {e['name'] for e in data['entries']} == {'notes.txt', 'subghz'}
+        assert c.get('/flipper_fs/read?path=/ext/notes.txt').get_json()['content'] == 'hello'
+        assert c.get('/flipper_fs/download?path=/ext/notes.txt').data == b'hello'
+        assert c.get('/status/devices').get_json()['flipper_connected_port'] == 'COM9'
+        assert c.get('/pineapple_status').get_json() == {'endpoint': '/api/status'}
+        assert 'depth' in c.get('/flipper_scheduler').get_json()
+    # Nothing was opened in this process
+    assert app_module.flipper_ser is None
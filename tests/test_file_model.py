@@ -0,0 +1,126 @@
+import pytest
+
+pytest.importorskip('PyQt6')
+from PyQt6.QtCore import QCoreApplication, QModelIndex
+
+from device_manager import FlipperDevice
+from rpc_emulator import RPCEmulatorSerial
+
+desktop_app = pytest.importorskip('desktop_app')
+FlipperFileModel = desktop_app.FlipperFileModel
+
+FILES = {f'/ext/big/file{i}.txt': b'x' * i for i in range(5)}
+FILES.update({'/ext/nfc/card.nfc': b'card', '/ext/subghz/gate.sub': b'gate', '/ext/readme.txt': b'hi'})
+
+
+@pytest.fixture(scope='module')
+def qapp():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+class SyncJobs:
+    """DeviceJobs stand-in: jobs run inline, or queue until flush() when deferred"""
+
+    def __init__(self, deferred=False):
+        self.deferred = deferred
+        self.queue = []
+        self.paths = []
+
+    def run(self, fn, *args, on_done=None, on_error=None, **kwargs):
+        self.paths.append(args[0])
+        self.queue.append((fn, args, kwargs, on_done, on_error))
+        if not self.deferred:
+            self.flush()
+
+    def flush(self):
+        while self.queue:
+            fn, args, kwargs, on_done, on_error = self.queue.pop(0)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if on_error:
+                    on_error(str(e))
+                continue
+            if on_done:
+                on_done(result)
+
+
+@pytest.fixture
+def flipper():
+    dev = FlipperDevice(idle_timeout=0.01)
+    dev.ser = RPCEmulatorSerial(dict(FILES))
+    dev.connected = True
+    return dev
+
+
+def names(model, parent=QModelIndex()):
+    return [model.index(row, 0, parent).data() for row in range(model.rowCount(parent))]
+
+
+def test_listing_is_inserted_a_page_at_a_time(qapp, flipper, monkeypatch):
+    monkeypatch.setattr(FlipperFileModel, 'PAGE_SIZE', 2)
+    model = FlipperFileModel(flipper, SyncJobs(), '/ext/big')
+    assert model.canFetchMore()
+    model.fetchMore()
+    assert model.rowCount() == 2
+    model.fetchMore()
+    model.fetchMore()
+    assert model.rowCount() == 5 and not model.canFetchMore()
+    assert names(model) == [f'file{i}.txt' for i in range(5)]
+
+
+def test_listing_for_a_discarded_root_is_dropped(qapp, flipper):
+    jobs = SyncJobs(deferred=True)
+    model = FlipperFileModel(flipper, jobs, '/ext')
+    loaded = []
+    model.loaded.connect(lambda path, count: loaded.append((path, count)))
+    model.fetchMore()
+    model.set_root('/ext/big')
+    jobs.flush()
+    # Neither rows nor prefetches for the old tree
+    assert loaded == [] and jobs.paths == ['/ext']
+    assert model.rowCount() == 0 and model.canFetchMore()
+    model.fetchMore()
+    jobs.flush()
+    assert model.rowCount() == 5 and loaded == [('/ext/big', 5)]
+
+
+def test_failed_listing_can_be_retried(qapp, flipper):
+    failures = []
+    model = FlipperFileModel(flipper, SyncJobs(), '/ext/big')
+    model.load_failed.connect(lambda path, message: failures.append(path))
+    flipper.connected = False
+    model.fetchMore()
+    assert failures == ['/ext/big']
+    assert model.rowCount() == 0 and not model.canFetchMore()
+    flipper.connected = True
+    model.retry(QModelIndex())
+    assert model.rowCount() == 5
+
+
+def test_refresh_is_ignored_while_loading(qapp, flipper):
+    jobs = SyncJobs(deferred=True)
+    model = FlipperFileModel(flipper, jobs, '/ext/big')
+    model.fetchMore()
+    model.refresh()
+    assert len(jobs.queue) == 1
+    jobs.flush()
+    assert model.rowCount() == 5
+    model.refresh()
+    jobs.flush()
+    assert model.rowCount() == 5 and jobs.paths == ['/ext/big', '/ext/big']
+
+
+def test_prefetched_listing_is_used_on_expand(qapp, flipper):
+    jobs = SyncJobs()
+    model = FlipperFileModel(flipper, jobs, '/ext')
+    model.fetchMore()
+    assert sorted(names(model)) == ['big', 'nfc', 'readme.txt', 'subghz']
+    # Listing the root prefetched every subdirectory
+    assert sorted(jobs.paths) == ['/ext', '/ext/big', '/ext/nfc', '/ext/subghz']
+    nfc = model.index(names(model).index('nfc'), 0)
+    jobs.paths.clear()
+    assert model.canFetchMore(nfc)
+    model.fetchMore(nfc)
+    assert names(model, nfc) == ['card.nfc']
+    assert jobs.paths == []
@@ -0,0 +1,105 @@
+import json
+import os
+
+from device_manager import FlipperDevice
+import flipper_backup
+from flipper_backup import BackupJob, MANIFEST_NAME
+from rpc_emulator import RPCEmulatorSerial
+
+
+class DummyPort:
+    def __init__(self, device):
+        self.device = device
+
+
+def make_device(monkeypatch, ser):
+    def open_port(port, baud, timeout=None):
+        ser.is_open = True
+        return ser
+    monkeypatch.setattr('serial.Serial', open_port)
+    monkeypatch.setattr('serial.tools.list_ports.comports', lambda: [DummyPort(ser.port)])
+    dev = FlipperDevice(port=ser.port, idle_timeout=0.01)
+    assert dev.connect()
+    return dev
+
+
+FILES = {
+    '/ext/subghz/gate.sub': b'Filetype: Flipper SubGhz\n' * 40,
+    '/ext/nfc/card.nfc': bytes(range(256)) * 3,
+    '/ext/readme.txt': b'hello',
+}
+
+
+def test_backup_transfers_only_changed_files(monkeypatch, tmp_path):
+    ser = RPCEmulatorSerial(FILES)
+    dev = make_device(monkeypatch, ser)
+
+    saves = []
+    real_save = BackupJob._save_manifest
+    monkeypatch.setattr(flipper_backup, 'MANIFEST_SAVE_FILES', 2)
+    monkeypatch.setattr(BackupJob, '_save_manifest', lambda self, m: saves.append(1) or real_save(self, m))
+
+    first = BackupJob(dev, tmp_path).run()
+    assert first['state'] == 'done' and first['files_done'] == 3
+    # One RPC session for scan and transfer; the manifest is checkpointed, not rewritten per file
+    assert ser.cli_commands.count('start_rpc_session') == 1
+    assert len(saves) == 2
+    assert (tmp_path / 'ext/nfc/card.nfc').read_bytes() == FILES['/ext/nfc/card.nfc']
+    manifest = json.loads((tmp_path / MANIFEST_NAME).read_text())
+    assert set(manifest['files']) == set(FILES)
+
+    ser.files['/ext/readme.txt'] = b'world'
+    ser.read_requests = 0
+    second = BackupJob(dev, tmp_path).run()
+    assert second['files_changed'] == 1 and ser.read_requests == 1
+    assert (tmp_path / 'ext/readme.txt').read_bytes() == b'world'
+
+
+def test_backup_uses_md5_when_listing_lacks_it(monkeypatch, tmp_path):
+    ser = RPCEmulatorSerial(FILES)
+    ser.supports_list_md5 = False
+    dev = make_device(monkeypatch, ser)
+    BackupJob(dev, tmp_path).run()
+    ser.files['/ext/readme.txt'] = b'HELLO'  # same size, different content
+    ser.read_requests = 0
+    status = BackupJob(dev, tmp_path).run()
+    assert ser.md5_requests == 3
+    assert status['files_changed'] == 1 and ser.read_requests == 1
+
+
+def test_backup_resumes_after_disconnect(monkeypatch, tmp_path):
+    ser = RPCEmulatorSerial(FILES)
+    dev = make_device(monkeypatch, ser)
+    ser.fail_after_frames = 4
+    status = BackupJob(dev, tmp_path, reconnect_delay=0).run()
+    assert status['state'] == 'done'
+    assert status['reconnects'] == 1
+    assert ser.cli_commands.count('start_rpc_session') == 2
+    assert status['files_done'] == 3
+    assert status['bytes_done'] == sum(len(v) for v in FILES.values())
+    assert not [p for p in tmp_path.rglob('.part-*')]
+
+
+def test_backup_endpoints(monkeypatch, tmp_path):
+    import app as app_module
+    ser = RPCEmulatorSerial(FILES)
+    monkeypatch.setattr(app_module, 'flipper_ser', ser)
+    monkeypatch.setattr(app_module, 'flipper_connected', True)
+    monkeypatch.setattr(app_module, 'FLIPPER_BACKUP_DIR', str(tmp_path))
+    with app_module.app.test_client() as c:
+        r = c.post('/flipper_backup', json={'root': '/ext'})
+        assert r.status_code == 202
+        app_module._backup_job._thread.join(5)
+        status = c.get('/flipper_backup/status').get_json()
+        assert status['state'] == 'done' and status['files_done'] == 3
+
+
+def test_app_link_disconnect_closes_port_and_caches(monkeypatch):
+    import app as app_module
+    ser = RPCEmulatorSerial({})
+    monkeypatch.setattr(app_module, 'flipper_ser', ser)
+    monkeypatch.setattr(app_module, 'flipper_connected', True)
+    app_module._flipper_capabilities._value, app_module._flipper_capabilities._valid = {'dialect': 'x'}, True
+    app_module._AppFlipperLink().disconnect()
+    assert not app_module.flipper_connected and not ser.is_open
+    assert app_module._flipper_capabilities.peek() is None
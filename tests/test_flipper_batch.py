@@ -0,0 +1,43 @@
+from device_manager import FlipperDevice
+from rpc_emulator import RPCEmulatorSerial
+
+
+class CLISerial(RPCEmulatorSerial):
+    def cli_response(self, command):
+        if command == 'bogus':
+            return b'`bogus` command not found'
+        return f'ran {command}'.encode()
+
+
+def test_batch_endpoint_runs_in_order_and_stops_on_error(monkeypatch):
+    import app as app_module
+    ser = CLISerial()
+    monkeypatch.setattr(app_module, 'flipper_ser', ser)
+    monkeypatch.setattr(app_module, 'flipper_connected', True)
+    with app_module.app.test_client() as c:
+        r = c.post('/flipper_batch', json={'commands': ['led r 255', 'bogus', 'led r 0']})
+        data = r.get_json()
+        assert r.status_code == 200 and data['completed'] == 3 and not data['ok']
+        assert [x['ok'] for x in data['results']] == [True, False, True]
+        assert 'ran led r 255' in data['results'][0]['output']
+        assert all('elapsed_ms' in x for x in data['results'])
+
+        ser.cli_commands.clear()
+        data = c.post('/flipper_batch', json={'commands': ['a', 'bogus', 'b'], 'stop_on_error': True}).get_json()
+        assert data['completed'] == 2 and data['stopped']
+        assert ser.cli_commands == ['a', 'bogus']
+
+        assert c.post('/flipper_batch', json={'commands': []}).status_code == 400
+        assert c.post('/flipper_batch', json={'commands': ['ok', 3]}).status_code == 400
+
+
+def test_device_send_batch(monkeypatch):
+    ser = CLISerial()
+    monkeypatch.setattr('serial.Serial', lambda *a, **k: ser)
+    monkeypatch.setattr('serial.tools.list_ports.comports', lambda: [])
+    dev = FlipperDevice(port=ser.port, idle_timeout=0.01)
+    assert dev.connect()
+    ser.cli_commands.clear()
+    res = dev.send_batch(['one', 'two'])
+    assert res['ok'] and res['completed'] == 2
+    assert ser.cli_commands == ['one', 'two']
@@ -0,0 +1,87 @@
+import pytest
+
+from device_manager import FlipperDevice, detect_dialect, parse_device_info
+from rpc_emulator import RPCEmulatorSerial
+
+INFO = (b'hardware_name          : Pwn3d\r\nfirmware_version       : 0.86.1\r\n'
+        b'firmware_api_major     : 12\r\nfirmware_api_minor     : 3\r\n')
+
+
+class LegacySerial(RPCEmulatorSerial):
+    """Firmware that only knows ls/cat/rm"""
+
+    def cli_response(self, command):
+        if command == 'info device':
+            return INFO
+        if command == 'help':
+            return b'Commands we have:\r\nhelp  info  ls  cat  rm  uptime  free\r\n'
+        if command == 'ls /ext':
+            return b'\t[D] subghz\r\n\t[F] a.sub 10b\r\n'
+        return b'unknown command'
+
+
+def test_parse_device_info_and_dialect():
+    info = parse_device_info(INFO.decode())
+    assert info['firmware_version'] == '0.86.1' and info['firmware_api_major'] == '12'
+    assert parse_device_info('firmware.api.major : 50')['firmware_api_major'] == '50'
+    assert detect_dialect('Commands we have:\nstorage  info  help') == 'storage'
+    assert detect_dialect('help ls cat rm') == 'posix'
+    assert detect_dialect('') == 'storage'
+
+
+def test_device_probes_once_and_issues_one_command(monkeypatch):
+    ser = LegacySerial()
+    monkeypatch.setattr('serial.Serial', lambda *a, **k: ser)
+    monkeypatch.setattr('serial.tools.list_ports.comports', lambda: [])
+    dev = FlipperDevice(port=ser.port, idle_timeout=0.01, use_rpc=False)
+    assert dev.connect()
+    caps = dev.capabilities()
+    assert caps['dialect'] == 'posix'
+    assert caps['firmware_version'] == '0.86.1' and caps['api_level'] == '12.3'
+    assert ser.cli_commands == ['info device', 'help']
+
+    assert dev.list_files('/ext') == ['[D] subghz', '[F] a.sub 10b']
+    assert ser.cli_commands[2:] == ['ls /ext']
+    # `info device` from the probe is reused by the monitor
+    dev.get_monitor_info()
+    assert 'info device' not in ser.cli_commands[3:]
+
+
+def test_app_uses_probed_dialect(monkeypatch):
+    import app as app_module
+    ser = LegacySerial()
+    monkeypatch.setattr(app_module, 'flipper_ser', ser)
+    monkeypatch.setattr(app_module, 'flipper_connected', True)
+    monkeypatch.setattr(app_module, 'FLIPPER_USE_RPC', False)
+    with app_module.app.test_client() as c:
+        assert c.get('/flipper_capabilities').get_json()['dialect'] == 'posix'
+        entries = c.get('/flipper_fs/list?path=/ext').get_json()['entries']
+    assert [e['name'] for e in entries] == ['subghz', 'a.sub']
+    assert ser.cli_commands == ['info device', 'help', 'ls /ext']
+
+
+@pytest.mark.parametrize('method,url,kwargs', [
+    ('get', '/flipper_fs/read?path=/ext/a.sub', {}),
+    ('post', '/flipper_fs/delete', {'json': {'path': '/ext/a.sub'}}),
+])
+def test_fs_request_while_disconnected_connects_and_returns(monkeypatch, method, url, kwargs):
+    import threading
+    import app as app_module
+    ser = LegacySerial()
+    monkeypatch.setattr('serial.Serial', lambda *a, **k: ser)
+    monkeypatch.setattr('serial.tools.list_ports.comports', lambda: [])
+    monkeypatch.setattr(app_module, 'FLIPPER_PORT', ser.port)
+    monkeypatch.setattr(app_module, 'FLIPPER_USE_RPC', False)
+    monkeypatch.setattr(app_module, 'FLIPPER_IDLE_TIMEOUT', 0.01)
+    responses = []
+    def call():
+        with app_module.app.test_client() as c:
+            responses.append(getattr(c, method)(url, **kwargs))
+    t = threading.Thread(target=call, daemon=True)
+    t.start()
+    t.join(10)
+    assert not t.is_alive(), 'request hung'
+    assert responses[0].status_code in (200, 500)
+    assert app_module.flipper_connected
+    assert ser.cli_commands[:2] == ['info device', 'help']
+    assert ser.cli_commands[2].startswith(('cat ', 'rm '))
@@ -0,0 +1,89 @@
+import time
+
+from flipper_fleet import FlipperFleet, is_flipper_port
+from rpc_emulator import RPCEmulatorSerial
+
+
+class HubPort:
+    def __init__(self, device, vid=0x0483, pid=0x5740):
+        self.device, self.vid, self.pid = device, vid, pid
+
+
+class SlowFlipper(RPCEmulatorSerial):
+    """Answers `info device` with a per-port UID; other commands take `delay` seconds"""
+    delay = 0.15
+
+    def cli_response(self, command):
+        if command == 'info device':
+            return f'hardware_uid : UID{self.port[-1]}\r\nfirmware_version : 1.0\r\n'.encode()
+        if command == 'help':
+            return b'storage info help'
+        time.sleep(self.delay)
+        return f'{self.port}: {command}'.encode()
+
+
+def make_hub(monkeypatch, count):
+    ports = {f'/dev/ttyACM{i}': SlowFlipper({'/ext/id.txt': f'dev{i}'.encode()}, port=f'/dev/ttyACM{i}')
+             for i in range(count)}
+
+    def open_port(port, *a, **k):
+        ports[port].is_open = True
+        return ports[port]
+
+    monkeypatch.setattr('serial.Serial', open_port)
+    comports = [HubPort(p) for p in ports] + [HubPort('/dev/ttyUSB9', vid=0x1a86, pid=0x7523)]
+    monkeypatch.setattr('serial.tools.list_ports.comports', lambda: comports)
+    return ports
+
+
+def test_is_flipper_port():
+    assert is_flipper_port(HubPort('x'))
+    assert not is_flipper_port(HubPort('x', vid=0x1a86, pid=0x7523))
+
+
+def test_fleet_fans_out_concurrently(monkeypatch):
+    ports = make_hub(monkeypatch, 4)
+    fleet = FlipperFleet()
+    try:
+        assert sorted(fleet.scan(exclude=['/dev/ttyACM3'])) == ['UID0', 'UID1', 'UID2']
+        assert fleet.scan() == ['UID3'] and fleet.scan() == []
+
+        start = time.monotonic()
+        results = fleet.send_batch(['led g 255', 'led g 0'])
+        elapsed = time.monotonic() - start
+        assert set(results) == {'UID0', 'UID1', 'UID2', 'UID3'}
+        assert all(r['ok'] and r['result']['completed'] == 2 for r in results.values())
+        # 4 devices x 2 commands x 0.15 s serially would be 1.2 s
+        assert elapsed < 0.6
+        assert ports['/dev/ttyACM2'].cli_commands[-2:] == ['led g 255', 'led g 0']
+
+        reads = fleet.read_file_bytes('/ext/id.txt', device_ids=['UID1', 'nope'])
+        assert reads['UID1']['result'] == b'dev1'
+        assert reads['nope'] == {'ok': False, 'error': 'Unknown device', 'elapsed_ms': 0.0}
+        # A failed read or listing is a per-device failure, not an empty ok result
+        missing = fleet.read_file_bytes('/ext/missing.txt', device_ids=['UID2'])
+        assert not missing['UID2']['ok'] and 'result' not in missing['UID2']
+        assert fleet.list_entries('/ext', device_ids=['UID2'])['UID2']['ok']
+
+        status = {s['id']: s for s in fleet.status()}
+        assert status['UID0']['connected'] and status['UID0']['healthy']
+        assert status['UID0']['firmware_version'] == '1.0' and status['UID0']['ops'] == 1
+        assert status['UID2']['failures'] == 1 and status['UID2']['consecutive_failures'] == 0
+    finally:
+        fleet.close()
+
+
+def test_status_devices_reports_fleet(monkeypatch):
+    import app as app_module
+    make_hub(monkeypatch, 2)
+    fleet = FlipperFleet()
+    monkeypatch.setattr(app_module, 'flipper_fleet', fleet)
+    try:
+        with app_module.app.test_client() as c:
+            assert sorted(c.post('/fleet/scan').get_json()['added']) == ['UID0', 'UID1']
+            flippers = c.get('/status/devices').get_json()['flippers']
+            assert [f['port'] for f in flippers] == ['/dev/ttyACM0', '/dev/ttyACM1']
+            data = c.post('/fleet/batch', json={'commands': ['uptime'], 'devices': ['UID1']}).get_json()
+            assert data['ok'] and list(data['results']) == ['UID1']
+    finally:
+        fleet.close()
@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+
+from device_manager import ListingCache, parse_storage_list
+from rpc_emulator import RPCEmulatorSerial
+
+
+def test_parse_storage_list_typed_entries():
+    out = ('storage list /ext\r\n\t[D] subghz\r\n\t[F] my file.sub 1234b\r\n'
+           '\t[F] dump.nfc 2K\r\n\t[D] apps data\r\n')
+    assert parse_storage_list(out) == [
+        {'name': 'apps data', 'type': 'dir', 'size': 0},
+        {'name': 'subghz', 'type': 'dir', 'size': 0},
+        {'name': 'dump.nfc', 'type': 'file', 'size': 2048},
+        {'name': 'my file.sub', 'type': 'file', 'size': 1234},
+    ]
+    assert parse_storage_list('storage list /ext/empty\r\n\tEmpty\r\n') == []
+    assert parse_storage_list('Storage error: not exist') is None
+    assert parse_storage_list("ls: command not found") is None
+
+
+def test_listing_cache_epoch_and_background_refresh():
+    epoch = [1]
+    calls = []
+    refreshed = threading.Event()
+
+    def loader(path):
+        calls.append(path)
+        if len(calls) > 1:
+            refreshed.set()
+        return [{'name': f'v{len(calls)}', 'type': 'file', 'size': 1}]
+
+    cache = ListingCache(loader, lambda: epoch[0], ttl=0.05)
+    assert cache.get('/ext/')['entries'][0]['name'] == 'v1'
+    hit = cache.get('/ext')
+    assert hit['cached'] and len(calls) == 1
+
+    # Stale: old listing is served immediately, refreshed in the background
+    time.sleep(0.06)
+    assert cache.get('/ext')['entries'][0]['name'] == 'v1'
+    assert refreshed.wait(2)
+    for _ in range(100):
+        if cache.get('/ext')['entries'][0]['name'] == 'v2':
+            break
+        time.sleep(0.01)
+    assert cache.get('/ext')['entries'][0]['name'] == 'v2'
+
+    # A reconnect (new epoch) never serves listings from the old connection
+    epoch[0] = 2
+    assert cache.get('/ext')['cached'] is False
+
+
+def test_fs_list_endpoint_cached_and_invalidated(monkeypatch):
+    import app as app_module
+    ser = RPCEmulatorSerial({'/ext/a.sub': b'aa', '/ext/sub/b.nfc': b'b'})
+    monkeypatch.setattr(app_module, 'flipper_ser', ser)
+    monkeypatch.setattr(app_module, 'flipper_connected', True)
+    monkeypatch.setattr(app_module, '_flipper_epoch', 100)
+    with app_module.app.test_client() as c:
+        first = c.get('/flipper_fs/list?path=/ext').get_json()
+        assert first['entries'] == [{'name': 'sub', 'type': 'dir', 'size': 0},
+                                    {'name': 'a.sub', 'type': 'file', 'size': 2}]
+        frames = ser.frames_seen
+        second = c.get('/flipper_fs/list?path=/ext').get_json()
+        assert second['cached'] and ser.frames_seen == frames
+
+        c.post('/flipper_fs/delete', json={'path': '/ext/a.sub'})
+        ser.files.pop('/ext/a.sub', None)
+        third = c.get('/flipper_fs/list?path=/ext').get_json()
+        assert not third['cached'] and [e['name'] for e in third['entries']] == ['sub']
+
+
+def test_list_entries_strict_surfaces_failures(monkeypatch):
+    from device_manager import FlipperDevice
+    ser = RPCEmulatorSerial({'/ext/a.sub': b'x'})
+    monkeypatch.setattr('serial.Serial', lambda *a, **k: ser)
+    monkeypatch.setattr('serial.tools.list_ports.comports', lambda: [])
+    dev = FlipperDevice(port=ser.port, idle_timeout=0.01)
+    assert dev.list_entries('/ext') == []
+    with pytest.raises(RuntimeError):
+        dev.list_entries('/ext', strict=True)
+    assert dev.connect()
+    assert [e['name'] for e in dev.list_entries('/ext', strict=True)] == ['a.sub']
+    dev.disconnect()
@@ -46,3 +46,75 @@ def test_flipper_monitor_connected(monkeypatch):
         assert data['connected'] == True
         assert 'info' in data and isinstance(data['info'], list)
         assert 'last_updated' in data
+
+
+class RecordingSerial(FakeSerialOpen):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.commands = []
+    def write(self, data):
+        self.commands.append(data.decode().strip())
+
+
+def test_flipper_monitor_snapshot_is_shared(monkeypatch):
+    import app as app_module
+    fake = RecordingSerial()
+    monkeypatch.setattr(app_module, 'flipper_ser', fake)
+    monkeypatch.setattr(app_module, 'flipper_connected', True)
+    monkeypatch.setattr(app_module, 'FLIPPER_IDLE_TIMEOUT', 0.01)
+    app_module._flipper_monitor_cache.invalidate()
+    monkeypatch.setattr(app_module._flipper_monitor_cache, 'ttl', 60)
+
+    with app.test_client() as c:
+        first = c.get('/flipper_monitor').get_json()
+        second = c.get('/flipper_monitor').get_json()
+        assert first == second
+        assert fake.commands == ['info device', 'uptime', 'free']
+        # Forced refresh re-polls dynamic fields but keeps the static device info
+        c.get('/flipper_monitor?refresh=1')
+        assert fake.commands[3:] == ['uptime', 'free']
+    app_module._flipper_monitor_cache.invalidate()
+
+
+def test_snapshot_cache_single_flight():
+    import threading
+    import time
+    from device_manager import SnapshotCache
+    calls = []
+    def loader():
+        calls.append(1)
+        time.sleep(0.1)
+        return len(calls)
+    cache = SnapshotCache(loader, ttl=60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get())) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == [1]
+    assert results == [1] * 5
+
+
+def test_snapshot_cache_drops_load_invalidated_in_flight():
+    from device_manager import SnapshotCache
+    values = iter(['old device', 'new device'])
+    cache = None
+    def loader():
+        value = next(values)
+        if value == 'old device':
+            # Reconnect/unplug lands while the first load is still running
+            cache.invalidate()
+        return value
+    cache = SnapshotCache(loader, ttl=float('inf'))
+    assert cache.get() == 'old device'
+    assert cache.peek() is None
+    assert cache.get() == 'new device'
+    assert cache.get() == 'new device'
+
+
+def test_snapshot_cache_reentry_raises_instead_of_waiting():
+    from device_manager import SnapshotCache
+    cache = SnapshotCache(lambda: cache.get(), ttl=60)
+    with pytest.raises(RuntimeError):
+        cache.get()
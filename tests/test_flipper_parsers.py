@@ -0,0 +1,49 @@
+import app as app_module
+from flipper_parsers import parse_device_info, parse_free, parse_storage_info, parse_uptime
+from rpc_emulator import RPCEmulatorSerial
+
+FREE = ('free\r\nFree heap size: 112344\r\nTotal heap size: 191264\r\nMinimum heap size: 97928\r\n'
+        'Maximum heap block: 109568\r\nPool free: 2880\r\n')
+STORAGE = 'storage info /ext\r\nLabel: \r\nType: FAT32\r\n15711KiB total\r\n15600KiB free\r\n'
+
+
+class MonitorSerial(RPCEmulatorSerial):
+    def cli_response(self, command):
+        return {
+            'info device': b'hardware_name          : Pwn3d\r\nfirmware_version       : 0.86.1\r\n',
+            'uptime': b'Uptime: 0h2m5s',
+            'free': FREE.split('\r\n', 1)[1].encode(),
+            'storage info /ext': STORAGE.split('\r\n', 1)[1].encode(),
+        }.get(command, b'')
+
+
+def test_parsers():
+    assert parse_device_info('info device\r\nfirmware.api.major : 50')['firmware_api_major'] == '50'
+    assert parse_free(FREE) == {'free_heap_size': 112344, 'total_heap_size': 191264, 'minimum_heap_size': 97928,
+                                'maximum_heap_block': 109568, 'pool_free': 2880}
+    assert parse_uptime('uptime\r\nUptime: 0h0m5s') == 5
+    assert parse_uptime('Uptime: 1d 2h 3m 4s') == 93784
+    assert parse_uptime('') is None
+    assert parse_storage_info(STORAGE) == {'label': None, 'type': 'FAT32', 'total_bytes': 15711 * 1024,
+                                           'free_bytes': 15600 * 1024}
+
+
+def test_monitor_typed_fields_and_compact(monkeypatch):
+    ser = MonitorSerial()
+    monkeypatch.setattr(app_module, 'flipper_ser', ser)
+    monkeypatch.setattr(app_module, 'flipper_connected', True)
+    monkeypatch.setattr(app_module, 'FLIPPER_IDLE_TIMEOUT', 0.01)
+    app_module._flipper_monitor_cache.invalidate()
+    with app_module.app.test_client() as c:
+        full = c.get('/flipper_monitor').get_json()
+        assert full['device']['firmware_version'] == '0.86.1'
+        assert full['uptime_seconds'] == 125
+        assert full['heap']['free_heap_size'] == 112344
+        assert 'raw' in full
+        compact = c.get('/flipper_monitor?compact=1').get_json()
+        assert 'raw' not in compact and compact['heap'] == full['heap']
+        storage = c.get('/flipper_storage_info?path=/ext').get_json()
+        assert storage == {'path': '/ext', 'label': None, 'type': 'FAT32', 'total_bytes': 15711 * 1024,
+                           'free_bytes': 15600 * 1024}
+        assert c.get('/flipper_storage_info?path=/etc').status_code == 400
+    app_module._flipper_monitor_cache.invalidate()
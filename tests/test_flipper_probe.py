@@ -0,0 +1,72 @@
+import time
+
+from flipper_probe import classify, find_flipper, port_info
+from rpc_emulator import RPCEmulatorSerial
+
+
+class Port:
+    def __init__(self, device, vid=None, pid=None, serial_number=None, description=None):
+        self.device, self.vid, self.pid = device, vid, pid
+        self.serial_number, self.description = serial_number, description
+
+
+class SilentSerial:
+    """Opens fine but never answers (e.g. a GPS or a board in the wrong mode)"""
+    def __init__(self, port):
+        self.port, self.is_open, self.in_waiting = port, True, 0
+    def reset_input_buffer(self):
+        pass
+    def write(self, data):
+        return len(data)
+    def read(self, n=1):
+        return b''
+    def close(self):
+        self.is_open = False
+
+
+def test_classify():
+    assert classify(port_info(Port('a', 0x0483, 0x5740))) == 'flipper'
+    assert classify(port_info(Port('b', description='Flipper Zero Serial'))) == 'flipper'
+    assert classify(port_info(Port('c', 0x1a86, 0x7523))) == 'other'
+    assert classify(port_info(Port('d'))) == 'unknown'
+
+
+def test_parallel_probe_prefers_handshake_and_caches_serial(monkeypatch):
+    ports = [Port('/dev/ttyUSB0'), Port('/dev/ttyUSB1', 0x1a86, 0x7523),
+             Port('/dev/ttyACM0', 0x0483, 0x5740, serial_number='FLIP123'), Port('/dev/ttyS0')]
+    monkeypatch.setattr('serial.tools.list_ports.comports', lambda: ports)
+    flipper = RPCEmulatorSerial(port='/dev/ttyACM0')
+    opened = []
+
+    def open_port(name):
+        opened.append(name)
+        time.sleep(0.2)
+        if name == '/dev/ttyACM0':
+            flipper.is_open = True
+            return flipper
+        return SilentSerial(name)
+
+    start = time.monotonic()
+    port, ser, verified = find_flipper(open_port, handshake_timeout=0.2)
+    assert (port, ser, verified) == ('/dev/ttyACM0', flipper, True)
+    # Three candidates at 0.2 s open + 0.2 s silent handshake each would take 1.2 s in sequence
+    assert time.monotonic() - start < 0.8
+    # The CH340 (known non-Flipper VID/PID) is never touched
+    assert sorted(opened) == ['/dev/ttyACM0', '/dev/ttyS0', '/dev/ttyUSB0']
+
+    opened.clear()
+    assert find_flipper(open_port, handshake_timeout=0.2)[0] == '/dev/ttyACM0'
+    assert opened == ['/dev/ttyACM0']
+
+
+def test_unverified_fallback_and_exclusions(monkeypatch):
+    monkeypatch.setattr('serial.tools.list_ports.comports', lambda: [Port('COM7'), Port('COM8')])
+    # Silent ports without USB metadata are never installed unverified
+    assert find_flipper(SilentSerial, exclude=['COM7'], handshake_timeout=0.05) is None
+    monkeypatch.setattr('serial.tools.list_ports.comports', lambda: [Port('COM7'), Port('COM8', 0x0483, 0x5740)])
+    port, ser, verified = find_flipper(SilentSerial, handshake_timeout=0.05)
+    assert (port, verified) == ('COM8', False)
+    assert find_flipper(SilentSerial, preferred='COM7', exclude=['COM8'], handshake_timeout=0.05)[0] == 'COM7'
+    assert find_flipper(SilentSerial, preferred='COM9', auto_detect=False, handshake_timeout=0.05)[0] == 'COM9'
+    monkeypatch.setattr('serial.tools.list_ports.comports', lambda: [Port('COM1', 0x1a86, 0x7523)])
+    assert find_flipper(SilentSerial, handshake_timeout=0.05) is None
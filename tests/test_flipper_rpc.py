@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+import flipper_rpc as pb
+from device_manager import FlipperDevice
+from flipper_rpc import FlipperRPC, RPCError
+from rpc_emulator import RPCEmulatorSerial
+
+
+def test_varint_roundtrip():
+    for n in (0, 1, 127, 128, 300, 2 ** 32 - 1):
+        assert pb.decode_varint(pb.encode_varint(n)) == (n, len(pb.encode_varint(n)))
+
+
+def test_binary_file_roundtrip_is_exact():
+    blob = os.urandom(5000) + b'\x00\xff\r\n>: '
+    ser = RPCEmulatorSerial()
+    with FlipperRPC(ser, timeout=1) as rpc:
+        assert rpc.ping(b'hi') == b'hi'
+        rpc.write_file('/ext/capture.bin', blob)
+        assert rpc.read_file('/ext/capture.bin') == blob
+        assert rpc.stat('/ext/capture.bin')['size'] == len(blob)
+        assert rpc.list('/ext') == [{'name': 'capture.bin', 'type': 'file', 'size': len(blob)}]
+    assert not ser.rpc_mode
+    # Write chunks were pipelined: one frame per 512-byte chunk, plus the ping and stop frames
+    assert ser.frames_seen == -(-len(blob) // pb.CHUNK_SIZE) + 5
+
+
+def test_missing_file_raises_status():
+    with FlipperRPC(RPCEmulatorSerial(), timeout=1) as rpc:
+        with pytest.raises(RPCError) as err:
+            rpc.read_file('/ext/nope')
+        assert err.value.status == 7
+
+
+def test_flipper_device_reads_via_rpc_and_returns_to_cli():
+    ser = RPCEmulatorSerial({'/ext/nfc/card.nfc': b'\x01\x02binary\x00'})
+    dev = FlipperDevice(idle_timeout=0.05)
+    dev.ser = ser
+    dev.connected = True
+    assert dev.read_file_bytes('/ext/nfc/card.nfc') == b'\x01\x02binary\x00'
+    assert dev.send_command('uptime') == 'uptime'
+    assert ser.cli_commands == ['start_rpc_session', 'uptime']
+    # RPC file operations are FILE_OPS jobs on the device's scheduler, like CLI commands
+    assert dev.write_file('/ext/new.bin', b'\x00')
+    dev.list_entries('/ext', force=True)
+    assert dev.scheduler.stats()['classes']['file']['completed'] == 3
+
+
+def test_download_route_is_binary_safe(monkeypatch):
+    import app as app_module
+    blob = bytes(range(256)) * 8
+    ser = RPCEmulatorSerial({'/ext/dump.bin': blob})
+    monkeypatch.setattr(app_module, 'flipper_ser', ser)
+    monkeypatch.setattr(app_module, 'flipper_connected', True)
+    with app_module.app.test_client() as c:
+        r = c.get('/flipper_fs/download?path=/ext/dump.bin')
+        assert r.status_code == 200
+        assert r.data == blob
+
+
+def test_download_streams_with_length_and_gzip(monkeypatch):
+    import gzip
+    import app as app_module
+    blob = os.urandom(20000)
+    ser = RPCEmulatorSerial({'/ext/big.sub': blob})
+    monkeypatch.setattr(app_module, 'flipper_ser', ser)
+    monkeypatch.setattr(app_module, 'flipper_connected', True)
+    with app_module.app.test_client() as c:
+        r = c.get('/flipper_fs/download?path=/ext/big.sub', buffered=False)
+        assert r.headers['Content-Length'] == str(len(blob))
+        assert not isinstance(r.response, (bytes, list))
+        assert b''.join(r.response) == blob
+        r.close()
+        r = c.get('/flipper_fs/download?path=/ext/big.sub&gzip=1', headers={'Accept-Encoding': 'gzip'})
+        assert r.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(r.data) == blob
+        assert c.get('/flipper_fs/download?path=/ext/missing').status_code == 404
+    # The port was handed back to the CLI each time
+    assert not ser.rpc_mode
+    import threading
+    free = []
+    def probe():
+        free.append(app_module._serial_lock.acquire(blocking=False))
+        if free[0]:
+            app_module._serial_lock.release()
+    t = threading.Thread(target=probe)
+    t.start()
+    t.join()
+    assert free == [True]
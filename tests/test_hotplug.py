@@ -0,0 +1,137 @@
+import sys
+import threading
+
+import pytest
+
+import app as app_module
+from hotplug import HotplugWatcher
+
+
+class DummyPort:
+    def __init__(self, device, vid=None, pid=None, description=None):
+        self.device = device
+        self.vid = vid
+        self.pid = pid
+        self.description = description
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+        self.changed = threading.Event()
+
+    def __call__(self, added, removed):
+        self.events.append(([p['device'] for p in added], [p['device'] for p in removed]))
+        self.changed.set()
+
+    def wait(self):
+        assert self.changed.wait(3), 'no hotplug event'
+        self.changed.clear()
+        return self.events[-1]
+
+
+@pytest.fixture
+def ports(monkeypatch):
+    class Ports(list):
+        calls = 0
+
+    current = Ports([DummyPort('/dev/ttyS0')])
+
+    def comports():
+        current.calls += 1
+        return list(current)
+
+    monkeypatch.setattr('serial.tools.list_ports.comports', comports)
+    return current
+
+
+def test_poll_backend_reports_add_and_remove(ports):
+    events = Recorder()
+    watcher = HotplugWatcher(events, poll_interval=0.02, use_inotify=False).start()
+    try:
+        ports.append(DummyPort('/dev/ttyACM0', vid=0x0483, pid=0x5740))
+        assert events.wait() == (['/dev/ttyACM0'], [])
+        assert [p['device'] for p in watcher.ports()] == ['/dev/ttyACM0', '/dev/ttyS0']
+        ports.pop()
+        assert events.wait() == ([], ['/dev/ttyACM0'])
+        assert watcher.backend == 'poll'
+    finally:
+        watcher.stop()
+
+
+def test_ports_served_from_cache_until_invalidated(ports):
+    watcher = HotplugWatcher()
+    assert [p['device'] for p in watcher.ports()] == ['/dev/ttyS0']
+    calls = ports.calls
+    watcher.ports()
+    watcher.ports()
+    assert ports.calls == calls
+    watcher.invalidate()
+    watcher.ports()
+    assert ports.calls == calls + 1
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='inotify is Linux-only')
+def test_inotify_backend_rescans_on_tty_node(ports, tmp_path):
+    events = Recorder()
+    watcher = HotplugWatcher(events, debounce=0.02, dev_dir=str(tmp_path)).start()
+    try:
+        for _ in range(100):
+            if watcher.backend:
+                break
+            threading.Event().wait(0.01)
+        if watcher.backend != 'inotify':
+            pytest.skip('inotify unavailable in this environment')
+        calls = ports.calls
+        (tmp_path / 'unrelated').write_text('')
+        ports.append(DummyPort('/dev/ttyACM0', vid=0x0483, pid=0x5740))
+        (tmp_path / 'ttyACM0').write_text('')
+        assert events.wait() == (['/dev/ttyACM0'], [])
+        # Only the tty node triggered an enumeration
+        assert ports.calls == calls + 1
+    finally:
+        watcher.stop()
+
+
+class FakeSerial:
+    def __init__(self, port):
+        self.port = port
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+
+def test_unplug_disconnects_flipper():
+    ser = FakeSerial('/dev/ttyACM0')
+    app_module.flipper_ser = ser
+    app_module.flipper_connected = True
+    app_module._on_serial_hotplug([], [{'device': '/dev/ttyACM1'}])
+    assert app_module.flipper_connected
+    app_module._on_serial_hotplug([], [{'device': '/dev/ttyACM0'}])
+    assert not app_module.flipper_connected
+    assert not ser.is_open
+
+
+def test_plug_in_wakes_supervisor(monkeypatch):
+    woken = []
+
+    class Recorder:
+        def wake(self, name):
+            woken.append(name)
+
+    monkeypatch.setattr(app_module, 'supervisor', Recorder())
+    app_module._on_serial_hotplug([{'device': '/dev/ttyUSB0', 'vid': 0x10c4, 'pid': 0xea60}], [])
+    assert woken == []
+    app_module._on_serial_hotplug([{'device': '/dev/ttyACM0', 'vid': 0x0483, 'pid': 0x5740}], [])
+    assert woken == ['flipper']
+
+
+def test_supervisor_check_reconnects_while_hotplug_runs(monkeypatch):
+    attempts = []
+    monkeypatch.setattr(app_module.serial_watcher, '_thread', type('T', (), {'is_alive': lambda self: True})())
+    monkeypatch.setattr(app_module, 'connect_flipper', lambda: attempts.append(1) or len(attempts) > 1)
+    # A failed hotplug-time connect (port not ready) is retried by the next check
+    assert app_module._supervise_flipper() is False
+    assert app_module._supervise_flipper() is True
+    assert attempts == [1, 1]
@@ -0,0 +1,51 @@
+import pytest
+
+import launch_desktop
+from launch_desktop import parse_requirements, unsatisfied, version_matches
+
+
+def test_parse_and_check_requirements(tmp_path):
+    reqs = tmp_path / 'requirements.txt'
+    reqs.write_text('# comment\n-r other.txt\npytest>=1.0,<1000\nrequests[socks]==0.0.1\n'
+                    'no-such-dist-xyz==1.0\n')
+    parsed = parse_requirements(str(reqs))
+    assert parsed[0] == ('pytest', [('>=', '1.0'), ('<', '1000')])
+    assert parsed[1][0] == 'requests'
+    assert unsatisfied(parsed) == ['requests', 'no-such-dist-xyz']
+
+
+@pytest.mark.parametrize('use_packaging', [True, False])
+def test_version_matches(monkeypatch, use_packaging):
+    if not use_packaging:
+        monkeypatch.setattr(launch_desktop, '_specifier_set', lambda: None)
+    assert version_matches('3.5', '==', '3.5.0')
+    assert version_matches('6.6.1', '~=', '6.6')
+    assert version_matches('6.6.3', '~=', '6.6.0')
+    assert not version_matches('7.0', '~=', '6.6')
+    assert not version_matches('6.9', '~=', '6.6.0')
+    assert version_matches('2.32.3', '==', '2.32.*')
+    assert not version_matches('1.5', '==', '1.0.*')
+    assert not version_matches('1.9', '>=', '1.10')
+    assert not version_matches('6.6.0rc1', '==', '6.6.0')
+    assert not version_matches('6.6.0rc1', '>=', '6.6.0')
+    assert version_matches('6.6.0rc1', '>=', '6.5')
+
+
+def test_pip_skipped_when_satisfied(tmp_path, monkeypatch):
+    reqs = tmp_path / 'requirements.txt'
+    reqs.write_text('pytest\n')
+    calls = []
+    monkeypatch.setattr(launch_desktop.subprocess, 'check_call', lambda cmd: calls.append(cmd))
+    checks = []
+    real_unsatisfied = launch_desktop.unsatisfied
+    monkeypatch.setattr(launch_desktop, 'unsatisfied', lambda r: checks.append(1) or real_unsatisfied(r))
+
+    ok, timings = launch_desktop.install_dependencies(str(reqs))
+    assert ok and 'check' in timings and calls == []
+    # Second launch: the fingerprint matches, no metadata scan at all
+    ok, timings = launch_desktop.install_dependencies(str(reqs))
+    assert ok and 'check' not in timings and checks == [1]
+
+    reqs.write_text('pytest\nno-such-dist-xyz\n')
+    ok, _ = launch_desktop.install_dependencies(str(reqs))
+    assert len(calls) == 1 and not ok
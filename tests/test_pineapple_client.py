@@ -0,0 +1,211 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from pineapple_client import PineappleClient
+
+
+class FakePineappleHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    peers = []
+
+    def do_GET(self):
+        self.peers.append(self.client_address)
+        body = json.dumps({'path': self.path}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_pineapple():
+    FakePineappleHandler.peers = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakePineappleHandler)
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def test_client_reuses_connection(fake_pineapple):
+    client = PineappleClient()
+    for _ in range(5):
+        r = client.get(fake_pineapple, '/api/status')
+        assert r.json() == {'path': '/api/status'}
+    assert len(FakePineappleHandler.peers) == 5
+    assert len(set(FakePineappleHandler.peers)) == 1
+    assert client.probe(fake_pineapple)
+    client.close()
+
+
+def test_per_endpoint_timeouts():
+    client = PineappleClient(timeouts={'/api': 4, '/api/pineap/log': 12}, default_timeout=7)
+    assert client.timeout_for('/api/pineap/log?limit=5') == 12
+    assert client.timeout_for('/api/status') == 4
+    assert client.timeout_for('/other') == 7
+
+
+def test_token_manager_single_login_for_concurrent_callers():
+    import time
+    from pineapple_client import TokenManager
+    logins = []
+    def login():
+        logins.append(1)
+        time.sleep(0.1)
+        return f'tok{len(logins)}', None
+    tokens = TokenManager(login)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(tokens.get())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert logins == [1]
+    assert results == ['tok1'] * 8
+    # A stale rejection does not discard a newer token
+    tokens.invalidate('old-token')
+    assert tokens.get() == 'tok1'
+    tokens.invalidate('tok1')
+    assert tokens.get() == 'tok2'
+
+
+def test_token_manager_backs_off_after_failed_login():
+    from pineapple_client import TokenManager
+    logins = []
+    def login():
+        logins.append(1)
+        return None, None
+    tokens = TokenManager(login, retry_after=60)
+    assert tokens.get() is None
+    assert tokens.get() is None
+    assert logins == [1]
+
+
+def test_token_manager_short_lived_token_is_reused():
+    import time
+    from pineapple_client import TokenManager
+    logins = []
+    def login():
+        logins.append(1)
+        return f'tok{len(logins)}', 0.2
+    # expires_in below the 30 s refresh margin: the margin shrinks to half the lifetime
+    tokens = TokenManager(login, refresh_margin=30)
+    assert tokens.get() == 'tok1'
+    assert tokens.get() == 'tok1' and tokens.token == 'tok1'
+    assert logins == [1]
+    time.sleep(0.12)
+    assert tokens.token is None
+    assert tokens.get() == 'tok2'
+
+
+def test_api_call_refreshes_token_on_401(monkeypatch):
+    import app as app_module
+    from pineapple_client import TokenManager
+
+    class Resp:
+        def __init__(self, code, body):
+            self.status_code = code
+            self.body = body
+            self.text = str(body)
+        def json(self):
+            return self.body
+
+    issued = iter(['expired', 'fresh'])
+    monkeypatch.setattr(app_module, 'pineapple_tokens', TokenManager(lambda: (next(issued), None)))
+    seen = []
+    def fake_request(method, base_url, endpoint, headers=None, **kwargs):
+        seen.append(headers['Authorization'])
+        if headers['Authorization'] == 'Bearer expired':
+            return Resp(401, {'error': 'expired'})
+        return Resp(200, {'ok': True})
+    monkeypatch.setattr(app_module.pineapple_http, 'request', fake_request)
+    with app_module.app.test_request_context():
+        assert app_module.pineapple_api_call('/api/status') == {'ok': True}
+    assert seen == ['Bearer expired', 'Bearer fresh']
+
+
+def test_circuit_breaker_states():
+    import time
+    from pineapple_client import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+    breaker = CircuitBreaker(threshold=2, reset_timeout=0.05)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow() and breaker.rejecting()
+    time.sleep(0.06)
+    assert not breaker.rejecting()
+    # Exactly one half-open trial goes through
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow() and breaker.rejecting()
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.trips == 2
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0
+
+
+def test_client_fails_fast_once_circuit_opens():
+    import socket
+    import time
+    from pineapple_client import CircuitOpenError
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        dead = f'http://127.0.0.1:{s.getsockname()[1]}'
+    client = PineappleClient(retries=2, backoff_factor=0.3, breaker_threshold=2, breaker_reset=60)
+    start = time.monotonic()
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            client.get(dead, '/api/status')
+    # Refused connects are not retried with backoff before the breaker counts them
+    assert time.monotonic() - start < 0.3
+    start = time.monotonic()
+    with pytest.raises(CircuitOpenError):
+        client.get(dead, '/api/status')
+    assert time.monotonic() - start < 0.05
+    assert client.breaker(dead).status()['state'] == 'open'
+    # Probes bypass the breaker so discovery still works
+    assert client.probe(dead, timeout=0.2) is False
+    client.close()
+
+
+def test_api_call_serves_last_good_while_open(monkeypatch):
+    import app as app_module
+    from pineapple_client import TokenManager
+
+    class Resp:
+        status_code = 200
+        text = ''
+        def json(self):
+            return {'battery': 90}
+
+    client = PineappleClient(breaker_threshold=1, breaker_reset=60)
+    calls = []
+    def fake_request(method, url, **kwargs):
+        calls.append(url)
+        if len(calls) > 1:
+            raise requests.ConnectionError('unreachable')
+        return Resp()
+    monkeypatch.setattr(client.session, 'request', fake_request)
+    monkeypatch.setattr(app_module, 'pineapple_http', client)
+    monkeypatch.setattr(app_module, 'pineapple_tokens', TokenManager(lambda: ('tok', None)))
+    monkeypatch.setattr(app_module, '_pineapple_last_good', {})
+    with app_module.app.test_request_context():
+        assert app_module.pineapple_api_call('/api/status') == {'battery': 90}
+        assert app_module.pineapple_api_call('/api/status') == {'error': 'Cannot reach WiFi Pineapple'}
+        stale = app_module.pineapple_api_call('/api/status')
+        assert stale['battery'] == 90 and stale['stale'] is True
+        missing = app_module.pineapple_api_call('/api/notifications')
+        assert missing['error'] == 'WiFi Pineapple unavailable' and missing['retry_in'] > 0
+    # The open circuit kept the last two calls off the network
+    assert len(calls) == 2
@@ -0,0 +1,42 @@
+import time
+
+import local_state
+from pineapple_discovery import PineappleLocator, candidate_urls, probe_first, _linux_networks
+
+
+def test_candidate_urls_from_interfaces():
+    cands = candidate_urls(['192.168.1.20', '172.16.43.100'])
+    assert cands[:2] == ['http://172.16.43.1:1471', 'http://172.16.43.1']
+    assert cands[-2:] == ['http://172.16.42.1:1471', 'http://172.16.42.1']
+
+
+def test_linux_networks_from_route_table(tmp_path):
+    route = tmp_path / 'route'
+    route.write_text(
+        'Iface\tDestination\tGateway \tFlags\tRefCnt\tUse\tMetric\tMask\t\tMTU\tWindow\tIRTT\n'
+        'eth0\t00000000\t0101A8C0\t0003\t0\t0\t100\t00000000\t0\t0\t0\n'
+        'usb0\t002A10AC\t00000000\t0001\t0\t0\t0\t00FFFFFF\t0\t0\t0\n'
+    )
+    assert _linux_networks(str(route)) == ['172.16.42.1']
+
+
+def test_probe_first_returns_fastest_responder():
+    def probe(url):
+        if url == 'slow':
+            time.sleep(2)
+            return True
+        return url == 'fast'
+    start = time.monotonic()
+    assert probe_first(['dead', 'slow', 'fast'], probe) == 'fast'
+    assert time.monotonic() - start < 1
+
+
+def test_locator_persists_last_known_good():
+    locator = PineappleLocator('http://10.0.0.1', lambda url: url == 'http://172.16.42.1', key='test')
+    assert locator.discover(force=True) == 'http://172.16.42.1'
+    assert local_state.load_json('pineapple_discovery.json')['test']['url'] == 'http://172.16.42.1'
+    # A fresh locator starts from the remembered URL
+    assert PineappleLocator('http://10.0.0.1', lambda url: False, key='test').url == 'http://172.16.42.1'
+    assert PineappleLocator('http://172.16.42.1:1471', lambda url: False, key='test').url == 'http://172.16.42.1'
+    # ...but a newly configured URL is not overridden by a cache written under the old one
+    assert PineappleLocator('http://10.0.0.2', lambda url: False, key='test').url == 'http://10.0.0.2'
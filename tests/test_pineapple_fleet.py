@@ -0,0 +1,109 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from pineapple_fleet import PineappleFleet
+
+
+def make_unit(name, delay=0.0):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        settings = {}
+
+        def _send(self, payload, status=200):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            return json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+
+        def do_POST(self):
+            self._body()
+            self._send({'token': f'tok-{name}', 'expires_in': 600})
+
+        def do_GET(self):
+            time.sleep(delay)
+            self._send({'unit': name, 'path': self.path})
+
+        def do_PUT(self):
+            Handler.settings = self._body()
+            self._send({'saved': True})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    server.block_on_close = False
+    threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+    return server, Handler, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+@pytest.fixture
+def units():
+    made = [make_unit('a', 0.3), make_unit('b', 0.3), make_unit('c', 0.3)]
+    yield made
+    for server, _, _ in made:
+        server.shutdown()
+        server.server_close()
+
+
+def test_fleet_status_runs_concurrently(units):
+    fleet = PineappleFleet()
+    for (_, _, url), name in zip(units, 'abc'):
+        fleet.add(name, url, password='x')
+    fleet.add('dead', 'http://127.0.0.1:9')
+    try:
+        start = time.monotonic()
+        results = fleet.api_call('/api/status')
+        elapsed = time.monotonic() - start
+        assert [results[n]['result']['unit'] for n in 'abc'] == ['a', 'b', 'c']
+        assert results['dead']['ok'] is False
+        # Three 0.3 s units in sequence would take 0.9 s
+        assert elapsed < 0.85
+        assert fleet.get('a').token == 'tok-a'
+    finally:
+        fleet.close()
+
+
+def test_slow_unit_only_costs_its_own_timeout(units):
+    slow_server, _, slow_url = make_unit('slow', 1.2)
+    fleet = PineappleFleet(timeout=0.5)
+    fleet.add('a', units[0][2])
+    fleet.add('slow', slow_url)
+    try:
+        start = time.monotonic()
+        results = fleet.api_call('/api/status')
+        assert time.monotonic() - start < 1.0
+        assert results['a']['ok'] and results['slow'] == {'ok': False, 'error': 'Timed out', 'elapsed_ms': 500.0}
+    finally:
+        fleet.close()
+        slow_server.shutdown()
+        slow_server.server_close()
+
+
+def test_settings_pushed_to_selected_units(units):
+    import app as app_module
+    fleet = PineappleFleet()
+    for (_, _, url), name in zip(units, 'abc'):
+        fleet.add(name, url)
+    original = app_module.pineapple_fleet
+    app_module.pineapple_fleet = fleet
+    try:
+        with app_module.app.test_client() as c:
+            data = c.post('/pineapple_settings?units=a,c', json={'ssid': 'lab'}).get_json()
+            assert data['ok'] and set(data['results']) == {'a', 'c'}
+            assert units[0][1].settings == {'ssid': 'lab'} and units[1][1].settings == {}
+            assert [u['name'] for u in c.get('/pineapple_fleet').get_json()['units']] == ['a', 'b', 'c']
+            assert c.delete('/pineapple_fleet/b').status_code == 200
+            assert c.delete('/pineapple_fleet/b').status_code == 404
+    finally:
+        app_module.pineapple_fleet = original
+        fleet.close()
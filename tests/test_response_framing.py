@@ -0,0 +1,44 @@
+import time
+
+from device_manager import read_response, FlipperDevice
+
+
+class ChunkedSerial:
+    """Fake serial port that hands out queued chunks one read at a time"""
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.written = b''
+        self.is_open = True
+    @property
+    def in_waiting(self):
+        return len(self.chunks[0]) if self.chunks else 0
+    def read(self, n):
+        return self.chunks.pop(0) if self.chunks else b''
+    def reset_input_buffer(self):
+        pass
+    def write(self, data):
+        self.written += data
+
+
+def test_read_response_stops_at_prompt():
+    ser = ChunkedSerial([b'uptime\r\n', b'Uptime: 0h0m5s\r\n', b'\r\n>: '])
+    start = time.monotonic()
+    out = read_response(ser, idle_timeout=5, deadline=5)
+    assert time.monotonic() - start < 1
+    assert out == b'uptime\r\nUptime: 0h0m5s\r\n\r\n'
+
+
+def test_read_response_idle_gap_without_prompt():
+    ser = ChunkedSerial([b'partial output'])
+    start = time.monotonic()
+    out = read_response(ser, idle_timeout=0.05, deadline=5)
+    assert time.monotonic() - start < 1
+    assert out == b'partial output'
+
+
+def test_flipper_device_send_command_uses_framing():
+    dev = FlipperDevice(idle_timeout=0.05)
+    dev.ser = ChunkedSerial([b'free\r\nFree heap size: 1234\r\n\r\n>: '])
+    dev.connected = True
+    assert dev.send_command('free') == 'free\r\nFree heap size: 1234'
+    assert dev.ser.written == b'free\r\n'
@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+from serial_scheduler import (SerialScheduler, SchedulerTimeout, INTERACTIVE, TRANSMIT,
+                              FILE_OPS, TELEMETRY)
+
+
+def _block(sched):
+    """Occupy the owner thread until the returned event is set"""
+    started, release = threading.Event(), threading.Event()
+    sched.submit(lambda: (started.set(), release.wait(5)), FILE_OPS)
+    assert started.wait(2)
+    return release
+
+
+def test_runs_highest_priority_first():
+    sched = SerialScheduler()
+    release = _block(sched)
+    order = []
+    futures = [sched.submit(lambda p=p: order.append(p), p)
+               for p in (TELEMETRY, FILE_OPS, TRANSMIT, INTERACTIVE)]
+    assert sched.stats()['queued'] == 4
+    release.set()
+    for f in futures:
+        f.result(2)
+    assert order == [INTERACTIVE, TRANSMIT, FILE_OPS, TELEMETRY]
+
+
+def test_stale_telemetry_expires_and_duplicates_coalesce():
+    sched = SerialScheduler(deadlines={TELEMETRY: 0.05})
+    release = _block(sched)
+    calls = []
+    first = sched.submit(lambda: calls.append('uptime'), TELEMETRY, key='uptime')
+    second = sched.submit(lambda: calls.append('uptime'), TELEMETRY, key='uptime')
+    assert first is second
+    time.sleep(0.1)
+    release.set()
+    with pytest.raises(SchedulerTimeout):
+        first.result(2)
+    assert calls == []
+    stats = sched.stats()['classes']['telemetry']
+    assert stats['expired'] == 1 and stats['coalesced'] == 1
+
+
+def test_nested_run_on_owner_thread_is_inline():
+    sched = SerialScheduler()
+    assert sched.run(lambda: sched.run(lambda: 42, TELEMETRY), INTERACTIVE, timeout=2) == 42
+
+
+def test_scheduler_endpoint_reports_depth():
+    import app as app_module
+    with app_module.app.test_client() as c:
+        data = c.get('/flipper_scheduler').get_json()
+    assert set(data['depth']) == {'interactive', 'transmit', 'file', 'telemetry'}
+    assert 'max_wait_ms' in data['classes']['interactive']
@@ -0,0 +1,29 @@
+import os
+
+from startup_profile import parse_importtime, profile
+
+# Time-to-first-response budget for a cold `import app` + first request, in seconds
+BUDGET = float(os.getenv('STARTUP_BUDGET', '1.0'))
+
+
+def test_parse_importtime():
+    rows = parse_importtime('import time: self [us] | cumulative | imported package\n'
+                            'import time:       120 |        120 |   zlib\n'
+                            'import time:      3000 |       3120 | app\n')
+    assert rows == [{'module': 'zlib', 'self_ms': 0.12, 'cumulative_ms': 0.12, 'depth': 1},
+                    {'module': 'app', 'self_ms': 3.0, 'cumulative_ms': 3.12, 'depth': 0}]
+
+
+def test_web_app_cold_start():
+    # Best of a few runs so one slow scheduler tick on a busy machine does not fail the build
+    runs = []
+    for _ in range(3):
+        result = profile('app', request_path='/')
+        runs.append(result['total_ms'])
+        if result['total_ms'] < BUDGET * 1000:
+            break
+    assert result['status'] == 200
+    assert min(runs) < BUDGET * 1000, f'cold start took {min(runs):.0f} ms'
+    # Modules only needed by background services or broker mode stay unloaded
+    loaded = {row['module'] for row in result['imports']}
+    assert not loaded & {'asyncio', 'multiprocessing.connection', 'flask_bootstrap'}
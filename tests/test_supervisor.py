@@ -0,0 +1,93 @@
+import threading
+import time
+
+import app as app_module
+from supervisor import Supervisor, DeviceTask, HEALTHY, DEGRADED, DOWN, STARTING, DISABLED
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_state_machine_and_backoff():
+    task = DeviceTask('dev', lambda: True, interval=10, retry_base=2, max_backoff=30, jitter=0, down_after=3)
+    assert task.state == STARTING
+    task.record(True)
+    assert task.state == HEALTHY and task.delay() == 10
+    task.record(False, 'boom')
+    assert task.state == DEGRADED and task.delay() == 2
+    task.record(False, 'boom')
+    assert task.state == DEGRADED and task.delay() == 4
+    task.record(False, 'boom')
+    assert task.state == DOWN and task.last_error == 'boom'
+    for _ in range(10):
+        task.record(False, 'boom')
+    assert task.delay() == 30
+    task.record(True)
+    assert task.state == HEALTHY and task.consecutive_failures == 0
+    # A device that never came up is down straight away
+    fresh = DeviceTask('new', lambda: False, interval=10)
+    fresh.record(False, 'unreachable')
+    assert fresh.state == DOWN
+
+
+def test_jitter_stays_in_bounds():
+    task = DeviceTask('dev', lambda: False, interval=10, retry_base=4, jitter=0.25)
+    task.record(False, 'x')
+    delays = [task.delay() for _ in range(200)]
+    assert min(delays) >= 3 and max(delays) <= 5
+
+
+def test_slow_device_does_not_delay_others():
+    sup = Supervisor()
+    release = threading.Event()
+    fast_checks = []
+
+    def slow():
+        release.wait(5)
+        return False
+
+    def fast():
+        fast_checks.append(time.monotonic())
+        return True
+
+    sup.add('slow', slow, interval=60)
+    sup.add('fast', fast, interval=0.02)
+    sup.add('off', fast, interval=0.02, enabled=False)
+    sup.start()
+    try:
+        assert wait_for(lambda: len(fast_checks) >= 5)
+        status = sup.status()
+        assert status['running']
+        assert status['devices']['fast']['state'] == HEALTHY
+        assert status['devices']['slow']['state'] == STARTING
+        assert status['devices']['off']['state'] == DISABLED
+    finally:
+        release.set()
+        sup.stop()
+
+
+def test_wake_skips_backoff():
+    sup = Supervisor()
+    results = [False, True]
+    sup.add('dev', lambda: results.pop(0) if results else True, interval=60, retry_base=60)
+    sup.start()
+    try:
+        assert wait_for(lambda: sup.get('dev').state == DOWN)
+        sup.wake('dev')
+        assert wait_for(lambda: sup.get('dev').state == HEALTHY)
+    finally:
+        sup.stop()
+
+
+def test_status_endpoint():
+    with app_module.app.test_client() as c:
+        data = c.get('/status/supervisor').get_json()
+    assert set(data['devices']) == {'flipper', 'pineapple'}
+    # conftest disables auto-connect, so nothing is supervised in tests
+    assert data['devices']['flipper']['state'] == DISABLED
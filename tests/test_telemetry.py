@@ -0,0 +1,38 @@
+from telemetry import TelemetryHub, compute_delta
+from app import app
+
+
+def test_compute_delta_reports_only_changes():
+    old = {'uptime': '1s', 'memory': '10', 'error': 'x'}
+    new = {'uptime': '2s', 'memory': '10'}
+    assert compute_delta(old, new) == {'set': {'uptime': '2s'}, 'removed': ['error']}
+    assert compute_delta(new, dict(new)) is None
+    assert compute_delta([1], [2]) == {'value': [2]}
+
+
+def test_hub_samples_once_for_all_subscribers():
+    calls = []
+    def source():
+        calls.append(1)
+        return {'count': len(calls)}
+    hub = TelemetryHub(interval=3600, autostart=False)
+    hub.add_source('dev', source)
+    subs = [hub.subscribe(['dev']) for _ in range(3)]
+    hub.sample_once()
+    hub.sample_once()
+    assert len(calls) == 2
+    for sub in subs:
+        events = []
+        while not sub.events.empty():
+            events.append(sub.events.get_nowait())
+        assert [e['event'] for e in events][-2:] == ['snapshot', 'delta']
+        assert events[-1]['data'] == {'dev': {'set': {'count': 2}, 'removed': []}}
+    # Late subscribers start from the latest snapshot
+    late = hub.subscribe(['dev'])
+    assert late.events.get_nowait() == {'event': 'snapshot', 'data': {'dev': {'count': 2}}}
+
+
+def test_telemetry_stream_rejects_unknown_channel():
+    with app.test_client() as c:
+        r = c.get('/telemetry/stream?channels=bogus')
+        assert r.status_code == 400